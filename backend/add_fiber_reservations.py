@@ -0,0 +1,64 @@
+"""Add cables.occupancy_version and the fiber_reservations table to an existing database"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+def add_fiber_reservations():
+    """Create the allocation schema if it is missing"""
+    db_path = Path(__file__).parent / "test.db"
+
+    if not db_path.exists():
+        print(f"Database not found at {db_path}")
+        print("Please ensure the database has been initialized first.")
+        return False
+
+    try:
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(cables)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "occupancy_version" in columns:
+            print("✓ Column cables.occupancy_version already exists")
+        else:
+            print("Adding cables.occupancy_version...")
+            cursor.execute("ALTER TABLE cables ADD COLUMN occupancy_version INTEGER NOT NULL DEFAULT 0")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='fiber_reservations'")
+        if cursor.fetchone():
+            print("✓ Table fiber_reservations already exists")
+        else:
+            print("Creating table fiber_reservations...")
+            cursor.execute("""
+                CREATE TABLE fiber_reservations (
+                    reservation_id INTEGER NOT NULL PRIMARY KEY,
+                    allocation_id VARCHAR(36) NOT NULL,
+                    cable_id INTEGER NOT NULL REFERENCES cables (cable_id),
+                    fiber_number INTEGER NOT NULL,
+                    label VARCHAR,
+                    reserved_by INTEGER REFERENCES users (user_id),
+                    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX ix_fiber_reservations_reservation_id ON fiber_reservations (reservation_id)")
+            cursor.execute("CREATE INDEX ix_fiber_reservations_allocation_id ON fiber_reservations (allocation_id)")
+            cursor.execute(
+                "CREATE UNIQUE INDEX ix_fiber_reservations_cable_fiber ON fiber_reservations (cable_id, fiber_number)"
+            )
+
+        conn.commit()
+        conn.close()
+        print("✓ Fiber allocation schema is in place")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"✗ Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_fiber_reservations()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,48 @@
+"""Add optical loss columns to cable_types, object_types and fiber_splices"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+COLUMNS = {
+    "cable_types": ("attenuation_db_per_km", "FLOAT"),
+    "object_types": ("loss_budget_db", "FLOAT"),
+    "fiber_splices": ("loss_db", "FLOAT"),
+}
+
+def add_loss_parameters():
+    """Add the nullable loss columns if they are missing"""
+    db_path = Path(__file__).parent / "test.db"
+
+    if not db_path.exists():
+        print(f"Database not found at {db_path}")
+        print("Please ensure the database has been initialized first.")
+        return False
+
+    try:
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+
+        for table, (column, column_type) in COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            if column in {row[1] for row in cursor.fetchall()}:
+                print(f"✓ Column {table}.{column} already exists")
+                continue
+            print(f"Adding {table}.{column}...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+        conn.commit()
+        conn.close()
+        print("✓ Loss budget columns are in place")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"✗ Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_loss_parameters()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,56 @@
+"""Add fiber lookup indexes to existing fiber_splices table"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+INDEXES = {
+    "ix_fiber_splices_cable_fiber": ("cable_id", "fiber_number"),
+    "ix_fiber_splices_target_fiber": ("splice_to_cable_id", "splice_to_fiber"),
+}
+
+def add_splice_indexes():
+    """Create (cable, fiber) lookup indexes, replacing the old unique ones"""
+    db_path = Path(__file__).parent / "test.db"
+
+    if not db_path.exists():
+        print(f"Database not found at {db_path}")
+        print("Please ensure the database has been initialized first.")
+        return False
+
+    try:
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA index_list(fiber_splices)")
+        existing = {row[1]: bool(row[2]) for row in cursor.fetchall()}
+
+        for name, (cable_col, fiber_col) in INDEXES.items():
+            if name in existing and not existing[name]:
+                print(f"✓ Index {name} already exists")
+                continue
+            if name in existing:
+                # уникальность по стороне записи отвергала допустимые сварки:
+                # занятость считается по концам волокон (splice_integrity)
+                print(f"Dropping unique index {name}...")
+                cursor.execute(f"DROP INDEX {name}")
+
+            print(f"Creating index {name}...")
+            cursor.execute(f"CREATE INDEX {name} ON fiber_splices ({cable_col}, {fiber_col})")
+
+        conn.commit()
+        conn.close()
+        print("✓ Splice indexes are in place")
+        print("Fiber ends used twice are reported by GET /api/fiber-splices/integrity.")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"✗ Database error: {e}")
+        return False
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_splice_indexes()
+    sys.exit(0 if success else 1)
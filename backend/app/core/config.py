@@ -50,6 +50,38 @@ class Settings(BaseSettings):
     MIN_FIBER_COUNT: int = 1
     MAX_FIBER_COUNT: int = 1000
     
+    # Geodesy: haversine | vincenty | karney
+    GEODESY_METHOD: str = os.getenv("GEODESY_METHOD", "vincenty")
+    
+    # Coalesced position updates
+    POSITION_FLUSH_INTERVAL_MS: int = int(os.getenv("POSITION_FLUSH_INTERVAL_MS", "200"))
+    
+    # Outage impact: object types that feed the network (comma-separated ObjectType names)
+    IMPACT_SOURCE_OBJECT_TYPES: str = os.getenv("IMPACT_SOURCE_OBJECT_TYPES", "node")
+    
+    # Fiber allocation: retries when a concurrent writer changed the cable's occupancy
+    FIBER_ALLOCATION_MAX_ATTEMPTS: int = int(os.getenv("FIBER_ALLOCATION_MAX_ATTEMPTS", "20"))
+    
+    # Optical loss budget defaults (dB) for cable types and splices without their own values
+    LOSS_DEFAULT_DB_PER_KM: float = float(os.getenv("LOSS_DEFAULT_DB_PER_KM", "0.35"))
+    LOSS_SPLICE_DB: float = float(os.getenv("LOSS_SPLICE_DB", "0.1"))
+    LOSS_CONNECTOR_DB: float = float(os.getenv("LOSS_CONNECTOR_DB", "0.5"))
+    
+    # PON tree analysis: object types reported with their downstream trees (comma-separated ObjectType names)
+    PON_TREE_OBJECT_TYPES: str = os.getenv("PON_TREE_OBJECT_TYPES", "node,splitter")
+    
+    # Route diversity audit: process pool size and the batch size from which it is used
+    DIVERSE_PATH_WORKERS: int = int(os.getenv("DIVERSE_PATH_WORKERS", str(os.cpu_count() or 1)))
+    DIVERSE_PATH_PARALLEL_MIN_PAIRS: int = int(os.getenv("DIVERSE_PATH_PARALLEL_MIN_PAIRS", "200"))
+    
+    # Import
+    IMPORT_SNAP_TOLERANCE_M: float = float(os.getenv("IMPORT_SNAP_TOLERANCE_M", "5"))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_JOB_WORKERS: int = int(os.getenv("IMPORT_JOB_WORKERS", "1"))
+    IMPORT_JOB_MAX_ERRORS: int = int(os.getenv("IMPORT_JOB_MAX_ERRORS", "1000"))
+    IMPORT_VALIDATION_WORKERS: int = int(os.getenv("IMPORT_VALIDATION_WORKERS", str(os.cpu_count() or 1)))
+    IMPORT_VALIDATION_PARALLEL_MIN_ROWS: int = int(os.getenv("IMPORT_VALIDATION_PARALLEL_MIN_ROWS", "50000"))
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,91 @@
+"""
+Change notifications for derived caches (distances, tiles, region snapshots,
+topology graphs). Writers mark changed ids on the session; subscribers are
+called once per committed transaction, never for rolled-back work.
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+OBJECTS_CHANGED = "objects_changed"
+CABLES_CHANGED = "cables_changed"
+SPLICES_CHANGED = "splices_changed"
+REGIONS_CHANGED = "regions_changed"
+TOPICS = (OBJECTS_CHANGED, CABLES_CHANGED, SPLICES_CHANGED, REGIONS_CHANGED)
+
+# objects/cables/regions передают id своих сущностей, splices - id кабелей,
+# у которых изменились сварки или резервы волокон; ids=None означает "изменилось все"
+Handler = Callable[[Optional[Set[int]]], None]
+
+_PENDING_KEY = "pending_changes"
+_subscribers: Dict[str, List[Handler]] = {topic: [] for topic in TOPICS}
+_lock = threading.Lock()
+_version = 0
+
+
+def subscribe(topic: str, handler: Handler) -> None:
+    """Подписать обработчик на тему; повторная подписка игнорируется"""
+    with _lock:
+        if handler not in _subscribers[topic]:
+            _subscribers[topic].append(handler)
+
+
+def dataset_version() -> int:
+    """Номер версии данных; растет с каждой зафиксированной транзакцией с изменениями"""
+    return _version
+
+
+def mark_changed(db: Session, topic: str, ids: Optional[Iterable[int]] = None) -> None:
+    """Отметить измененные id в текущей транзакции сессии"""
+    if topic not in _subscribers:
+        raise ValueError(f"Unknown topic: {topic}")
+    pending = db.info.setdefault(_PENDING_KEY, {})
+    if ids is None or pending.get(topic, set()) is None:
+        pending[topic] = None
+    else:
+        pending.setdefault(topic, set()).update(int(i) for i in ids if i is not None)
+
+
+def pending_changes(db: Session, topic: str) -> Optional[Set[int]]:
+    """Id, отмеченные по теме в текущей транзакции; None - изменилось все"""
+    pending = db.info.get(_PENDING_KEY, {})
+    return pending[topic] if topic in pending else set()
+
+
+def mark_all_changed(db: Session) -> None:
+    """Отметить, что в транзакции могло измениться все; сдвигает версии занятости всех кабелей"""
+    for topic in TOPICS:
+        mark_changed(db, topic)
+
+
+def publish(changes: Dict[str, Optional[Set[int]]]) -> None:
+    """Увеличить версию данных и оповестить подписчиков"""
+    global _version
+    if not changes:
+        return
+    with _lock:
+        _version += 1
+        calls = [(handler, ids) for topic, ids in changes.items() for handler in list(_subscribers[topic])]
+    for handler, ids in calls:
+        try:
+            handler(None if ids is None else set(ids))
+        except Exception as e:
+            # ошибка кеша не должна ломать уже зафиксированную запись
+            print(f"Error in change handler {getattr(handler, '__name__', handler)}: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    # событие приходит и на RELEASE SAVEPOINT; публикуем только внешнюю транзакцию
+    if session.in_nested_transaction():
+        return
+    publish(session.info.pop(_PENDING_KEY, None))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    # откат SAVEPOINT не отменяет остальную транзакцию; лишнее оповещение безвредно
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
@@ -1,11 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database.database import engine, Base, SessionLocal
-from .routes import network_objects, cables, fiber_splices, export, import_schema, auth, reference, regions
+from .routes import network_objects, cables, fiber_splices, export, import_schema, auth, reference, regions, trace, topology, capacity, fibers
 from .models import User, NetworkObject, Cable, Connection, FiberSplice, Region
 from .models.cable_type import CableType
 from .models.object_type import ObjectType
 from .core.config import settings
+from .services.position_buffer import position_buffer
 
 Base.metadata.create_all(bind=engine)
 
@@ -73,6 +74,15 @@ app.include_router(export.router, tags=["export"])
 app.include_router(import_schema.router, tags=["import"])
 app.include_router(reference.router, tags=["reference"])
 app.include_router(regions.router, tags=["regions"])
+app.include_router(trace.router, tags=["trace"])
+app.include_router(topology.router, tags=["topology"])
+app.include_router(capacity.router, tags=["capacity"])
+app.include_router(fibers.router, tags=["fibers"])
+
+
+@app.on_event("shutdown")
+def flush_pending_positions():
+    position_buffer.flush()
 
 
 @app.get("/")
@@ -6,5 +6,8 @@ from .fiber_splice import FiberSplice
 from .cable_type import CableType
 from .object_type import ObjectType
 from .region import Region
+from .import_job import ImportJob
+from .entity_hash import EntityHash
+from .fiber_reservation import FiberReservation
 
-__all__ = ["User", "NetworkObject", "Cable", "Connection", "FiberSplice", "CableType", "ObjectType", "Region"]
+__all__ = ["User", "NetworkObject", "Cable", "Connection", "FiberSplice", "CableType", "ObjectType", "Region", "ImportJob", "EntityHash", "FiberReservation"]
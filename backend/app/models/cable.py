@@ -14,6 +14,8 @@ class Cable(Base):
     from_object_id = Column(Integer, ForeignKey("network_objects.network_object_id"), nullable=False)
     to_object_id = Column(Integer, ForeignKey("network_objects.network_object_id"), nullable=False)
     distance_km = Column(Float, nullable=True)
+    # растет при каждом изменении занятости волокон (сварки, резервы); по нему выделение волокон сверяет версию
+    occupancy_version = Column(Integer, nullable=False, default=0, server_default="0")
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, nullable=True)
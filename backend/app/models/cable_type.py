@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, Float
 from ..database.database import Base
 
 
@@ -10,3 +10,5 @@ class CableType(Base):
     fiber_count = Column(Integer, nullable=True)  
     description = Column(Text, nullable=True)
     color = Column(String, nullable=False)  
+    # километрическое затухание, дБ/км; NULL - значение по умолчанию из настроек
+    attenuation_db_per_km = Column(Float, nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from ..database.database import Base
+
+
+class EntityHash(Base):
+    __tablename__ = "entity_hashes"
+
+    # профиль хеша (object, cable_geo, splice, ...) и id строки в своей таблице
+    entity_type = Column(String, primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    # отпечаток строки на момент расчета; если он не совпал, хеш устарел
+    row_created_at = Column(DateTime, nullable=True)
+    row_updated_at = Column(DateTime, nullable=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database.database import Base
+
+
+class FiberReservation(Base):
+    __tablename__ = "fiber_reservations"
+
+    reservation_id = Column(Integer, primary_key=True, index=True)
+    # одна операция выделения резервирует группу волокон под общим id
+    allocation_id = Column(String(36), nullable=False, index=True)
+    cable_id = Column(Integer, ForeignKey("cables.cable_id"), nullable=False)
+    fiber_number = Column(Integer, nullable=False)
+    label = Column(String, nullable=True)
+    reserved_by = Column(Integer, ForeignKey("users.user_id"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    # волокно резервируется не более одного раза - последняя защита от двойного выделения
+    __table_args__ = (
+        Index("ix_fiber_reservations_cable_fiber", "cable_id", "fiber_number", unique=True),
+    )
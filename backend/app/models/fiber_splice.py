@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from ..database.database import Base
 
@@ -11,6 +11,16 @@ class FiberSplice(Base):
     fiber_number = Column(Integer, nullable=False)
     splice_to_fiber = Column(Integer, nullable=False)
     splice_to_cable_id = Column(Integer, ForeignKey("cables.cable_id"), nullable=True)
+    # измеренные потери на сварке, дБ; NULL - значение по умолчанию из настроек
+    loss_db = Column(Float, nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, nullable=True)
 
+    # выборка сварок по кабелю с любой стороны. Уникальность не на индексах:
+    # занят конец волокна (кабель, волокно, конец), а конец определяется
+    # общим объектом кабелей, его проверяет splice_integrity
+    __table_args__ = (
+        Index("ix_fiber_splices_cable_fiber", "cable_id", "fiber_number"),
+        Index("ix_fiber_splices_target_fiber", "splice_to_cable_id", "splice_to_fiber"),
+    )
+
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy.sql import func
+from ..database.database import Base
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    import_job_id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # schema | geojson
+    status = Column(String, nullable=False, default="pending", index=True)
+    filename = Column(String, nullable=True)
+    file_path = Column(String, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    snap_tolerance_m = Column(Float, nullable=True)
+    # контрольная точка: этап, смещение записи внутри этапа и карты id (JSON)
+    stage_index = Column(Integer, nullable=False, default=0)
+    offset = Column(Integer, nullable=False, default=0)
+    checkpoint = Column(Text, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    errors = Column(Text, nullable=True)
+    error_count = Column(Integer, nullable=False, default=0)
+    message = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
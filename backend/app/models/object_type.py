@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, Float
 from ..database.database import Base
 
 
@@ -10,3 +10,5 @@ class ObjectType(Base):
     display_name = Column(String, nullable=False)
     emoji = Column(String, nullable=True)
     description = Column(Text, nullable=True)
+    # допустимое затухание линии от объекта этого типа (узел, сплиттер), дБ
+    loss_budget_db = Column(Float, nullable=True)
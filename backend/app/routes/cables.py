@@ -1,89 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 from ..database.database import get_db
 from ..models.cable import Cable
-from ..models.cable_type import CableType
 from ..models.region import Region
 from ..models.user import User
-from ..schemas.cable import CableCreate, CableResponse
+from ..models.network_object import NetworkObject
+from ..schemas.cable import CableCreate, CableUpdate, CableResponse
+from ..schemas.patch import PatchResponse
+from ..schemas.batch import CableBatchRequest, BatchResponse
+from ..core import events
+from ..core.config import settings
 from ..core.dependencies import get_current_user
+from ..services import projections
+from ..services.batch_edit import apply_cable_batch
+from ..services.cable_types import cable_type_resolver
+from ..services.cable_distances import endpoint_distance_km, recompute_cable_distances
+from ..services.cascade_delete import delete_cables_cascade
+from ..services.partial_update import load_row, dirty_fields, write_dirty, patch_response
+from ..utils.validators import validate_fiber_count, validate_distance
 
 router = APIRouter(prefix="/api/cables", tags=["cables"])
 
+PATCH_FIELDS = ("name", "cable_type_id", "fiber_count", "from_object_id", "to_object_id", "distance_km", "description")
+
 
 def _resolve_cable_type_id(cable_type: Optional[str], cable_type_id: Optional[int], fiber_count: Optional[int], db: Session) -> int:
     """Resolve cable_type ID - can be by name, ID, or fiber_count"""
-    print(f"[RESOLVER] cable_type={cable_type}, cable_type_id={cable_type_id}, fiber_count={fiber_count}")
-    
-    if cable_type_id:
-        print(f"[RESOLVER] Using provided cable_type_id: {cable_type_id}")
-        return cable_type_id
-    
-    if cable_type and cable_type.lower() == 'optical' and fiber_count:
-        print(f"[RESOLVER] Searching for optical type with fiber_count={fiber_count}")
-        type_obj = db.query(CableType).filter(
-            CableType.fiber_count == fiber_count,
-            CableType.name.like('ОКГ-%') 
-        ).first()
-        if type_obj:
-            print(f"[RESOLVER] Found type: {type_obj.name} (ID={type_obj.cable_type_id})")
-            return type_obj.cable_type_id
-        else:
-            print(f"[RESOLVER] No specific optical type found with fiber_count={fiber_count}, using generic 'Оптический'")
-            type_obj = db.query(CableType).filter(CableType.name == "Оптический").first()
-            if type_obj:
-                return type_obj.cable_type_id
-    
-    if cable_type and cable_type.lower() == 'copper':
-        print(f"[RESOLVER] Copper type selected, using 'Медный'")
-        type_obj = db.query(CableType).filter(CableType.name == "Медный").first()
-        if type_obj:
-            print(f"[RESOLVER] Found type: {type_obj.name} (ID={type_obj.cable_type_id})")
-            return type_obj.cable_type_id
-    
-    if cable_type:
-        print(f"[RESOLVER] Searching for type by name: {cable_type}")
-        type_obj = db.query(CableType).filter(
-            CableType.name.ilike(cable_type)
-        ).first()
-        if type_obj:
-            print(f"[RESOLVER] Found type: {type_obj.name} (ID={type_obj.cable_type_id})")
-            return type_obj.cable_type_id
-        else:
-            print(f"[RESOLVER] No type found with name like: {cable_type}")
-    
-    print(f"[RESOLVER] Using fallback - generic 'Оптический' type")
-    generic_type = db.query(CableType).filter(CableType.name == "Оптический").first()
-    if generic_type:
-        print(f"[RESOLVER] Fallback type ID: {generic_type.cable_type_id}")
-        return generic_type.cable_type_id
-    
-    first_type = db.query(CableType).first()
-    result_id = first_type.cable_type_id if first_type else 1
-    print(f"[RESOLVER] Last resort type ID: {result_id}")
-    return result_id
-
-
-def _cable_to_response(cable: Cable) -> dict:
-    """Convert Cable ORM to response dict with cable_type_name and cable_type_color"""
-    cable_type_name = cable.cable_type.name if cable.cable_type else None
-    cable_type_color = cable.cable_type.color if cable.cable_type else None
-    return {
-        'cable_id': cable.cable_id,
-        'name': cable.name,
-        'cable_type_id': cable.cable_type_id,
-        'cable_type_name': cable_type_name,
-        'cable_type_color': cable_type_color,
-        'fiber_count': cable.fiber_count,
-        'from_object_id': cable.from_object_id,
-        'to_object_id': cable.to_object_id,
-        'distance_km': cable.distance_km,
-        'description': cable.description,
-        'created_at': cable.created_at,
-        'updated_at': cable.updated_at
-    }
+    return cable_type_resolver.resolve(db, cable_type, cable_type_id, fiber_count)
 
 
 @router.get("/", response_model=list[CableResponse])
@@ -93,8 +39,7 @@ def list_cables_public(
     db: Session = Depends(get_db)
 ):
     """Public endpoint - no authentication required (for development/testing)"""
-    cables = db.query(Cable).offset(skip).limit(limit).all()
-    return [_cable_to_response(cable) for cable in cables]
+    return JSONResponse(projections.list_cables(db, skip=skip, limit=limit))
 
 
 @router.post("/", response_model=CableResponse)
@@ -119,8 +64,12 @@ def create_cable(
     
     data = cable.model_dump(exclude={'cable_type'})  
     data['cable_type_id'] = resolved_cable_type_id
+    if data['distance_km'] is None:
+        data['distance_km'] = endpoint_distance_km(db, data['from_object_id'], data['to_object_id'])
     db_cable = Cable(**data)
     db.add(db_cable)
+    db.flush()
+    events.mark_changed(db, events.CABLES_CHANGED, [db_cable.cable_id])
     db.commit()
     db.refresh(db_cable)
     print("Created cable id=", db_cable.cable_id, "fiber_count=", db_cable.fiber_count)
@@ -144,6 +93,7 @@ def create_cable(
                         f"VALUES ({region.region_id}, {db_cable.cable_id})"
                     ))
                     region.updated_at = datetime.utcnow()
+                    events.mark_changed(db, events.REGIONS_CHANGED, [region.region_id])
                     print(f"Added cable {db_cable.cable_id} to region {region.region_id}")
             
             db.commit()
@@ -152,7 +102,34 @@ def create_cable(
         db.rollback()      
     
     print("=== CREATE CABLE SUCCESS ===")
-    return _cable_to_response(db_cable)
+    return JSONResponse(projections.get_cable(db, db_cable.cable_id))
+
+
+@router.post("/batch", response_model=BatchResponse)
+def batch_cables(
+    batch: CableBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create, update and delete cables in one transaction with per-item results"""
+    try:
+        return apply_cable_batch(db, batch.operations, atomic=batch.atomic)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Batch error: {str(e)}")
+
+
+@router.post("/recompute-distances")
+def recompute_distances(
+    only_missing: bool = False,
+    method: str = Query(settings.GEODESY_METHOD, pattern="^(haversine|vincenty|karney)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recompute distance_km of all cables from endpoint coordinates in one batched pass"""
+    result = recompute_cable_distances(db, only_missing=only_missing, method=method)
+    db.commit()
+    return {"updated": result["updated"], "skipped": result["skipped"]}
 
 
 @router.get("/{cable_id}", response_model=CableResponse)
@@ -161,10 +138,10 @@ def get_cable(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cable = db.query(Cable).filter(Cable.cable_id == cable_id).first()
+    cable = projections.get_cable(db, cable_id)
     if not cable:
         raise HTTPException(status_code=404, detail="Cable not found")
-    return _cable_to_response(cable)
+    return JSONResponse(cable)
 
 
 @router.put("/{cable_id}", response_model=CableResponse)
@@ -182,14 +159,64 @@ def update_cable(
     
     data = cable_update.model_dump(exclude={'cable_type'})  
     data['cable_type_id'] = resolved_cable_type_id
+    if data['distance_km'] is None:
+        data['distance_km'] = endpoint_distance_km(db, data['from_object_id'], data['to_object_id'])
     
     for key, value in data.items():
         setattr(cable, key, value)
     
     cable.updated_at = datetime.utcnow()
+    events.mark_changed(db, events.CABLES_CHANGED, [cable_id])
     db.commit()
-    db.refresh(cable)
-    return _cable_to_response(cable)
+    return JSONResponse(projections.get_cable(db, cable_id))
+
+
+@router.patch("/{cable_id}", response_model=PatchResponse)
+def patch_cable(
+    cable_id: int,
+    cable_patch: CableUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update only the supplied fields; the cable type is re-resolved only when it is part of the payload"""
+    payload = cable_patch.model_dump(exclude_unset=True)
+    cable_type = payload.pop("cable_type", None)
+    for field in ("name", "from_object_id", "to_object_id"):
+        if field in payload and payload[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+    
+    current = load_row(db, Cable, "cable_id", cable_id, PATCH_FIELDS)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Cable not found")
+    
+    if cable_type is not None or "cable_type_id" in payload:
+        payload["cable_type_id"] = _resolve_cable_type_id(
+            cable_type, payload.get("cable_type_id"), payload.get("fiber_count", current["fiber_count"]), db
+        )
+    if payload.get("fiber_count") is not None and not validate_fiber_count(payload["fiber_count"]):
+        raise HTTPException(status_code=400, detail="Invalid fiber count")
+    if not validate_distance(payload.get("distance_km")):
+        raise HTTPException(status_code=400, detail="Invalid distance")
+    
+    dirty = dirty_fields(current, payload)
+    if "from_object_id" in dirty or "to_object_id" in dirty:
+        from_object_id = dirty.get("from_object_id", current["from_object_id"])
+        to_object_id = dirty.get("to_object_id", current["to_object_id"])
+        found = db.query(NetworkObject.network_object_id).filter(
+            NetworkObject.network_object_id.in_([from_object_id, to_object_id])
+        ).count()
+        if found != len({from_object_id, to_object_id}):
+            raise HTTPException(status_code=400, detail="Endpoint object not found")
+        if "distance_km" not in payload:
+            distance_km = endpoint_distance_km(db, from_object_id, to_object_id)
+            if distance_km != current["distance_km"]:
+                dirty["distance_km"] = distance_km
+    
+    updated_at = write_dirty(db, Cable, "cable_id", cable_id, dirty)
+    if dirty:
+        events.mark_changed(db, events.CABLES_CHANGED, [cable_id])
+    db.commit()
+    return patch_response(cable_id, dirty, updated_at)
 
 
 @router.delete("/{cable_id}")
@@ -198,10 +225,11 @@ def delete_cable(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cable = db.query(Cable).filter(Cable.cable_id == cable_id).first()
+    """Delete cable with its splices (on both sides), fiber reservations, connections and region memberships"""
+    cable = db.query(Cable.cable_id).filter(Cable.cable_id == cable_id).first()
     if not cable:
         raise HTTPException(status_code=404, detail="Cable not found")
     
-    db.delete(cable)
+    deleted = delete_cables_cascade(db, [cable_id])
     db.commit()
-    return {"message": "Cable deleted successfully"}
\ No newline at end of file
+    return {"message": "Cable deleted successfully", "deleted": deleted}
\ No newline at end of file
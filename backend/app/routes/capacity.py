@@ -0,0 +1,67 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..models.user import User
+from ..models.region import Region, region_cables
+from ..schemas.topology import CapacitySearchResponse, CapacityRouteResponse
+from ..core.dependencies import get_current_user
+from ..services.capacity import capacity_index
+
+router = APIRouter(prefix="/api/capacity", tags=["capacity"])
+
+
+def _parse_bbox(bbox: str):
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimum must not exceed maximum")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@router.get("", response_model=CapacitySearchResponse)
+def search_capacity(
+    region_id: Optional[int] = None,
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    cable_type_id: Optional[List[int]] = Query(None),
+    min_free_fibers: Optional[int] = Query(None, ge=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cables with free fibers, most free first"""
+    cable_ids = None
+    if region_id is not None:
+        if not db.query(Region.region_id).filter(Region.region_id == region_id).first():
+            raise HTTPException(status_code=404, detail="Region not found")
+        cable_ids = db.scalars(select(region_cables.c.cable_id).where(region_cables.c.region_id == region_id)).all()
+    
+    return capacity_index.search(
+        db, cable_ids, _parse_bbox(bbox) if bbox else None, cable_type_id, min_free_fibers, limit, skip
+    )
+
+
+@router.get("/route", response_model=CapacityRouteResponse)
+def route_capacity(
+    from_object_id: int = Query(..., alias="from"),
+    to_object_id: int = Query(..., alias="to"),
+    min_free_fibers: int = Query(1, ge=1),
+    weight: Literal["distance", "hops"] = "distance",
+    cable_type_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Shortest path whose every cable still has the requested number of free fibers"""
+    capacity_index.graph.sync(db)
+    for object_id in (from_object_id, to_object_id):
+        if object_id not in capacity_index.graph.node_index:
+            raise HTTPException(status_code=404, detail=f"Network object {object_id} not found")
+    
+    route = capacity_index.route(db, from_object_id, to_object_id, min_free_fibers, weight, cable_type_id)
+    if route is None:
+        raise HTTPException(status_code=404, detail="No path with enough free fibers between these objects")
+    return route
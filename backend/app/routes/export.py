@@ -3,21 +3,48 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from ..database.database import get_db
 from ..models.network_object import NetworkObject
-from ..models.cable import Cable
+from ..models.object_type import ObjectType
 from ..models.fiber_splice import FiberSplice
+from ..services import projections
 import json
 from datetime import datetime
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
 
+def _object_rows(db: Session):
+    """Objects with their type name in one query"""
+    return db.query(
+        NetworkObject.network_object_id,
+        NetworkObject.name,
+        NetworkObject.object_type_id,
+        ObjectType.name.label("object_type"),
+        NetworkObject.latitude,
+        NetworkObject.longitude,
+        NetworkObject.address,
+        NetworkObject.description,
+        NetworkObject.created_at,
+        NetworkObject.updated_at,
+    ).outerjoin(
+        ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id
+    ).order_by(NetworkObject.network_object_id).all()
+
+
 @router.get("/full")
 def export_full_schema(db: Session = Depends(get_db)):
     """Export complete network schema as JSON with all objects, cables, and splices"""
     
-    objects = db.query(NetworkObject).all()
-    cables = db.query(Cable).all()
-    splices = db.query(FiberSplice).all()
+    objects = _object_rows(db)
+    cables = projections.list_cables(db)
+    splices = db.query(
+        FiberSplice.fiber_splices_id,
+        FiberSplice.cable_id,
+        FiberSplice.fiber_number,
+        FiberSplice.splice_to_cable_id,
+        FiberSplice.splice_to_fiber,
+        FiberSplice.loss_db,
+        FiberSplice.created_at,
+    ).order_by(FiberSplice.fiber_splices_id).all()
     
     export_data = {
         "version": "1.0",
@@ -27,31 +54,17 @@ def export_full_schema(db: Session = Depends(get_db)):
                 "id": obj.network_object_id,
                 "name": obj.name,
                 "object_type_id": obj.object_type_id,
-                "object_type": obj.object_type_obj.name if obj.object_type_obj else "unknown",
+                "object_type": obj.object_type or "unknown",
                 "latitude": obj.latitude,
                 "longitude": obj.longitude,
                 "address": obj.address,
                 "description": obj.description,
-                "created_at": obj.created_at.isoformat() if obj.created_at else None,
-                "updated_at": obj.updated_at.isoformat() if obj.updated_at else None
+                "created_at": projections.iso(obj.created_at),
+                "updated_at": projections.iso(obj.updated_at)
             }
             for obj in objects
         ],
-        "cables": [
-            {
-                "id": cable.cable_id,
-                "name": cable.name,
-                "cable_type_id": cable.cable_type_id,
-                "fiber_count": cable.fiber_count,
-                "from_object_id": cable.from_object_id,
-                "to_object_id": cable.to_object_id,
-                "distance_km": cable.distance_km,
-                "description": cable.description,
-                "created_at": cable.created_at.isoformat() if cable.created_at else None,
-                "updated_at": cable.updated_at.isoformat() if cable.updated_at else None
-            }
-            for cable in cables
-        ],
+        "cables": cables,
         "fiber_splices": [
             {
                 "id": splice.fiber_splices_id,
@@ -59,7 +72,8 @@ def export_full_schema(db: Session = Depends(get_db)):
                 "fiber_number": splice.fiber_number,
                 "splice_to_cable_id": splice.splice_to_cable_id,
                 "splice_to_fiber": splice.splice_to_fiber,
-                "created_at": splice.created_at.isoformat() if splice.created_at else None
+                "loss_db": splice.loss_db,
+                "created_at": projections.iso(splice.created_at)
             }
             for splice in splices
         ]
@@ -77,12 +91,14 @@ def export_full_schema(db: Session = Depends(get_db)):
 def export_geojson(db: Session = Depends(get_db)):
     """Export network objects as GeoJSON for mapping applications"""
     
-    objects = db.query(NetworkObject).all()
-    cables = db.query(Cable).all()
+    objects = _object_rows(db)
+    cables = projections.list_cables(db)
     
     features = []
+    positions = {}
     
     for obj in objects:
+        positions[obj.network_object_id] = [obj.longitude, obj.latitude]
         features.append({
             "type": "Feature",
             "geometry": {
@@ -98,25 +114,23 @@ def export_geojson(db: Session = Depends(get_db)):
         })
     
     for cable in cables:
-        from_obj = next((o for o in objects if o.network_object_id == cable.from_object_id), None)
-        to_obj = next((o for o in objects if o.network_object_id == cable.to_object_id), None)
+        from_position = positions.get(cable["from_object_id"])
+        to_position = positions.get(cable["to_object_id"])
         
-        if from_obj and to_obj:
+        if from_position and to_position:
             features.append({
                 "type": "Feature",
                 "geometry": {
                     "type": "LineString",
-                    "coordinates": [
-                        [from_obj.longitude, from_obj.latitude],
-                        [to_obj.longitude, to_obj.latitude]
-                    ]
+                    "coordinates": [from_position, to_position]
                 },
                 "properties": {
-                    "id": cable.cable_id,
-                    "name": cable.name,
-                    "cable_type": cable.cable_type,
-                    "fiber_count": cable.fiber_count,
-                    "distance_km": cable.distance_km,
+                    "id": cable["id"],
+                    "name": cable["name"],
+                    "cable_type": cable["cable_type_name"],
+                    "cable_type_id": cable["cable_type_id"],
+                    "fiber_count": cable["fiber_count"],
+                    "distance_km": cable["distance_km"],
                     "feature_type": "cable"
                 }
             })
@@ -1,27 +1,63 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..database.database import get_db
 from ..models.fiber_splice import FiberSplice
+from ..models.cable import Cable
 from ..models.user import User
-from ..schemas.fiber_splice import FiberSpliceCreate, FiberSpliceResponse
+from ..schemas.fiber_splice import (
+    FiberSpliceCreate, FiberSpliceUpdate, FiberSpliceResponse, FiberSpliceSet, FiberSpliceSetResponse
+)
+from ..schemas.patch import PatchResponse
+from ..core import events
 from ..core.dependencies import get_current_user
+from ..services.partial_update import load_row, dirty_fields, write_dirty, patch_response
+from ..services.splice_sets import replace_cable_splices, cable_splice_ids
+from ..services.splice_integrity import validate_splice_batch, scan_integrity
+from ..services.fiber_allocation import consume_reservations, lock_occupancy
 
 router = APIRouter(prefix="/api/fiber-splices", tags=["fiber_splices"])
 
+PATCH_FIELDS = ("cable_id", "fiber_number", "splice_to_fiber", "splice_to_cable_id", "loss_db")
+
+
+def _check_conflicts(db: Session, splices: list, replacing: tuple = (), allocation_id: Optional[str] = None):
+    lock_occupancy(db, [s["cable_id"] for s in splices] + [s.get("splice_to_cable_id") for s in splices])
+    conflicts = validate_splice_batch(db, splices, replacing, allocation_id)
+    if conflicts:
+        raise HTTPException(status_code=400, detail="; ".join(c["message"] for c in conflicts[:5]))
+    if allocation_id:
+        # зарезервированное волокно переходит к сварке
+        consume_reservations(db, allocation_id, splices)
+
 
 @router.post("/", response_model=FiberSpliceResponse)
 def create_fiber_splice(
     splice: FiberSpliceCreate, 
+    allocation_id: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_splice = FiberSplice(**splice.dict())
+    """Create a splice; fibers reserved by a fiber allocation need that allocation_id"""
+    data = splice.dict()
+    _check_conflicts(db, [data], allocation_id=allocation_id)
+    db_splice = FiberSplice(**data)
     db.add(db_splice)
+    events.mark_changed(db, events.SPLICES_CHANGED, [data["cable_id"], data["splice_to_cable_id"]])
     db.commit()
     db.refresh(db_splice)
     return db_splice
 
 
+@router.get("/integrity")
+def check_splice_integrity(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Scan all splices for missing cables, fibers beyond fiber_count, fibers used twice and spliced reserved fibers"""
+    return scan_integrity(db)
+
+
 @router.get("/{splice_id}", response_model=FiberSpliceResponse)
 def get_fiber_splice(
     splice_id: int, 
@@ -44,6 +80,35 @@ def get_cable_fiber_splices(
     return splices
 
 
+@router.put("/cable/{cable_id}", response_model=FiberSpliceSetResponse)
+def replace_cable_fiber_splices(
+    cable_id: int,
+    splice_set: FiberSpliceSet,
+    allocation_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace all splices of a cable with the given set, writing only the difference"""
+    if not db.query(Cable.cable_id).filter(Cable.cable_id == cable_id).first():
+        raise HTTPException(status_code=404, detail="Cable not found")
+    
+    desired = [item.model_dump() for item in splice_set.splices]
+    lock_occupancy(db, [cable_id] + [item["splice_to_cable_id"] for item in desired])
+    # набор целиком заменяет исходящие сварки кабеля, поэтому они не считаются занятыми
+    splices = [{"cable_id": cable_id, **item} for item in desired]
+    conflicts = validate_splice_batch(db, splices, replacing=cable_splice_ids(db, cable_id), allocation_id=allocation_id)
+    if conflicts:
+        raise HTTPException(status_code=400, detail={
+            "message": f"{len(conflicts)} splice conflicts", "conflicts": conflicts
+        })
+    if allocation_id:
+        consume_reservations(db, allocation_id, splices)
+    
+    result = replace_cable_splices(db, cable_id, desired)
+    db.commit()
+    return result
+
+
 @router.get("/", response_model=list[FiberSpliceResponse])
 def list_fiber_splices(
     skip: int = 0, 
@@ -62,6 +127,7 @@ def list_fiber_splices(
 def update_fiber_splice(
     splice_id: int, 
     splice_update: FiberSpliceCreate, 
+    allocation_id: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -69,14 +135,48 @@ def update_fiber_splice(
     if not splice:
         raise HTTPException(status_code=404, detail="Fiber splice not found")
     
+    _check_conflicts(db, [splice_update.dict()], replacing=(splice_id,), allocation_id=allocation_id)
+    events.mark_changed(db, events.SPLICES_CHANGED, [splice.cable_id, splice.splice_to_cable_id])
     for key, value in splice_update.dict().items():
         setattr(splice, key, value)
     
+    events.mark_changed(db, events.SPLICES_CHANGED, [splice.cable_id, splice.splice_to_cable_id])
     db.commit()
     db.refresh(splice)
     return splice
 
 
+@router.patch("/{splice_id}", response_model=PatchResponse)
+def patch_fiber_splice(
+    splice_id: int,
+    splice_patch: FiberSpliceUpdate,
+    allocation_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update only the supplied fields; nothing is written when they match the stored values"""
+    payload = splice_patch.model_dump(exclude_unset=True)
+    for field in ("cable_id", "fiber_number", "splice_to_fiber"):
+        if field in payload and payload[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+    
+    current = load_row(db, FiberSplice, "fiber_splices_id", splice_id, PATCH_FIELDS)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Fiber splice not found")
+    
+    dirty = dirty_fields(current, payload)
+    if dirty:
+        _check_conflicts(db, [{**current, **dirty}], replacing=(splice_id,), allocation_id=allocation_id)
+    updated_at = write_dirty(db, FiberSplice, "fiber_splices_id", splice_id, dirty)
+    if dirty:
+        new = {**current, **dirty}
+        events.mark_changed(db, events.SPLICES_CHANGED, [
+            current["cable_id"], current["splice_to_cable_id"], new["cable_id"], new["splice_to_cable_id"]
+        ])
+    db.commit()
+    return patch_response(splice_id, dirty, updated_at)
+
+
 @router.delete("/{splice_id}")
 def delete_fiber_splice(
     splice_id: int, 
@@ -88,6 +188,7 @@ def delete_fiber_splice(
         raise HTTPException(status_code=404, detail="Fiber splice not found")
     
     db.delete(splice)
+    events.mark_changed(db, events.SPLICES_CHANGED, [splice.cable_id, splice.splice_to_cable_id])
     db.commit()
     return {"message": "Fiber splice deleted successfully"}
 
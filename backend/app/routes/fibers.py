@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..models.user import User
+from ..schemas.fiber_allocation import FiberAllocationRequest, FiberAllocationResponse
+from ..core.dependencies import get_current_user
+from ..services.fiber_allocation import AllocationConflict, allocate_fibers, release_allocation, resolve_path
+
+router = APIRouter(prefix="/api/fibers", tags=["fibers"])
+
+
+@router.post("/allocate", response_model=FiberAllocationResponse)
+def allocate(
+    request: FiberAllocationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Atomically reserve free fibers on a cable or along a path"""
+    amount = request.count if request.count is not None else len(request.fiber_numbers)
+    try:
+        if request.cable_id is not None:
+            cable_ids = [request.cable_id]
+        elif request.cable_ids is not None:
+            cable_ids = request.cable_ids
+        else:
+            cable_ids = resolve_path(db, request.from_object_id, request.to_object_id, amount)
+        return allocate_fibers(
+            db, cable_ids, request.count, request.fiber_numbers, request.contiguous,
+            request.label, current_user.user_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except AllocationConflict as e:
+        raise HTTPException(status_code=409, detail={"message": e.message, "conflicts": e.conflicts})
+
+
+@router.delete("/allocations/{allocation_id}")
+def release(
+    allocation_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Release every fiber reserved by an allocation"""
+    released = release_allocation(db, allocation_id)
+    if not released:
+        raise HTTPException(status_code=404, detail="Allocation not found")
+    return {"message": "Allocation released", "released_fibers": released}
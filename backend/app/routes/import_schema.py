@@ -1,132 +1,72 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
 from sqlalchemy.orm import Session
+from ..core.config import settings
 from ..database.database import get_db
-from ..models.network_object import NetworkObject
-from ..models.cable import Cable
-from ..models.fiber_splice import FiberSplice
+from ..models.import_job import ImportJob
+from ..schemas.import_job import ImportJobResponse
+from ..services.importers import ImportContext, schema_stages, geojson_stages
+from ..services.import_diff import diff_schema, diff_geojson
+from ..services.import_validation import validate_stages
+from ..services import import_jobs
 import json
+from datetime import datetime
 
 router = APIRouter(prefix="/api/import", tags=["import"])
 
 
+IMPORT_MODE_PATTERN = "^(import|diff|upsert)$"
+
+
 @router.post("/schema")
-async def import_schema(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Import network schema from JSON file"""
+async def import_schema(
+    file: UploadFile = File(...),
+    mode: str = Query("import", pattern=IMPORT_MODE_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """Import network schema from JSON file.
+
+    mode=diff only reports what would change; mode=upsert writes only the rows whose content hash changed.
+    """
     
     try:
         contents = await file.read()
         data = json.loads(contents)
         
-        imported_counts = {
-            "objects": 0,
-            "cables": 0,
-            "splices": 0
-        }
-        
-        object_id_map = {} 
-        
-        if "objects" in data:
-            for obj_data in data["objects"]:
-                existing = db.query(NetworkObject).filter(
-                    NetworkObject.name == obj_data["name"]
-                ).first()
-                
-                if not existing:
-                    object_type_value = obj_data.get("object_type_id")
-                    if not object_type_value:
-                        from ..models.object_type import ObjectType
-                        obj_type_name = obj_data.get("object_type", "node")
-                        obj_type = db.query(ObjectType).filter(ObjectType.name == obj_type_name).first()
-                        object_type_value = obj_type.object_type_id if obj_type else 1
-                    
-                    new_obj = NetworkObject(
-                        name=obj_data["name"],
-                        object_type_id=object_type_value,
-                        latitude=obj_data.get("latitude"),
-                        longitude=obj_data.get("longitude"),
-                        address=obj_data.get("address"),
-                        description=obj_data.get("description")
-                    )
-                    db.add(new_obj)
-                    db.flush()
-                    object_id_map[obj_data["id"]] = new_obj.network_object_id
-                    imported_counts["objects"] += 1
-                else:
-                    object_id_map[obj_data["id"]] = existing.network_object_id
-        
-        db.commit()
-        
-        if "cables" in data:
-            for cable_data in data["cables"]:
-                from_obj_id = object_id_map.get(cable_data["from_object_id"])
-                to_obj_id = object_id_map.get(cable_data["to_object_id"])
-                
-                if from_obj_id and to_obj_id:
-                    existing = db.query(Cable).filter(
-                        Cable.name == cable_data["name"]
-                    ).first()
-                    
-                    if not existing:
-                        cable_type_id = cable_data.get("cable_type_id", 1)
-                        
-                        new_cable = Cable(
-                            name=cable_data["name"],
-                            cable_type_id=cable_type_id,
-                            fiber_count=cable_data.get("fiber_count", 1),
-                            from_object_id=from_obj_id,
-                            to_object_id=to_obj_id,
-                            distance_km=cable_data.get("distance_km"),
-                            description=cable_data.get("description")
-                        )
-                        db.add(new_cable)
-                        db.flush()
-                        imported_counts["cables"] += 1
-        
-        db.commit()
-        
-        cable_id_map = {}  
-       
-        if "cables" in data:
-            for cable_data in data["cables"]:
-                from_obj_id = object_id_map.get(cable_data["from_object_id"])
-                to_obj_id = object_id_map.get(cable_data["to_object_id"])
-                
-                if from_obj_id and to_obj_id:
-                    cable = db.query(Cable).filter(
-                        Cable.name == cable_data["name"],
-                        Cable.from_object_id == from_obj_id,
-                        Cable.to_object_id == to_obj_id
-                    ).first()
-                    
-                    if cable:
-                        cable_id_map[cable_data["id"]] = cable.cable_id
-        
-        if "fiber_splices" in data:
-            for splice_data in data["fiber_splices"]:
-                from_cable_id = cable_id_map.get(splice_data["cable_id"])
-                to_cable_id = cable_id_map.get(splice_data["splice_to_cable_id"])
-                
-                if from_cable_id and to_cable_id:
-                    new_splice = FiberSplice(
-                        cable_id=from_cable_id,
-                        fiber_number=splice_data["fiber_number"],
-                        splice_to_cable_id=to_cable_id,
-                        splice_to_fiber=splice_data["splice_to_fiber"]
-                    )
-                    db.add(new_splice)
-                    imported_counts["splices"] += 1
-        
-        db.commit()
+        ctx = ImportContext(db)
+        if mode != "import":
+            report = diff_schema(ctx, data, apply=mode == "upsert")
+            if mode == "upsert":
+                db.commit()
+            else:
+                db.rollback()
+            return {"status": "success", "mode": mode, "diff": report}
+        
+        stages = schema_stages(data)
+        validation = validate_stages(stages)
+        for stage, records, handler in stages:
+            for row in validation.clean(stage, records):
+                handler(ctx, row)
+            db.commit()
         
         return {
             "status": "success",
             "message": "Schema imported successfully",
-            "imported": imported_counts
+            "imported": {
+                "objects": ctx.counts.get("objects", 0),
+                "cables": ctx.counts.get("cables", 0),
+                "splices": ctx.counts.get("splices", 0),
+                "splices_existing": ctx.counts.get("splices_existing", 0),
+                "splices_conflicting": ctx.counts.get("splices_conflicting", 0),
+                "splices_out_of_range": ctx.counts.get("splices_out_of_range", 0),
+                "splices_reserved": ctx.counts.get("splices_reserved", 0)
+            },
+            "validation": validation.to_dict()
         }
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON file")
     except KeyError as e:
+        db.rollback()
         raise HTTPException(status_code=400, detail=f"Missing required field: {str(e)}")
     except Exception as e:
         db.rollback()
@@ -134,8 +74,16 @@ async def import_schema(file: UploadFile = File(...), db: Session = Depends(get_
 
 
 @router.post("/geojson")
-async def import_geojson(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Import network schema from GeoJSON file"""
+async def import_geojson(
+    file: UploadFile = File(...),
+    snap_tolerance_m: float = Query(settings.IMPORT_SNAP_TOLERANCE_M, ge=0),
+    mode: str = Query("import", pattern=IMPORT_MODE_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """Import network schema from GeoJSON file.
+
+    mode=diff only reports what would change; mode=upsert writes only the rows whose content hash changed.
+    """
     
     try:
         contents = await file.read()
@@ -144,89 +92,133 @@ async def import_geojson(file: UploadFile = File(...), db: Session = Depends(get
         if geojson.get("type") != "FeatureCollection":
             raise HTTPException(status_code=400, detail="Invalid GeoJSON: must be FeatureCollection")
         
-        imported_counts = {
-            "objects": 0,
-            "cables": 0
-        }
-        
-        features = geojson.get("features", [])
-        object_mapping = {}  
-        
-        for feature in features:
-            if feature.get("properties", {}).get("feature_type") == "network_object":
-                props = feature["properties"]
-                geom = feature.get("geometry", {})
-                
-                if geom.get("type") == "Point":
-                    coords = geom.get("coordinates", [0, 0])
-                    
-                    existing = db.query(NetworkObject).filter(
-                        NetworkObject.name == props["name"]
-                    ).first()
-                    
-                    if not existing:
-                        new_obj = NetworkObject(
-                            name=props["name"],
-                            object_type=props.get("type", "node"),
-                            longitude=coords[0],
-                            latitude=coords[1]
-                        )
-                        db.add(new_obj)
-                        db.flush()  
-                        object_mapping[props["id"]] = new_obj.network_object_id
-                        imported_counts["objects"] += 1
-        
-        db.commit()
-        
-        for feature in features:
-            if feature.get("properties", {}).get("feature_type") == "cable":
-                props = feature["properties"]
-                geom = feature.get("geometry", {})
-                
-                if geom.get("type") == "LineString":
-                    coords = geom.get("coordinates", [])
-                    
-                    if len(coords) >= 2:
-                        from_coords = coords[0]
-                        to_coords = coords[-1]
-                        
-                        from_obj = db.query(NetworkObject).filter(
-                            NetworkObject.longitude == from_coords[0],
-                            NetworkObject.latitude == from_coords[1]
-                        ).first()
-                        
-                        to_obj = db.query(NetworkObject).filter(
-                            NetworkObject.longitude == to_coords[0],
-                            NetworkObject.latitude == to_coords[1]
-                        ).first()
-                        
-                        if from_obj and to_obj:
-                            existing = db.query(Cable).filter(
-                                Cable.name == props["name"]
-                            ).first()
-                            
-                            if not existing:
-                                new_cable = Cable(
-                                    name=props["name"],
-                                    cable_type=props.get("cable_type", "optical"),
-                                    fiber_count=props.get("fiber_count", 1),
-                                    from_object_id=from_obj.network_object_id,
-                                    to_object_id=to_obj.network_object_id,
-                                    distance_km=props.get("distance_km")
-                                )
-                                db.add(new_cable)
-                                imported_counts["cables"] += 1
-        
-        db.commit()
+        ctx = ImportContext(db, snap_tolerance_m=snap_tolerance_m)
+        if mode != "import":
+            report = diff_geojson(ctx, geojson, apply=mode == "upsert")
+            if mode == "upsert":
+                db.commit()
+            else:
+                db.rollback()
+            return {"status": "success", "mode": mode, "diff": report}
+        
+        stages = geojson_stages(geojson)
+        validation = validate_stages(stages)
+        for stage, records, handler in stages:
+            for feature in validation.clean(stage, records):
+                handler(ctx, feature)
+            db.commit()
         
         return {
             "status": "success",
             "message": "GeoJSON imported successfully",
-            "imported": imported_counts
+            "imported": {
+                "objects": ctx.counts.get("objects", 0),
+                "cables": ctx.counts.get("cables", 0)
+            },
+            "endpoints": {
+                "matched": ctx.counts.get("endpoints_matched", 0),
+                "snapped": ctx.counts.get("endpoints_snapped", 0),
+                "unmatched": ctx.counts.get("endpoints_unmatched", 0)
+            },
+            "validation": validation.to_dict()
         }
         
+    except HTTPException:
+        raise
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid GeoJSON file")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Import error: {str(e)}")
+
+
+def _job_to_response(job: ImportJob) -> dict:
+    """Convert ImportJob ORM to response dict with decoded checkpoint and progress"""
+    checkpoint = json.loads(job.checkpoint) if job.checkpoint else {}
+    stage_names = import_jobs.STAGE_NAMES.get(job.kind, [])
+    stage = stage_names[job.stage_index] if job.stage_index < len(stage_names) else None
+    progress = job.processed / job.total if job.total else (1.0 if job.status == "completed" else 0.0)
+    return {
+        'id': job.import_job_id,
+        'kind': job.kind,
+        'status': job.status,
+        'active': import_jobs.is_active(job.import_job_id),
+        'filename': job.filename,
+        'chunk_size': job.chunk_size,
+        'stage': stage,
+        'offset': job.offset,
+        'processed': job.processed,
+        'total': job.total,
+        'progress': round(progress, 4),
+        'counts': checkpoint.get('counts', {}),
+        'error_count': job.error_count,
+        'errors': json.loads(job.errors) if job.errors else [],
+        'message': job.message,
+        'created_at': job.created_at,
+        'updated_at': job.updated_at,
+        'finished_at': job.finished_at
+    }
+
+
+def _get_job_or_404(job_id: int, db: Session) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.import_job_id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.post("/jobs", response_model=ImportJobResponse)
+def create_import_job(
+    file: UploadFile = File(...),
+    kind: str = Query("schema", pattern="^(schema|geojson)$"),
+    chunk_size: int = Query(settings.IMPORT_CHUNK_SIZE, ge=1),
+    snap_tolerance_m: float = Query(settings.IMPORT_SNAP_TOLERANCE_M, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Start a background import that commits in chunks and can be resumed"""
+    job = import_jobs.create_job(db, kind, file.filename, file.file, chunk_size, snap_tolerance_m)
+    import_jobs.submit_job(job.import_job_id)
+    return _job_to_response(job)
+
+
+@router.get("/jobs", response_model=list[ImportJobResponse])
+def list_import_jobs(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+    """List import jobs, newest first"""
+    jobs = db.query(ImportJob).order_by(ImportJob.import_job_id.desc()).offset(skip).limit(limit).all()
+    return [_job_to_response(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+def get_import_job(job_id: int, db: Session = Depends(get_db)):
+    """Import job progress, checkpoint and per-row errors"""
+    return _job_to_response(_get_job_or_404(job_id, db))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ImportJobResponse)
+def cancel_import_job(job_id: int, db: Session = Depends(get_db)):
+    """Stop the job after the current chunk; committed chunks are kept"""
+    job = _get_job_or_404(job_id, db)
+    if job.status not in ("pending", "running"):
+        raise HTTPException(status_code=400, detail=f"Cannot cancel job with status '{job.status}'")
+    
+    job.status = "cancelled"
+    job.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(job)
+    return _job_to_response(job)
+
+
+@router.post("/jobs/{job_id}/resume", response_model=ImportJobResponse)
+def resume_import_job(job_id: int, db: Session = Depends(get_db)):
+    """Continue a cancelled, failed or interrupted job from its last checkpoint"""
+    job = _get_job_or_404(job_id, db)
+    if not import_jobs.can_resume(job):
+        raise HTTPException(status_code=400, detail=f"Cannot resume job with status '{job.status}'")
+    
+    job.status = "pending"
+    job.message = None
+    job.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(job)
+    import_jobs.submit_job(job.import_job_id)
+    return _job_to_response(job)
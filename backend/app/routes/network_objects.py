@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 from ..database.database import get_db
 from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
 from ..models.region import Region
 from ..models.user import User
-from ..schemas.network_object import NetworkObjectCreate, NetworkObjectResponse
+from ..schemas.network_object import (
+    NetworkObjectCreate, NetworkObjectUpdate, NetworkObjectResponse, PositionBatch,
+    NearestResponse, NearestBatchRequest, NearestBatchResponse,
+)
+from ..schemas.patch import PatchResponse
+from ..schemas.batch import NetworkObjectBatchRequest, BatchResponse
+from ..core import events
 from ..core.dependencies import get_current_user
+from ..services.batch_edit import apply_object_batch
+from ..services.cable_distances import propagate_object_moves
+from ..services.cascade_delete import delete_objects_cascade
+from ..services.object_index import object_index
+from ..services.position_buffer import position_buffer
+from ..services.partial_update import load_row, dirty_fields, write_dirty, patch_response
+from ..utils.validators import validate_coordinates
 
 router = APIRouter(prefix="/api/network-objects", tags=["network_objects"])
 
+PATCH_FIELDS = ("name", "object_type_id", "latitude", "longitude", "address", "description")
+
 
 @router.get("/", response_model=list[NetworkObjectResponse])
 def list_network_objects_public(
@@ -36,6 +53,8 @@ def create_network_object(
     
     db_obj = NetworkObject(**obj.model_dump())
     db.add(db_obj)
+    db.flush()
+    events.mark_changed(db, events.OBJECTS_CHANGED, [db_obj.network_object_id])
     db.commit()
     db.refresh(db_obj)
     
@@ -52,6 +71,7 @@ def create_network_object(
                         f"VALUES ({region.region_id}, {db_obj.network_object_id})"
                     ))
                     region.updated_at = datetime.utcnow()
+                    events.mark_changed(db, events.REGIONS_CHANGED, [region.region_id])
                     db.commit()
                     print(f"Added object {db_obj.network_object_id} to region {region.region_id}")
                     break
@@ -67,6 +87,62 @@ def create_network_object(
     return db_obj
 
 
+@router.post("/batch", response_model=BatchResponse)
+def batch_network_objects(
+    batch: NetworkObjectBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create, update and delete objects in one transaction with per-item results; deletes cascade like ?cascade=true"""
+    try:
+        return apply_object_batch(db, batch.operations, atomic=batch.atomic)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Batch error: {str(e)}")
+
+
+@router.post("/positions", status_code=202)
+def queue_positions(
+    batch: PositionBatch,
+    current_user: User = Depends(get_current_user)
+):
+    """Queue object moves; only the latest position per object is written, in one transaction per flush"""
+    result = position_buffer.submit((move.id, move.latitude, move.longitude) for move in batch.moves)
+    if batch.flush:
+        flushed = position_buffer.flush()
+        if "error" in flushed:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Position flush failed, {flushed['requeued']} moves requeued: {flushed['error']}"
+            )
+        result["flushed"] = flushed
+    return result
+
+
+@router.get("/nearest", response_model=NearestResponse)
+def nearest_network_objects(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=100),
+    max_m: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """k nearest objects to a point by great-circle distance, optionally within max_m metres"""
+    return object_index.nearest(db, [(lat, lon)], k, max_m)["points"][0]
+
+
+@router.post("/nearest/batch", response_model=NearestBatchResponse)
+def nearest_network_objects_batch(
+    request: NearestBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Nearest objects for many points against the same index, e.g. snapping a drawn polyline"""
+    points = [(point.latitude, point.longitude) for point in request.points]
+    return object_index.nearest(db, points, request.k, request.max_m)
+
+
 @router.get("/{object_id}", response_model=NetworkObjectResponse)
 def get_network_object(
     object_id: int, 
@@ -90,26 +166,91 @@ def update_network_object(
     if not obj:
         raise HTTPException(status_code=404, detail="Object not found")
     
+    old_position = (obj.latitude, obj.longitude)
     for key, value in obj_update.model_dump().items():
         setattr(obj, key, value)
     
     obj.updated_at = datetime.utcnow()
+    if (obj.latitude, obj.longitude) != old_position:
+        # длины подключенных кабелей пересчитываются в этой же транзакции
+        db.flush()
+        propagate_object_moves(db, [object_id])
+    else:
+        events.mark_changed(db, events.OBJECTS_CHANGED, [object_id])
     db.commit()
     db.refresh(obj)
     return obj
 
 
+@router.patch("/{object_id}", response_model=PatchResponse)
+def patch_network_object(
+    object_id: int,
+    obj_patch: NetworkObjectUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update only the supplied fields; nothing is written when they match the stored values"""
+    payload = obj_patch.model_dump(exclude_unset=True)
+    for field in ("name", "object_type_id"):
+        if field in payload and payload[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+    
+    current = load_row(db, NetworkObject, "network_object_id", object_id, PATCH_FIELDS)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Object not found")
+    
+    dirty = dirty_fields(current, payload)
+    if "name" in dirty:
+        existing = db.query(NetworkObject.network_object_id).filter(
+            NetworkObject.name == dirty["name"],
+            NetworkObject.network_object_id != object_id
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Object with this name already exists")
+    if "object_type_id" in dirty:
+        if not db.query(ObjectType.object_type_id).filter(ObjectType.object_type_id == dirty["object_type_id"]).first():
+            raise HTTPException(status_code=400, detail="Object type not found")
+    
+    moved = "latitude" in dirty or "longitude" in dirty
+    if moved:
+        latitude = dirty.get("latitude", current["latitude"])
+        longitude = dirty.get("longitude", current["longitude"])
+        if (latitude is not None or longitude is not None) and not validate_coordinates(latitude, longitude):
+            raise HTTPException(status_code=400, detail="Invalid coordinates")
+    
+    updated_at = write_dirty(db, NetworkObject, "network_object_id", object_id, dirty)
+    affected_cable_ids = []
+    if moved:
+        affected_cable_ids = propagate_object_moves(db, [object_id])
+    elif dirty:
+        events.mark_changed(db, events.OBJECTS_CHANGED, [object_id])
+    db.commit()
+    return patch_response(object_id, dirty, updated_at, affected_cable_ids=affected_cable_ids)
+
+
 @router.delete("/{object_id}")
 def delete_network_object(
     object_id: int, 
+    cascade: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """Delete object; cascade=true also removes its cables, splices, connections and region memberships"""
     obj = db.query(NetworkObject).options(selectinload(NetworkObject.object_type_obj)).filter(NetworkObject.network_object_id == object_id).first()
     if not obj:
         raise HTTPException(status_code=404, detail="Object not found")
     
+    if cascade:
+        try:
+            deleted = delete_objects_cascade(db, [object_id])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Error deleting object: {str(e)}")
+        return {"message": "Object deleted successfully", "deleted": deleted}
+    
     db.delete(obj)
+    events.mark_changed(db, events.OBJECTS_CHANGED, [object_id])
     db.commit()
     return {"message": "Object deleted successfully"}
 
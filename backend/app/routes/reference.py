@@ -5,6 +5,7 @@ from ..models.cable_type import CableType as CableTypeModel
 from ..models.object_type import ObjectType as ObjectTypeModel
 from ..schemas.cable_type import CableType as CableTypeSchema, CableTypeCreate
 from ..schemas.object_type import ObjectType as ObjectTypeSchema, ObjectTypeCreate
+from ..services.cable_types import cable_type_resolver
 
 router = APIRouter(prefix="/api/reference", tags=["reference"])
 
@@ -29,6 +30,7 @@ def create_cable_type(cable_type: CableTypeCreate, db: Session = Depends(get_db)
     db.add(db_cable_type)
     db.commit()
     db.refresh(db_cable_type)
+    cable_type_resolver.rebuild(db)
     return db_cable_type
 
 
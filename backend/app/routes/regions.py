@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -7,6 +8,8 @@ from ..database.database import get_db
 from ..models.region import Region
 from ..models.network_object import NetworkObject
 from ..models.cable import Cable
+from ..core import events
+from ..services import projections
 from ..schemas.region import RegionCreate, RegionResponse, RegionWithObjects, RegionUpdate
 
 router = APIRouter(prefix="/api/regions", tags=["regions"])
@@ -65,19 +68,10 @@ def get_region(region_id: int, db: Session = Depends(get_db)):
         network_objects.append(obj_dict)
     
     
-    region_cables_result = db.execute(text(
-        f"SELECT c.* FROM cables c "
-        f"INNER JOIN region_cables rc ON c.cable_id = rc.cable_id "
-        f"WHERE rc.region_id = {region_id}"
-    )).fetchall()
-    
-    cables = []
-    for row in region_cables_result:
-        cable_dict = dict(row._mapping) if hasattr(row, '_mapping') else row
-        
-        if 'cable_id' in cable_dict:
-            cable_dict['id'] = cable_dict['cable_id']
-        cables.append(cable_dict)
+    cables = [
+        {**cable, 'cable_id': cable['id']}
+        for cable in projections.list_region_cables(db, region_id)
+    ]
     
    
     response = {
@@ -109,6 +103,7 @@ def update_region(region_id: int, region: RegionUpdate, db: Session = Depends(ge
     for key, value in region.dict(exclude_unset=True).items():
         setattr(db_region, key, value)
     
+    events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
     db.commit()
     db.refresh(db_region)
     return db_region
@@ -122,6 +117,7 @@ def delete_region(region_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Region not found")
     
     db.delete(db_region)
+    events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
     db.commit()
     return {"message": "Region deleted"}
 
@@ -143,6 +139,7 @@ def add_object_to_region(region_id: int, object_id: int, db: Session = Depends(g
             f"VALUES ({region_id}, {object_id})"
         ))
         region.updated_at = datetime.utcnow()
+        events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -167,6 +164,7 @@ def remove_object_from_region(region_id: int, object_id: int, db: Session = Depe
             f"DELETE FROM region_objects WHERE region_id = {region_id} AND network_object_id = {object_id}"
         ))
         region.updated_at = datetime.utcnow()
+        events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -203,6 +201,7 @@ def add_cable_to_region(region_id: int, cable_id: int, db: Session = Depends(get
             f"VALUES ({region_id}, {cable_id})"
         ))
         region.updated_at = datetime.utcnow()
+        events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -227,6 +226,7 @@ def remove_cable_from_region(region_id: int, cable_id: int, db: Session = Depend
             f"DELETE FROM region_cables WHERE region_id = {region_id} AND cable_id = {cable_id}"
         ))
         region.updated_at = datetime.utcnow()
+        events.mark_changed(db, events.REGIONS_CHANGED, [region_id])
         db.commit()
     except Exception as e:
         db.rollback()
@@ -262,12 +262,7 @@ def get_region_cables(region_id: int, db: Session = Depends(get_db)):
     if not region:
         raise HTTPException(status_code=404, detail="Region not found")
     
-    return [
-        {
-            "cable_id": cable.cable_id,
-            "name": cable.name,
-            "from_object_id": cable.from_object_id,
-            "to_object_id": cable.to_object_id,
-        }
-        for cable in region.cables
-    ]
+    return JSONResponse([
+        {**cable, "cable_id": cable["id"]}
+        for cable in projections.list_region_cables(db, region_id)
+    ])
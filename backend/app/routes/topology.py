@@ -0,0 +1,153 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..models.user import User
+from ..models.region import Region, region_objects
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from ..schemas.topology import (
+    TopologyPathResponse, ResilienceResponse, ImpactRequest, ImpactResponse, PonTreeResponse,
+    DiversePathsResponse, DiversityAuditRequest, DiversityAuditResponse,
+)
+from ..core.dependencies import get_current_user
+from ..services.topology import topology_graph
+from ..services.resilience import resilience_analyzer
+from ..services.outage_impact import outage_impact, SUBSCRIBER_TYPE
+from ..services.pon_tree import pon_trees
+from ..services.diverse_paths import diverse_paths
+
+router = APIRouter(prefix="/api/topology", tags=["topology"])
+
+
+@router.get("/path", response_model=TopologyPathResponse)
+def shortest_path(
+    from_object_id: int = Query(..., alias="from"),
+    to_object_id: int = Query(..., alias="to"),
+    weight: Literal["distance", "hops"] = "distance",
+    cable_type_id: Optional[List[int]] = Query(None),
+    min_free_fibers: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Shortest path between two objects by cable length or by number of cables"""
+    topology_graph.sync(db)
+    for object_id in (from_object_id, to_object_id):
+        if object_id not in topology_graph.node_index:
+            raise HTTPException(status_code=404, detail=f"Network object {object_id} not found")
+    
+    path = topology_graph.shortest_path(from_object_id, to_object_id, weight, cable_type_id, min_free_fibers)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No path between these objects")
+    return path
+
+
+@router.get("/resilience", response_model=ResilienceResponse)
+def resilience(
+    region_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=100000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cables (bridges) and objects (articulation points) whose loss splits the network"""
+    if region_id is not None and not db.query(Region.region_id).filter(Region.region_id == region_id).first():
+        raise HTTPException(status_code=404, detail="Region not found")
+    
+    result = resilience_analyzer.analyze(db, region_id)
+    lists = ("components", "bridges", "articulation_points")
+    return {
+        **result,
+        **{key: result[key][:limit] for key in lists},
+        "bridge_count": len(result["bridges"]),
+        "articulation_count": len(result["articulation_points"]),
+        "truncated": any(len(result[key]) > limit for key in lists),
+    }
+
+
+@router.post("/impact", response_model=ImpactResponse)
+def outage_impact_query(
+    request: ImpactRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Subscribers cut off from every source by the given failed cables and objects"""
+    if not request.cable_ids and not request.object_ids:
+        raise HTTPException(status_code=400, detail="Specify at least one failed cable or object")
+    return outage_impact.impact(
+        db, request.cable_ids, request.object_ids, request.source_object_ids, request.fiber_aware
+    )
+
+
+@router.get("/pon-trees", response_model=PonTreeResponse)
+def pon_tree_analysis(
+    object_id: Optional[List[int]] = Query(None),
+    source_object_id: Optional[int] = None,
+    object_type: Optional[str] = None,
+    connected: Optional[bool] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=100000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Downstream subscriber count, depth and cable length for every splitter and node"""
+    result = pon_trees.analyze(db)
+    items = result["items"]
+    if object_id:
+        wanted = set(object_id)
+        items = [item for item in items if item["object_id"] in wanted]
+    if source_object_id is not None:
+        items = [item for item in items if item["source_object_id"] == source_object_id]
+    if object_type is not None:
+        items = [item for item in items if item["object_type"] == object_type]
+    if connected is not None:
+        items = [item for item in items if item["connected"] == connected]
+
+    page = items[skip:skip + limit]
+    names = {}
+    ids = [item["object_id"] for item in page]
+    for i in range(0, len(ids), 500):
+        names.update(db.query(NetworkObject.network_object_id, NetworkObject.name).filter(
+            NetworkObject.network_object_id.in_(ids[i:i + 500])
+        ).all())
+    return {
+        **result,
+        "total": len(items),
+        "items": [{**item, "name": names.get(item["object_id"])} for item in page],
+    }
+
+
+@router.get("/diverse-paths", response_model=DiversePathsResponse)
+def diverse_path_pair(
+    from_object_id: int = Query(..., alias="from"),
+    to_object_id: int = Query(..., alias="to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Two shortest cable paths between two objects that share no cable"""
+    if from_object_id == to_object_id:
+        raise HTTPException(status_code=400, detail="from and to must be different objects")
+    try:
+        return diverse_paths.pair(db, from_object_id, to_object_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Network object {e.args[0]} not found")
+
+
+@router.post("/diverse-paths/audit", response_model=DiversityAuditResponse)
+def diverse_path_audit(
+    request: DiversityAuditRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Check route diversity for many customer/core pairs in one batch"""
+    pairs = [(pair.from_object_id, pair.to_object_id) for pair in request.pairs]
+    if request.region_id is not None:
+        if not db.query(Region.region_id).filter(Region.region_id == request.region_id).first():
+            raise HTTPException(status_code=404, detail="Region not found")
+        subscribers = db.query(region_objects.c.network_object_id).join(
+            NetworkObject, NetworkObject.network_object_id == region_objects.c.network_object_id
+        ).join(ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id).filter(
+            region_objects.c.region_id == request.region_id, ObjectType.name == SUBSCRIBER_TYPE
+        ).all()
+        pairs.extend((object_id, request.to_object_id) for object_id, in subscribers)
+    pairs = [pair for pair in pairs if pair[0] != pair[1]]
+    return diverse_paths.audit(db, pairs, request.only_failures)
@@ -0,0 +1,81 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..models.network_object import NetworkObject
+from ..models.user import User
+from ..schemas.trace import FiberTraceResponse, FiberLocateResponse, LossBudgetRequest, LossBudgetResponse
+from ..core.dependencies import get_current_user
+from ..services.fiber_graph import fiber_graph
+from ..services.loss_budget import loss_budget
+
+router = APIRouter(prefix="/api/trace", tags=["trace"])
+
+
+@router.get("/cable/{cable_id}/fiber/{fiber_number}", response_model=FiberTraceResponse)
+def trace_fiber(
+    cable_id: int,
+    fiber_number: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Follow a fiber through its splices to both ends"""
+    fiber_graph.sync(db)
+    cable = fiber_graph.cable(cable_id)
+    if cable is None:
+        raise HTTPException(status_code=404, detail="Cable not found")
+    fiber_count = cable[0] or 0
+    if not 0 <= fiber_number < fiber_count:
+        raise HTTPException(
+            status_code=400, detail=f"Fiber {fiber_number} does not exist in this cable ({fiber_count} fibers)"
+        )
+    return fiber_graph.trace(cable_id, fiber_number)
+
+
+@router.get("/locate", response_model=FiberLocateResponse)
+def locate_fiber_fault(
+    cable_id: int,
+    fiber: int,
+    distance_km: float = Query(..., ge=0),
+    from_object_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Find the cable and map point at an OTDR distance along a fiber path"""
+    fiber_graph.sync(db)
+    cable = fiber_graph.cable(cable_id)
+    if cable is None:
+        raise HTTPException(status_code=404, detail="Cable not found")
+    fiber_count = cable[0] or 0
+    if not 0 <= fiber < fiber_count:
+        raise HTTPException(status_code=400, detail=f"Fiber {fiber} does not exist in this cable ({fiber_count} fibers)")
+    try:
+        result = fiber_graph.locate(cable_id, fiber, distance_km, from_object_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    coords = {
+        row[0]: row[1:] for row in db.query(
+            NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+        ).filter(NetworkObject.network_object_id.in_([result["from_object_id"], result["to_object_id"]])).all()
+    }
+    near, far = coords.get(result["from_object_id"]), coords.get(result["to_object_id"])
+    if near and far and None not in near and None not in far:
+        # кабель считается отрезком между его объектами
+        fraction = result["fraction"]
+        result["latitude"] = near[0] + (far[0] - near[0]) * fraction
+        result["longitude"] = near[1] + (far[1] - near[1]) * fraction
+    return result
+
+
+@router.post("/loss-budget", response_model=LossBudgetResponse)
+def evaluate_loss_budget(
+    request: LossBudgetRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Total attenuation of many fiber paths at once, checked against the end objects' budgets"""
+    return loss_budget.evaluate(
+        db, [(f.cable_id, f.fiber_number) for f in request.fibers], request.subscribers,
+        request.connectors, request.budget_db, request.only_failures,
+    )
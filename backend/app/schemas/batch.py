@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from .network_object import NetworkObjectCreate
+from .cable import CableCreate
+
+BATCH_MAX_OPERATIONS = 5000
+
+
+class NetworkObjectBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Optional[NetworkObjectCreate] = None
+
+
+class NetworkObjectBatchRequest(BaseModel):
+    operations: List[NetworkObjectBatchOperation] = Field(max_length=BATCH_MAX_OPERATIONS)
+    atomic: bool = True
+
+
+class CableBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Optional[CableCreate] = None
+
+
+class CableBatchRequest(BaseModel):
+    operations: List[CableBatchOperation] = Field(max_length=BATCH_MAX_OPERATIONS)
+    atomic: bool = True
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    op: str
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: List[BatchItemResult] = []
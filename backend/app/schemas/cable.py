@@ -14,6 +14,17 @@ class CableCreate(BaseModel):
     description: Optional[str] = None
 
 
+class CableUpdate(BaseModel):
+    name: Optional[str] = None
+    cable_type: Optional[str] = None
+    cable_type_id: Optional[int] = None
+    fiber_count: Optional[int] = None
+    from_object_id: Optional[int] = None
+    to_object_id: Optional[int] = None
+    distance_km: Optional[float] = None
+    description: Optional[str] = None
+
+
 class CableResponse(BaseModel):
     id: int = Field(validation_alias='cable_id')
     name: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -7,6 +7,7 @@ class CableTypeBase(BaseModel):
     fiber_count: Optional[int] = None  
     description: Optional[str] = None
     color: str
+    attenuation_db_per_km: Optional[float] = Field(None, ge=0)
 
 
 class CableTypeCreate(CableTypeBase):
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+ALLOCATION_MAX_CABLES = 1000
+
+
+class FiberAllocationRequest(BaseModel):
+    # цель: один кабель, путь из кабелей или пара объектов (путь подбирается)
+    cable_id: Optional[int] = None
+    cable_ids: Optional[List[int]] = Field(None, min_length=1, max_length=ALLOCATION_MAX_CABLES)
+    from_object_id: Optional[int] = None
+    to_object_id: Optional[int] = None
+    # что выделить: количество волокон или конкретные номера
+    count: Optional[int] = Field(None, ge=1)
+    fiber_numbers: Optional[List[int]] = Field(None, min_length=1)
+    contiguous: bool = True
+    label: Optional[str] = None
+
+    @model_validator(mode='after')
+    def check_target_and_amount(self):
+        targets = [self.cable_id is not None, self.cable_ids is not None,
+                   self.from_object_id is not None or self.to_object_id is not None]
+        if sum(targets) != 1:
+            raise ValueError("Specify exactly one of cable_id, cable_ids or from_object_id/to_object_id")
+        if (self.from_object_id is None) != (self.to_object_id is None):
+            raise ValueError("from_object_id and to_object_id go together")
+        if (self.count is None) == (self.fiber_numbers is None):
+            raise ValueError("Specify exactly one of count or fiber_numbers")
+        return self
+
+
+class AllocatedCable(BaseModel):
+    cable_id: int
+    fiber_numbers: List[int]
+    occupancy_version: int
+
+
+class FiberAllocationResponse(BaseModel):
+    allocation_id: str
+    label: Optional[str] = None
+    attempts: int
+    cables: List[AllocatedCable]
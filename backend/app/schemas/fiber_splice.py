@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, model_validator, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -8,6 +8,36 @@ class FiberSpliceCreate(BaseModel):
     fiber_number: int
     splice_to_fiber: int
     splice_to_cable_id: Optional[int] = None
+    loss_db: Optional[float] = Field(None, ge=0)
+
+
+class FiberSpliceUpdate(BaseModel):
+    cable_id: Optional[int] = None
+    fiber_number: Optional[int] = None
+    splice_to_fiber: Optional[int] = None
+    splice_to_cable_id: Optional[int] = None
+    loss_db: Optional[float] = Field(None, ge=0)
+
+
+SPLICE_SET_MAX_ITEMS = 5000
+
+
+class FiberSpliceSetItem(BaseModel):
+    fiber_number: int
+    splice_to_fiber: int
+    splice_to_cable_id: Optional[int] = None
+
+
+class FiberSpliceSet(BaseModel):
+    splices: List[FiberSpliceSetItem] = Field(max_length=SPLICE_SET_MAX_ITEMS)
+
+
+class FiberSpliceSetResponse(BaseModel):
+    cable_id: int
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
 
 
 class FiberSpliceResponse(BaseModel):
@@ -18,6 +48,7 @@ class FiberSpliceResponse(BaseModel):
     fiber_number: int
     splice_to_fiber: int
     splice_to_cable_id: Optional[int]
+    loss_db: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime]
     
@@ -32,7 +63,7 @@ class FiberSpliceResponse(BaseModel):
             if hasattr(values, 'fiber_splices_id') and not hasattr(values, 'id'):
                 values_dict = {}
                 for key in ['fiber_splices_id', 'cable_id', 'fiber_number', 'splice_to_fiber', 
-                            'splice_to_cable_id', 'created_at', 'updated_at', 'notes']:
+                            'splice_to_cable_id', 'loss_db', 'created_at', 'updated_at', 'notes']:
                     if hasattr(values, key):
                         val = getattr(values, key)
                         if key == 'fiber_splices_id':
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+
+class ImportJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    active: bool = False
+    filename: Optional[str] = None
+    chunk_size: int
+    stage: Optional[str] = None
+    offset: int = 0
+    processed: int = 0
+    total: Optional[int] = None
+    progress: float = 0.0
+    counts: Dict[str, int] = {}
+    error_count: int = 0
+    errors: List[Dict[str, Any]] = []
+    message: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
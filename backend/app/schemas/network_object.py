@@ -1,5 +1,5 @@
 from pydantic import BaseModel, constr, Field, computed_field, field_serializer, model_validator
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -12,6 +12,26 @@ class NetworkObjectCreate(BaseModel):
     description: Optional[str] = None
 
 
+class NetworkObjectUpdate(BaseModel):
+    name: Optional[constr(strip_whitespace=True, min_length=1)] = None
+    object_type_id: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    address: Optional[str] = None
+    description: Optional[str] = None
+
+
+class PositionUpdate(BaseModel):
+    id: int
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class PositionBatch(BaseModel):
+    moves: List[PositionUpdate]
+    flush: bool = False
+
+
 class NetworkObjectResponse(BaseModel):
     id: int = Field(validation_alias='network_object_id')
     name: str
@@ -41,3 +61,35 @@ class NetworkObjectResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class NearestObject(BaseModel):
+    id: int
+    name: str
+    object_type: Optional[str] = None
+    latitude: float
+    longitude: float
+    distance_m: float
+
+
+class NearestResponse(BaseModel):
+    latitude: float
+    longitude: float
+    results: List[NearestObject]
+
+
+class NearestPoint(BaseModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class NearestBatchRequest(BaseModel):
+    points: List[NearestPoint] = Field(max_length=10000)
+    k: int = Field(1, ge=1, le=100)
+    max_m: Optional[float] = Field(None, gt=0)
+
+
+class NearestBatchResponse(BaseModel):
+    object_count: int
+    points: List[NearestResponse]
+    elapsed_ms: float
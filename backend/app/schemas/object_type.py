@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -7,6 +7,7 @@ class ObjectTypeBase(BaseModel):
     display_name: str
     emoji: Optional[str] = None
     description: Optional[str] = None
+    loss_budget_db: Optional[float] = Field(None, ge=0)
 
 
 class ObjectTypeCreate(ObjectTypeBase):
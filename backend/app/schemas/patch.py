@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+
+class PatchResponse(BaseModel):
+    id: int
+    changed: Dict[str, Any] = {}
+    updated_at: Optional[datetime] = None
+    affected_cable_ids: List[int] = []
@@ -0,0 +1,157 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class TopologyPathResponse(BaseModel):
+    from_object_id: int
+    to_object_id: int
+    weight: str
+    hop_count: int
+    distance_km: float
+    object_ids: List[int]
+    cable_ids: List[int]
+    nodes_expanded: int
+
+
+class ComponentSummary(BaseModel):
+    object_count: int
+    cable_count: int
+    sample_object_id: int
+
+
+class ResilienceResponse(BaseModel):
+    dataset_version: int
+    region_id: Optional[int] = None
+    object_count: int
+    cable_count: int
+    component_count: int
+    components: List[ComponentSummary]
+    bridge_count: int
+    bridges: List[int]
+    articulation_count: int
+    articulation_points: List[int]
+    truncated: bool
+    cached: bool
+    elapsed_ms: float
+
+
+class ImpactRequest(BaseModel):
+    cable_ids: List[int] = []
+    object_ids: List[int] = []
+    source_object_ids: Optional[List[int]] = None
+    fiber_aware: bool = True
+
+
+class AffectedSubscriber(BaseModel):
+    object_id: int
+    name: Optional[str] = None
+    reason: str
+
+
+class ImpactResponse(BaseModel):
+    failed_cable_ids: List[int]
+    failed_object_ids: List[int]
+    source_count: int
+    disconnected_object_count: int
+    affected_subscriber_count: int
+    affected_subscribers: List[AffectedSubscriber]
+    precomputed: bool
+    elapsed_ms: float
+
+
+class PonTreeNode(BaseModel):
+    object_id: int
+    name: Optional[str] = None
+    object_type: str
+    connected: bool
+    source_object_id: Optional[int] = None
+    depth: Optional[int] = None
+    subscriber_count: int
+    max_depth: int
+    split_levels: int
+    downstream_distance_km: float
+
+
+class PonTreeResponse(BaseModel):
+    dataset_version: int
+    total: int
+    items: List[PonTreeNode]
+    cached: bool
+    rebuilt: bool
+    elapsed_ms: float
+
+
+class DiversePath(BaseModel):
+    hop_count: int
+    distance_km: float
+    object_ids: List[int]
+    cable_ids: List[int]
+
+
+class DiversePathsResponse(BaseModel):
+    from_object_id: int
+    to_object_id: int
+    diverse: bool
+    path_count: int
+    total_distance_km: float
+    shared_object_ids: List[int]
+    paths: List[DiversePath]
+    elapsed_ms: Optional[float] = None
+
+
+DIVERSITY_AUDIT_MAX_PAIRS = 100000
+
+
+class DiversityPair(BaseModel):
+    from_object_id: int
+    to_object_id: int
+
+
+class DiversityAuditRequest(BaseModel):
+    pairs: List[DiversityPair] = Field([], max_length=DIVERSITY_AUDIT_MAX_PAIRS)
+    # все абоненты региона против одного узла ядра
+    region_id: Optional[int] = None
+    to_object_id: Optional[int] = None
+    only_failures: bool = False
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        if (self.region_id is None) != (self.to_object_id is None):
+            raise ValueError("region_id and to_object_id go together")
+        if not self.pairs and self.region_id is None:
+            raise ValueError("Specify pairs or region_id with to_object_id")
+        return self
+
+
+class DiversityAuditResponse(BaseModel):
+    pair_count: int
+    diverse_count: int
+    not_diverse_count: int
+    missing_object_ids: List[int]
+    results: List[DiversePathsResponse]
+    workers: int
+    elapsed_ms: float
+
+
+class CableCapacity(BaseModel):
+    cable_id: int
+    name: Optional[str] = None
+    cable_type_id: Optional[int] = None
+    from_object_id: int
+    to_object_id: int
+    fiber_count: int
+    used_fibers: int
+    free_fibers: int
+    free_fiber_numbers: List[int]
+
+
+class CapacitySearchResponse(BaseModel):
+    total: int
+    total_free_fibers: int
+    cables: List[CableCapacity]
+
+
+class CapacityRouteResponse(TopologyPathResponse):
+    min_free_fibers: int
+    bottleneck_free_fibers: Optional[int] = None
+    cables: List[CableCapacity]
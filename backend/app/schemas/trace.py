@@ -0,0 +1,94 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List
+
+
+class FiberTraceHop(BaseModel):
+    cable_id: int
+    cable_name: str
+    fiber_number: int
+    from_object_id: int
+    to_object_id: int
+    splice_id: Optional[int] = None
+    distance_km: Optional[float] = None
+    cumulative_distance_km: float
+
+
+class FiberTraceResponse(BaseModel):
+    cable_id: int
+    fiber_number: int
+    a_end_object_id: int
+    z_end_object_id: int
+    hop_count: int
+    total_distance_km: float
+    distance_complete: bool
+    loop: bool
+    hops: List[FiberTraceHop]
+
+
+class FiberLocateResponse(BaseModel):
+    cable_id: int
+    cable_name: str
+    fiber_number: int
+    hop_index: int
+    from_object_id: int
+    to_object_id: int
+    offset_km: float
+    cable_distance_km: Optional[float] = None
+    fraction: float
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    measured_from_object_id: int
+    path_length_km: float
+    distance_complete: bool
+    loop: bool
+
+
+LOSS_BUDGET_MAX_FIBERS = 100000
+
+
+class FiberRef(BaseModel):
+    cable_id: int
+    fiber_number: int
+
+
+class LossBudgetRequest(BaseModel):
+    fibers: List[FiberRef] = Field([], max_length=LOSS_BUDGET_MAX_FIBERS)
+    # все сваренные цепочки до абонентов - для ночной проверки
+    subscribers: bool = False
+    connectors: int = Field(2, ge=0)
+    budget_db: Optional[float] = Field(None, ge=0)
+    only_failures: bool = False
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        if not self.fibers and not self.subscribers:
+            raise ValueError("Specify fibers or set subscribers")
+        return self
+
+
+class LossBudgetPath(BaseModel):
+    cable_id: int
+    fiber_number: int
+    a_end_object_id: int
+    z_end_object_id: int
+    hop_count: int
+    splice_count: int
+    length_km: float
+    distance_complete: bool
+    fiber_loss_db: float
+    splice_loss_db: float
+    connector_loss_db: float
+    total_loss_db: float
+    budget_db: Optional[float] = None
+    margin_db: Optional[float] = None
+    within_budget: Optional[bool] = None
+    loop: bool
+
+
+class LossBudgetResponse(BaseModel):
+    path_count: int
+    over_budget_count: int
+    unbudgeted_count: int
+    invalid_fibers: List[FiberRef]
+    paths: List[LossBudgetPath]
+    elapsed_ms: float
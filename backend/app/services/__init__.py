@@ -0,0 +1 @@
+"""Services package"""
@@ -0,0 +1,351 @@
+"""
+Batch create/update/delete of network objects and cables: bulk validation,
+then one transaction with executemany statements
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from ..models.cable import Cable
+from ..models.region import Region, region_objects, region_cables
+from ..utils.validators import validate_name, validate_coordinates, validate_fiber_count, validate_distance
+from ..utils.geodesy import batch_distance_km
+from .cable_distances import propagate_object_moves
+from .cable_types import cable_type_resolver
+from .cascade_delete import delete_cables_cascade, delete_objects_cascade
+
+ID_CHUNK = 500
+
+OBJECT_FIELDS = ("name", "object_type_id", "latitude", "longitude", "address", "description")
+CABLE_FIELDS = ("name", "cable_type_id", "fiber_count", "from_object_id", "to_object_id", "distance_km", "description")
+
+
+def _chunks(items: List[Any], size: int = ID_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _query_in(db: Session, columns, key, values: Iterable[Any]) -> List[Tuple]:
+    """SELECT ... WHERE key IN (...) по частям, чтобы не упереться в лимит параметров"""
+    rows: List[Tuple] = []
+    for chunk in _chunks(list(set(values))):
+        rows.extend(db.query(*columns).filter(key.in_(chunk)).all())
+    return rows
+
+
+class BatchResult:
+    """Результаты по позициям запроса и итоговые счетчики"""
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.items = [
+            {"index": i, "op": op.op, "status": "ok", "id": op.id, "error": None}
+            for i, op in enumerate(operations)
+        ]
+
+    def fail(self, index: int, error: str) -> None:
+        item = self.items[index]
+        if item["status"] != "error":
+            item["status"] = "error"
+            item["error"] = error
+
+    def ok(self, op: str) -> List[int]:
+        """Индексы прошедших проверку операций данного вида"""
+        return [
+            item["index"] for item in self.items
+            if item["op"] == op and item["status"] == "ok"
+        ]
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for item in self.items if item["status"] == "error")
+
+    def check_structure(self) -> None:
+        """id обязателен для update/delete, data - для create/update; одна операция на id"""
+        seen: Dict[int, int] = {}
+        for i, op in enumerate(self.operations):
+            if op.op in ("update", "delete"):
+                if not op.id:
+                    self.fail(i, "id is required")
+                elif op.id in seen:
+                    self.fail(i, f"duplicate operation for id {op.id} (item {seen[op.id]})")
+                else:
+                    seen[op.id] = i
+            if op.op in ("create", "update") and op.data is None:
+                self.fail(i, "data is required")
+
+    def report(self, committed: bool) -> Dict[str, Any]:
+        if not committed:
+            for item in self.items:
+                if item["status"] == "ok":
+                    item["status"] = "skipped"
+        counts = {
+            op: sum(1 for item in self.items if item["op"] == op and item["status"] == "ok")
+            for op in ("create", "update", "delete")
+        }
+        return {
+            "committed": committed,
+            "created": counts["create"],
+            "updated": counts["update"],
+            "deleted": counts["delete"],
+            "failed": self.failed,
+            "results": self.items,
+        }
+
+
+def _check_names(result: BatchResult, names_in_db: Dict[Any, int], key_of, touched_ids: Set[int]) -> None:
+    """
+    Уникальность ключа (имени) с учетом самого пакета: ключ занят, если он
+    принадлежит строке БД, которую пакет не меняет и не удаляет, или встречается в пакете дважды.
+    """
+    in_batch: Dict[Any, int] = {}
+    for i, op in enumerate(result.operations):
+        if op.op == "delete" or op.data is None or result.items[i]["status"] != "ok":
+            continue
+        key = key_of(op.data)
+        holder = names_in_db.get(key)
+        if holder is not None and holder != op.id and holder not in touched_ids:
+            result.fail(i, "already exists")
+        elif key in in_batch:
+            result.fail(i, f"duplicate of item {in_batch[key]}")
+        else:
+            in_batch[key] = i
+
+
+def apply_object_batch(db: Session, operations, atomic: bool = True) -> Dict[str, Any]:
+    """Пакет операций над объектами сети; при atomic ошибка любой позиции отменяет весь пакет"""
+    result = BatchResult(operations)
+    result.check_structure()
+
+    target_ids = [op.id for op in operations if op.op != "create" and op.id]
+    existing = {
+        row[0]: row[1:]
+        for row in _query_in(
+            db, (NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude),
+            NetworkObject.network_object_id, target_ids
+        )
+    }
+    type_ids = {type_id for (type_id,) in db.query(ObjectType.object_type_id).all()}
+
+    for i, op in enumerate(operations):
+        if op.op != "create" and op.id and op.id not in existing:
+            result.fail(i, "Object not found")
+        if op.data is None:
+            continue
+        data = op.data
+        if not validate_name(data.name, settings.MAX_NAME_LENGTH):
+            result.fail(i, "invalid name")
+        if data.object_type_id not in type_ids:
+            result.fail(i, "unknown object_type_id")
+        if (data.latitude is not None or data.longitude is not None) and not validate_coordinates(data.latitude, data.longitude):
+            result.fail(i, "invalid coordinates")
+
+    names = [op.data.name for op in operations if op.data is not None]
+    names_in_db = {
+        name: obj_id
+        for obj_id, name in _query_in(db, (NetworkObject.network_object_id, NetworkObject.name), NetworkObject.name, names)
+    }
+    touched = {operations[i].id for i in result.ok("update") + result.ok("delete")}
+    _check_names(result, names_in_db, lambda data: data.name, touched)
+
+    if atomic and result.failed:
+        return result.report(committed=False)
+
+    now = datetime.utcnow()
+    # как DELETE ?cascade=true: кабели объектов уходят вместе со сварками и резервами
+    delete_ids = [operations[i].id for i in result.ok("delete")]
+    for chunk in _chunks(delete_ids):
+        delete_objects_cascade(db, chunk)
+
+    create_indexes = result.ok("create")
+    if create_indexes:
+        rows = [operations[i].data.model_dump(include=set(OBJECT_FIELDS)) for i in create_indexes]
+        # порядок RETURNING в SQLite не гарантирован, поэтому id сопоставляются по уникальному имени
+        id_by_name = dict(
+            (name, new_id) for new_id, name in db.execute(
+                insert(NetworkObject).returning(NetworkObject.network_object_id, NetworkObject.name),
+                rows
+            )
+        )
+        new_ids = [id_by_name[row["name"]] for row in rows]
+        for i, new_id in zip(create_indexes, new_ids):
+            result.items[i]["id"] = new_id
+        _assign_object_regions(db, [
+            (new_id, row["address"]) for new_id, row in zip(new_ids, rows) if row["address"]
+        ], now)
+
+    update_indexes = result.ok("update")
+    moved: List[int] = []
+    if update_indexes:
+        rows = []
+        for i in update_indexes:
+            op = operations[i]
+            row = op.data.model_dump(include=set(OBJECT_FIELDS))
+            if (row["latitude"], row["longitude"]) != tuple(existing[op.id]):
+                moved.append(op.id)
+            rows.append({"network_object_id": op.id, **row, "updated_at": now})
+        db.execute(update(NetworkObject), rows)
+    # длины кабелей у перемещенных объектов пересчитываются в этой же транзакции
+    propagate_object_moves(db, moved)
+
+    events.mark_changed(db, events.OBJECTS_CHANGED, [item["id"] for item in result.items if item["status"] == "ok"])
+    db.commit()
+    return result.report(committed=True)
+
+
+def _assign_object_regions(db: Session, objects: List[Tuple[int, str]], now: datetime) -> None:
+    """Первый регион, чье имя встречается в адресе, как при одиночном создании"""
+    if not objects:
+        return
+    regions = db.query(Region.region_id, Region.name).all()
+    memberships = []
+    for obj_id, address in objects:
+        address = address.lower()
+        for region_id, name in regions:
+            if name.lower() in address:
+                memberships.append({"region_id": region_id, "network_object_id": obj_id})
+                break
+    if not memberships:
+        return
+    db.execute(insert(region_objects).prefix_with("OR IGNORE"), memberships)
+    region_ids = sorted({m["region_id"] for m in memberships})
+    db.execute(update(Region).where(Region.region_id.in_(region_ids)).values(updated_at=now))
+    events.mark_changed(db, events.REGIONS_CHANGED, region_ids)
+
+
+def apply_cable_batch(db: Session, operations, atomic: bool = True) -> Dict[str, Any]:
+    """Пакет операций над кабелями; при atomic ошибка любой позиции отменяет весь пакет"""
+    result = BatchResult(operations)
+    result.check_structure()
+
+    target_ids = [op.id for op in operations if op.op != "create" and op.id]
+    existing = {
+        cable_id for (cable_id,) in _query_in(db, (Cable.cable_id,), Cable.cable_id, target_ids)
+    }
+    endpoint_ids = [
+        object_id for op in operations if op.data is not None
+        for object_id in (op.data.from_object_id, op.data.to_object_id)
+    ]
+    known_objects = {
+        row[0]: row[1:] for row in _query_in(
+            db, (NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude),
+            NetworkObject.network_object_id, endpoint_ids
+        )
+    }
+
+    for i, op in enumerate(operations):
+        if op.op != "create" and op.id and op.id not in existing:
+            result.fail(i, "Cable not found")
+        if op.data is None:
+            continue
+        data = op.data
+        if not validate_name(data.name, settings.MAX_NAME_LENGTH):
+            result.fail(i, "invalid name")
+        if data.from_object_id not in known_objects or data.to_object_id not in known_objects:
+            result.fail(i, "endpoint object not found")
+        if data.fiber_count is not None and not validate_fiber_count(data.fiber_count):
+            result.fail(i, "invalid fiber count")
+        if not validate_distance(data.distance_km):
+            result.fail(i, "invalid distance")
+
+    names = [op.data.name for op in operations if op.data is not None]
+    names_in_db = {
+        (name, from_id, to_id): cable_id
+        for cable_id, name, from_id, to_id in _query_in(
+            db, (Cable.cable_id, Cable.name, Cable.from_object_id, Cable.to_object_id), Cable.name, names
+        )
+    }
+    touched = {operations[i].id for i in result.ok("update") + result.ok("delete")}
+    _check_names(result, names_in_db, lambda data: (data.name, data.from_object_id, data.to_object_id), touched)
+
+    if atomic and result.failed:
+        return result.report(committed=False)
+
+    def cable_row(data) -> Dict[str, Any]:
+        row = data.model_dump(include=set(CABLE_FIELDS))
+        row["cable_type_id"] = cable_type_resolver.resolve(db, data.cable_type, data.cable_type_id, data.fiber_count)
+        return row
+
+    now = datetime.utcnow()
+    # сварки и резервы удаляемых кабелей уходят в той же транзакции
+    delete_cables_cascade(db, [operations[i].id for i in result.ok("delete")])
+
+    create_indexes = result.ok("create")
+    new_cables: List[Tuple[int, int, int]] = []
+    if create_indexes:
+        rows = [cable_row(operations[i].data) for i in create_indexes]
+        _fill_distances(rows, known_objects)
+        id_by_key = {
+            (name, from_id, to_id): new_id
+            for new_id, name, from_id, to_id in db.execute(
+                insert(Cable).returning(Cable.cable_id, Cable.name, Cable.from_object_id, Cable.to_object_id),
+                rows
+            )
+        }
+        new_ids = [id_by_key[(row["name"], row["from_object_id"], row["to_object_id"])] for row in rows]
+        for i, new_id, row in zip(create_indexes, new_ids, rows):
+            result.items[i]["id"] = new_id
+            new_cables.append((new_id, row["from_object_id"], row["to_object_id"]))
+
+    update_indexes = result.ok("update")
+    if update_indexes:
+        rows = []
+        for i in update_indexes:
+            op = operations[i]
+            rows.append({"cable_id": op.id, **cable_row(op.data), "updated_at": now})
+        _fill_distances(rows, known_objects)
+        db.execute(update(Cable), rows)
+
+    _assign_cable_regions(db, new_cables, now)
+
+    events.mark_changed(db, events.CABLES_CHANGED, [item["id"] for item in result.items if item["status"] == "ok"])
+    db.commit()
+    return result.report(committed=True)
+
+
+def _fill_distances(rows: List[Dict[str, Any]], positions: Dict[int, Tuple]) -> None:
+    """distance_km по координатам концов одним векторным проходом для строк без длины"""
+    pending = [
+        row for row in rows
+        if row["distance_km"] is None
+        and None not in positions[row["from_object_id"]]
+        and None not in positions[row["to_object_id"]]
+    ]
+    if not pending:
+        return
+    start = np.array([positions[row["from_object_id"]] for row in pending], dtype=np.float64)
+    end = np.array([positions[row["to_object_id"]] for row in pending], dtype=np.float64)
+    distances = batch_distance_km(start, end, method=settings.GEODESY_METHOD)
+    for row, dist in zip(pending, distances):
+        row["distance_km"] = round(float(dist), 4)
+
+
+def _assign_cable_regions(db: Session, cables: List[Tuple[int, int, int]], now: datetime) -> None:
+    """Кабель попадает в каждый регион, где есть оба его конца"""
+    if not cables:
+        return
+    object_ids = [object_id for _cable_id, from_id, to_id in cables for object_id in (from_id, to_id)]
+    regions_of: Dict[int, Set[int]] = {}
+    for region_id, object_id in _query_in(
+        db, (region_objects.c.region_id, region_objects.c.network_object_id),
+        region_objects.c.network_object_id, object_ids
+    ):
+        regions_of.setdefault(object_id, set()).add(region_id)
+
+    memberships = [
+        {"region_id": region_id, "cable_id": cable_id}
+        for cable_id, from_id, to_id in cables
+        for region_id in sorted(regions_of.get(from_id, set()) & regions_of.get(to_id, set()))
+    ]
+    if not memberships:
+        return
+    db.execute(insert(region_cables).prefix_with("OR IGNORE"), memberships)
+    region_ids = sorted({m["region_id"] for m in memberships})
+    db.execute(update(Region).where(Region.region_id.in_(region_ids)).values(updated_at=now))
+    events.mark_changed(db, events.REGIONS_CHANGED, region_ids)
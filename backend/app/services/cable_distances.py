@@ -0,0 +1,111 @@
+"""
+Cable length maintenance: distance_km derived from endpoint coordinates
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session, aliased
+from ..core import events
+from ..core.config import settings
+from ..models.cable import Cable
+from ..models.network_object import NetworkObject
+from ..utils.geodesy import distance_km
+
+ID_CHUNK = 500
+
+
+def endpoint_distance_km(db: Session, from_object_id: int, to_object_id: int, method: Optional[str] = None) -> Optional[float]:
+    """Длина между двумя объектами или None, если у одного из них нет координат"""
+    coords = dict(
+        (obj_id, (lat, lon))
+        for obj_id, lat, lon in db.query(
+            NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+        ).filter(NetworkObject.network_object_id.in_([from_object_id, to_object_id])).all()
+    )
+    start = coords.get(from_object_id)
+    end = coords.get(to_object_id)
+    if not start or not end or None in start or None in end:
+        return None
+    value = distance_km(start[0], start[1], end[0], end[1], method=method or settings.GEODESY_METHOD)
+    return round(float(value), 4)
+
+
+def recompute_cable_distances(
+    db: Session,
+    cable_ids: Optional[Iterable[int]] = None,
+    only_missing: bool = False,
+    method: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Пересчитать distance_km по координатам концов одним векторным проходом
+    и записать пакетным UPDATE (executemany). Коммит остается за вызывающим.
+    """
+    from_obj = aliased(NetworkObject)
+    to_obj = aliased(NetworkObject)
+    query = db.query(
+        Cable.cable_id, from_obj.latitude, from_obj.longitude, to_obj.latitude, to_obj.longitude
+    ).join(
+        from_obj, Cable.from_object_id == from_obj.network_object_id
+    ).join(
+        to_obj, Cable.to_object_id == to_obj.network_object_id
+    )
+    if only_missing:
+        query = query.filter(Cable.distance_km.is_(None))
+
+    if cable_ids is None:
+        rows = query.all()
+    else:
+        ids = list(cable_ids)
+        rows = []
+        for i in range(0, len(ids), ID_CHUNK):
+            rows.extend(query.filter(Cable.cable_id.in_(ids[i:i + ID_CHUNK])).all())
+
+    complete = [row for row in rows if None not in row]
+    if complete:
+        data = np.array(complete, dtype=np.float64)
+        distances = distance_km(data[:, 1], data[:, 2], data[:, 3], data[:, 4], method=method or settings.GEODESY_METHOD)
+        now = datetime.utcnow()
+        db.execute(update(Cable), [
+            {"cable_id": int(cable_id), "distance_km": round(float(dist), 4), "updated_at": now}
+            for cable_id, dist in zip(data[:, 0], distances)
+        ])
+        events.mark_changed(db, events.CABLES_CHANGED, data[:, 0].astype(int).tolist())
+
+    return {
+        "updated": len(complete),
+        "skipped": len(rows) - len(complete),
+        "cable_ids": [row[0] for row in complete],
+    }
+
+
+def attached_cable_ids(db: Session, object_ids: Iterable[int]) -> List[int]:
+    """Кабели, у которых хотя бы один конец среди указанных объектов"""
+    ids = list(object_ids)
+    cable_ids: List[int] = []
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        cable_ids.extend(
+            cable_id for (cable_id,) in db.query(Cable.cable_id).filter(
+                or_(Cable.from_object_id.in_(chunk), Cable.to_object_id.in_(chunk))
+            ).all()
+        )
+    return sorted(set(cable_ids))
+
+
+def propagate_object_moves(db: Session, object_ids: Iterable[int]) -> List[int]:
+    """
+    Пересчитать длины кабелей, подключенных к перемещенным объектам, в той же
+    транзакции и отметить изменения для производных кешей. Возвращает id кабелей.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return []
+    cable_ids = attached_cable_ids(db, object_ids)
+    if cable_ids:
+        recompute_cable_distances(db, cable_ids)
+    # геометрия меняется и у кабелей без длины (второй конец без координат)
+    events.mark_changed(db, events.OBJECTS_CHANGED, object_ids)
+    events.mark_changed(db, events.CABLES_CHANGED, cable_ids)
+    return cable_ids
@@ -0,0 +1,90 @@
+"""
+In-memory cable type resolution table built from cable_types
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.cable_type import CableType
+
+OPTICAL = "optical"
+COPPER = "copper"
+
+# базовые типы, на которые ссылаются ключевые слова optical/copper
+GENERIC_TYPE_NAMES = {OPTICAL: "Оптический", COPPER: "Медный"}
+# типоразмеры оптики: ОКГ-<число волокон>
+OPTICAL_SIZED_PREFIX = "ОКГ-"
+
+
+class _ResolutionTable:
+    def __init__(self):
+        self.by_name: Dict[str, int] = {}
+        self.by_kind: Dict[Tuple[str, Optional[int]], int] = {}
+        self.fallback = 1
+
+
+class CableTypeResolver:
+    """
+    Разрешение типа кабеля словарными поисками вместо запросов к cable_types.
+
+    Таблица строится лениво при первом обращении и перестраивается через
+    rebuild() после создания типа.
+    """
+
+    def __init__(self):
+        self._table: Optional[_ResolutionTable] = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> None:
+        """Перечитать cable_types; при совпадениях побеждает меньший id, как в прежних запросах"""
+        table = _ResolutionTable()
+        rows = db.query(CableType.cable_type_id, CableType.name, CableType.fiber_count).order_by(CableType.cable_type_id).all()
+        for cable_type_id, name, fiber_count in rows:
+            table.by_name.setdefault(name.lower(), cable_type_id)
+            if fiber_count is not None and name.startswith(OPTICAL_SIZED_PREFIX):
+                table.by_kind.setdefault((OPTICAL, fiber_count), cable_type_id)
+        for kind, name in GENERIC_TYPE_NAMES.items():
+            if name.lower() in table.by_name:
+                table.by_kind[(kind, None)] = table.by_name[name.lower()]
+        if (OPTICAL, None) in table.by_kind:
+            table.fallback = table.by_kind[(OPTICAL, None)]
+        elif rows:
+            table.fallback = rows[0][0]
+        self._table = table
+
+    def _get_table(self, db: Session) -> _ResolutionTable:
+        table = self._table
+        if table is None:
+            with self._lock:
+                if self._table is None:
+                    self.rebuild(db)
+                table = self._table
+        return table
+
+    def resolve(
+        self,
+        db: Session,
+        cable_type: Optional[str] = None,
+        cable_type_id: Optional[int] = None,
+        fiber_count: Optional[int] = None,
+    ) -> int:
+        """Id типа по явному id, ключевому слову optical/copper (+ число волокон) или имени"""
+        if cable_type_id:
+            return cable_type_id
+        table = self._get_table(db)
+        key = cable_type.strip().lower() if cable_type else None
+
+        if key == OPTICAL:
+            if fiber_count and (OPTICAL, fiber_count) in table.by_kind:
+                return table.by_kind[(OPTICAL, fiber_count)]
+            if (OPTICAL, None) in table.by_kind:
+                return table.by_kind[(OPTICAL, None)]
+        elif key == COPPER and (COPPER, None) in table.by_kind:
+            return table.by_kind[(COPPER, None)]
+
+        if key and key in table.by_name:
+            return table.by_name[key]
+        return table.fallback
+
+
+cable_type_resolver = CableTypeResolver()
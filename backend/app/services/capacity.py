@@ -0,0 +1,154 @@
+"""
+Fiber capacity search: free fibers per cable answered from the occupancy
+bitmaps of the topology graph, filtered by region, bounding box and cable type
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.cable import Cable
+from .topology import TopologyGraph, topology_graph, free_fiber_numbers
+
+ID_CHUNK = 500
+SORT_KEY_SHIFT = 1 << 40
+
+# min_lon, min_lat, max_lon, max_lat
+BBox = Tuple[float, float, float, float]
+
+
+class CapacityIndex:
+    """
+    Колонки активных ребер в NumPy для векторных фильтров.
+
+    Сами карты занятости живут в графе и обновляются по событиям; здесь
+    только их срез, который пересобирается, когда меняется версия данных.
+    """
+
+    def __init__(self, graph: TopologyGraph):
+        self.graph = graph
+        self._version: Optional[int] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self, db: Session) -> Dict[str, np.ndarray]:
+        self.graph.sync(db)
+        version = events.dataset_version()
+        with self._lock:
+            if self._version == version:
+                return self._columns
+            graph = self.graph
+            edges = np.flatnonzero(np.asarray(graph.edge_active, dtype=bool))
+            fibers = np.asarray(graph.edge_fibers, dtype=np.int64)[edges]
+            used = np.asarray(graph.edge_used, dtype=np.int64)[edges]
+            lat = np.asarray(graph.lat, dtype=np.float64)
+            lon = np.asarray(graph.lon, dtype=np.float64)
+            u = np.asarray(graph.edge_u, dtype=np.int64)[edges]
+            v = np.asarray(graph.edge_v, dtype=np.int64)[edges]
+            self._columns = {
+                "edge": edges,
+                "cable": np.asarray(graph.edge_cable, dtype=np.int64)[edges],
+                # кабель без типа не проходит ни один фильтр по типу
+                "type": np.fromiter((-1 if t is None else t for t in graph.edge_type), dtype=np.int64,
+                                    count=len(graph.edge_type))[edges],
+                "free": fibers - used,
+                "lat_u": lat[u], "lon_u": lon[u], "lat_v": lat[v], "lon_v": lon[v],
+            }
+            self._version = version
+            return self._columns
+
+    def _describe(self, db: Session, edges: Iterable[int]) -> List[Dict[str, Any]]:
+        graph = self.graph
+        edges = list(edges)
+        ids = [graph.edge_cable[e] for e in edges]
+        names: Dict[int, str] = {}
+        for i in range(0, len(ids), ID_CHUNK):
+            names.update(db.query(Cable.cable_id, Cable.name).filter(Cable.cable_id.in_(ids[i:i + ID_CHUNK])).all())
+        return [
+            {
+                "cable_id": graph.edge_cable[e],
+                "name": names.get(graph.edge_cable[e]),
+                "cable_type_id": graph.edge_type[e],
+                "from_object_id": graph.node_ids[graph.edge_u[e]],
+                "to_object_id": graph.node_ids[graph.edge_v[e]],
+                "fiber_count": graph.edge_fibers[e],
+                "used_fibers": graph.edge_used[e],
+                "free_fibers": graph.edge_fibers[e] - graph.edge_used[e],
+                "free_fiber_numbers": free_fiber_numbers(graph.edge_occupied[e], graph.edge_fibers[e]),
+            }
+            for e in edges
+        ]
+
+    def search(
+        self,
+        db: Session,
+        cable_ids: Optional[Iterable[int]] = None,
+        bbox: Optional[BBox] = None,
+        cable_type_ids: Optional[Iterable[int]] = None,
+        min_free_fibers: Optional[int] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Кабели со свободными волокнами: больше свободных - выше.
+
+        cable_ids ограничивает выборку (например, кабелями региона); в bbox
+        кабель попадает, если в рамке лежит хотя бы один его конец.
+        """
+        columns = self._snapshot(db)
+        mask = np.ones(len(columns["edge"]), dtype=bool)
+        if cable_ids is not None:
+            mask &= np.isin(columns["cable"], np.fromiter(cable_ids, dtype=np.int64))
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+
+            def inside(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+                return (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+            mask &= inside(columns["lat_u"], columns["lon_u"]) | inside(columns["lat_v"], columns["lon_v"])
+        if cable_type_ids:
+            mask &= np.isin(columns["type"], np.fromiter(cable_type_ids, dtype=np.int64))
+        if min_free_fibers:
+            mask &= columns["free"] >= min_free_fibers
+
+        found = np.flatnonzero(mask)
+        free = columns["free"][found]
+        # порядок: свободных больше, затем id кабеля; сортируется только нужная верхушка
+        key = -free * SORT_KEY_SHIFT + columns["cable"][found]
+        top = offset + limit
+        if top < len(key):
+            head = np.argpartition(key, top - 1)[:top]
+            order = head[np.argsort(key[head])]
+        else:
+            order = np.argsort(key)
+        page = columns["edge"][found[order[offset:top]]]
+        return {
+            "total": int(len(found)),
+            "total_free_fibers": int(free.sum()),
+            "cables": self._describe(db, page.tolist()),
+        }
+
+    def route(
+        self,
+        db: Session,
+        from_object_id: int,
+        to_object_id: int,
+        min_free_fibers: int = 1,
+        weight: str = "distance",
+        cable_type_ids: Optional[Iterable[int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Кратчайший путь, на каждом кабеле которого есть min_free_fibers свободных волокон; None - пути нет"""
+        self.graph.sync(db)
+        path = self.graph.shortest_path(from_object_id, to_object_id, weight, cable_type_ids, min_free_fibers)
+        if path is None:
+            return None
+        cables = self._describe(db, (self.graph.cable_edge[c] for c in path["cable_ids"]))
+        return {
+            **path,
+            "min_free_fibers": min_free_fibers,
+            "bottleneck_free_fibers": min((c["free_fibers"] for c in cables), default=None),
+            "cables": cables,
+        }
+
+
+capacity_index = CapacityIndex(topology_graph)
@@ -0,0 +1,119 @@
+"""
+Cascading delete of network objects with set-based DELETE statements
+"""
+
+from typing import Dict, Iterable, List
+from sqlalchemy import delete, or_, select, union
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.network_object import NetworkObject
+from ..models.cable import Cable
+from ..models.connection import Connection
+from ..models.fiber_splice import FiberSplice
+from ..models.fiber_reservation import FiberReservation
+from ..models.entity_hash import EntityHash
+from ..models.region import region_objects, region_cables
+
+CASCADE_KEYS = ("fiber_splices", "fiber_reservations", "connections", "region_cables", "region_objects", "cables", "network_objects")
+
+
+CABLE_CASCADE_KEYS = ("fiber_splices", "fiber_reservations", "connections", "region_cables", "cables")
+ID_CHUNK = 500
+
+
+def _delete_cables(db: Session, cables_subq, connection_filter=None) -> Dict[str, int]:
+    """
+    Удалить кабели, выбранные подзапросом, со сварками, резервами волокон,
+    соединениями и членством в регионах; отметить изменения для кешей.
+    """
+    splice_filter = or_(FiberSplice.cable_id.in_(cables_subq), FiberSplice.splice_to_cable_id.in_(cables_subq))
+
+    cable_ids = list(db.scalars(cables_subq))
+    # сварки меняются и у соседних кабелей, на которые вели волокна удаляемых
+    spliced_cable_ids = [
+        cable_id for cable_id in db.scalars(union(
+            select(FiberSplice.cable_id).where(splice_filter),
+            select(FiberSplice.splice_to_cable_id).where(splice_filter),
+        )) if cable_id is not None
+    ]
+    region_ids = list(db.scalars(
+        select(region_cables.c.region_id).where(region_cables.c.cable_id.in_(cables_subq)).distinct()
+    ))
+
+    db.execute(delete(EntityHash).where(
+        EntityHash.entity_type == "splice",
+        EntityHash.entity_id.in_(select(FiberSplice.fiber_splices_id).where(splice_filter))
+    ))
+    db.execute(delete(EntityHash).where(
+        EntityHash.entity_type.in_(("cable", "cable_geo")),
+        EntityHash.entity_id.in_(cables_subq)
+    ))
+
+    counts = {}
+    counts["fiber_splices"] = db.execute(delete(FiberSplice).where(splice_filter)).rowcount
+    counts["fiber_reservations"] = db.execute(
+        delete(FiberReservation).where(FiberReservation.cable_id.in_(cables_subq))
+    ).rowcount
+    connection_filter = Connection.cable_id.in_(cables_subq) if connection_filter is None \
+        else or_(connection_filter, Connection.cable_id.in_(cables_subq))
+    counts["connections"] = db.execute(delete(Connection).where(connection_filter)).rowcount
+    counts["region_cables"] = db.execute(
+        delete(region_cables).where(region_cables.c.cable_id.in_(cables_subq))
+    ).rowcount
+    counts["cables"] = db.execute(delete(Cable).where(Cable.cable_id.in_(cables_subq))).rowcount
+
+    events.mark_changed(db, events.CABLES_CHANGED, cable_ids)
+    events.mark_changed(db, events.SPLICES_CHANGED, spliced_cable_ids)
+    events.mark_changed(db, events.REGIONS_CHANGED, region_ids)
+    return counts
+
+
+def delete_cables_cascade(db: Session, cable_ids: Iterable[int]) -> Dict[str, int]:
+    """
+    Удалить кабели вместе со сварками (и на соседние кабели), резервами волокон,
+    соединениями и членством в регионах. Коммит остается за вызывающим.
+    """
+    cable_ids: List[int] = list(cable_ids)
+    totals = dict.fromkeys(CABLE_CASCADE_KEYS, 0)
+    for i in range(0, len(cable_ids), ID_CHUNK):
+        chunk = cable_ids[i:i + ID_CHUNK]
+        counts = _delete_cables(db, select(Cable.cable_id).where(Cable.cable_id.in_(chunk)))
+        for key in CABLE_CASCADE_KEYS:
+            totals[key] += counts[key]
+    return totals
+
+
+def delete_objects_cascade(db: Session, object_ids: Iterable[int]) -> Dict[str, int]:
+    """
+    Удалить объекты вместе с кабелями, сварками, резервами волокон, соединениями и членством в регионах.
+
+    Зависимые строки выбираются подзапросами, поэтому число запросов не зависит
+    от количества кабелей и сварок. Коммит остается за вызывающим.
+    """
+    object_ids: List[int] = list(object_ids)
+    cables_subq = select(Cable.cable_id).where(
+        or_(Cable.from_object_id.in_(object_ids), Cable.to_object_id.in_(object_ids))
+    )
+    region_ids = list(db.scalars(
+        select(region_objects.c.region_id).where(region_objects.c.network_object_id.in_(object_ids)).distinct()
+    ))
+
+    counts = _delete_cables(db, cables_subq, or_(
+        Connection.from_object_id.in_(object_ids),
+        Connection.to_object_id.in_(object_ids),
+    ))
+
+    db.execute(delete(EntityHash).where(
+        EntityHash.entity_type.in_(("object", "object_geo")),
+        EntityHash.entity_id.in_(object_ids)
+    ))
+    counts["region_objects"] = db.execute(
+        delete(region_objects).where(region_objects.c.network_object_id.in_(object_ids))
+    ).rowcount
+    counts["network_objects"] = db.execute(
+        delete(NetworkObject).where(NetworkObject.network_object_id.in_(object_ids))
+    ).rowcount
+
+    events.mark_changed(db, events.OBJECTS_CHANGED, object_ids)
+    events.mark_changed(db, events.REGIONS_CHANGED, region_ids)
+    return {key: counts[key] for key in CASCADE_KEYS}
@@ -0,0 +1,318 @@
+"""
+Route diversity: the two shortest edge-disjoint cable paths between objects
+(Suurballe), for single checks and for batch audits sharded across a process pool
+"""
+
+import heapq
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from .topology import TopologyGraph, topology_graph
+
+# (узлы, ребра) одного пути
+Path = Tuple[List[int], List[int]]
+# расстояния, (предок, ребро) и закрытые узлы одного прогона Дейкстры
+Tree = Tuple[Dict[int, float], Dict[int, Tuple[int, int]], Set[int]]
+
+# граф рабочего процесса пула: (indptr, arc_node, arc_edge, weights)
+_worker_graph: Optional[Tuple[List[int], List[int], List[int], List[float]]] = None
+
+
+def shortest_tree(
+    indptr: Sequence[int], arc_node: Sequence[int], arc_edge: Sequence[int], weights: Sequence[float],
+    source: int, target: Optional[int] = None,
+) -> Tree:
+    """Дейкстра от source: (расстояния, (предок, ребро) по узлам, закрытые узлы); с target - до него"""
+    dist = {source: 0.0}
+    prev: Dict[int, Tuple[int, int]] = {}
+    done = set()
+    heap = [(0.0, source)]
+    pop, push, inf = heapq.heappop, heapq.heappush, math.inf
+    while heap:
+        d, node = pop(heap)
+        if node in done:
+            continue
+        done.add(node)
+        if node == target:
+            break
+        for i in range(indptr[node], indptr[node + 1]):
+            nbr = arc_node[i]
+            if nbr in done:
+                continue
+            e = arc_edge[i]
+            nd = d + weights[e]
+            if nd < dist.get(nbr, inf):
+                dist[nbr] = nd
+                prev[nbr] = (node, e)
+                push(heap, (nd, nbr))
+    return dist, prev, done
+
+
+def suurballe(
+    indptr: Sequence[int], arc_node: Sequence[int], arc_edge: Sequence[int], weights: Sequence[float],
+    source: int, target: int, target_tree: Optional[Tree] = None,
+) -> List[Path]:
+    """
+    Два кратчайших реберно-непересекающихся пути source -> target (алгоритм Суурбалле).
+
+    Первый Дейкстра от source до target дает первый путь и потенциалы p(x) =
+    min(d(x), d(target)): приведенные веса w + p(u) - p(v) от усечения не
+    становятся отрицательными. С готовым полным деревом target_tree от target
+    первый путь читается из дерева, а потенциалы p(x) = -d(target, x) точно
+    направляют второй поиск к цели. Второй Дейкстра идет по остаточной сети:
+    ребра первого пути доступны только в обратную сторону с приведенным весом 0.
+    Ребра, пройденные обоими путями навстречу, взаимно сокращаются, остаток
+    раскладывается на два пути. Возвращает 0, 1 или 2 пути, короче первым.
+    """
+    if source == target:
+        return [([source], [])]
+    to_target = target_tree is not None
+    if to_target:
+        dist, prev, done = target_tree
+        if source not in done:
+            return []
+        nodes, edges = _unwind(prev, target, source)
+        first = (nodes[::-1], edges[::-1])
+    else:
+        dist, prev, done = shortest_tree(indptr, arc_node, arc_edge, weights, source, target)
+        if target not in done:
+            return []
+        first = _unwind(prev, source, target)
+        limit = dist[target]
+    # ребро первого пути -> (откуда, куда) в направлении этого пути
+    used = {e: (first[0][k], first[0][k + 1]) for k, e in enumerate(first[1])}
+
+    dist2 = {source: 0.0}
+    prev2: Dict[int, Tuple[int, int]] = {}
+    done2 = set()
+    heap = [(0.0, source)]
+    pop, push, inf = heapq.heappop, heapq.heappush, math.inf
+    while heap:
+        d, node = pop(heap)
+        if node in done2:
+            continue
+        done2.add(node)
+        if node == target:
+            break
+        if to_target:
+            base = d - dist[node]
+        else:
+            base = d + (dist[node] if node in done and dist[node] < limit else limit)
+        for i in range(indptr[node], indptr[node + 1]):
+            nbr = arc_node[i]
+            if nbr in done2 or nbr == node:
+                continue
+            e = arc_edge[i]
+            direction = used.get(e)
+            if direction is None:
+                cost = weights[e]
+            elif direction[0] == nbr:
+                cost = -weights[e]
+            else:
+                continue
+            if to_target:
+                nd = base + cost + dist[nbr]
+            else:
+                nd = base + cost - (dist[nbr] if nbr in done and dist[nbr] < limit else limit)
+            if nd < d:
+                nd = d
+            if nd < dist2.get(nbr, inf):
+                dist2[nbr] = nd
+                prev2[nbr] = (node, e)
+                push(heap, (nd, nbr))
+    if target not in done2:
+        return [first]
+
+    second = _unwind(prev2, source, target)
+    cancelled = {e for e in second[1] if e in used}
+    out: Dict[int, List[Tuple[int, int]]] = {}
+    for nodes, edges in (first, second):
+        for k, e in enumerate(edges):
+            if e not in cancelled:
+                out.setdefault(nodes[k], []).append((nodes[k + 1], e))
+
+    paths = []
+    for _ in range(2):
+        nodes, edges = [source], []
+        while nodes[-1] != target:
+            nxt, e = out[nodes[-1]].pop()
+            nodes.append(nxt)
+            edges.append(e)
+        paths.append((nodes, edges))
+    paths.sort(key=lambda path: sum(weights[e] for e in path[1]))
+    return paths
+
+
+def audit_group(
+    indptr: Sequence[int], arc_node: Sequence[int], arc_edge: Sequence[int], weights: Sequence[float],
+    core: int, members: List[int],
+) -> List[List[Path]]:
+    """
+    Пути от нескольких объектов к одному узлу ядра.
+
+    Одно полное дерево Дейкстры от узла ядра служит всем объектам группы: оно
+    дает и первый путь, и точные потенциалы, так что на объект остается только
+    направленный к ядру поиск по остаточной сети.
+    """
+    if len(members) == 1:
+        return [suurballe(indptr, arc_node, arc_edge, weights, members[0], core)]
+    tree = shortest_tree(indptr, arc_node, arc_edge, weights, core)
+    return [suurballe(indptr, arc_node, arc_edge, weights, member, core, tree) for member in members]
+
+
+def _unwind(prev: Dict[int, Tuple[int, int]], source: int, target: int) -> Path:
+    nodes, edges = [target], []
+    while nodes[-1] != source:
+        node, e = prev[nodes[-1]]
+        nodes.append(node)
+        edges.append(e)
+    nodes.reverse()
+    edges.reverse()
+    return nodes, edges
+
+
+def _init_worker(indptr, arc_node, arc_edge, weights) -> None:
+    global _worker_graph
+    _worker_graph = (indptr.tolist(), arc_node.tolist(), arc_edge.tolist(), weights.tolist())
+
+
+def _audit_shard(core: int, members: List[int]) -> List[List[Path]]:
+    return audit_group(*_worker_graph, core, members)
+
+
+class DiversePaths:
+    """Снимок CSR активных ребер на версию данных; пути по индексам узлов графа"""
+
+    def __init__(self, graph: TopologyGraph):
+        self.graph = graph
+        self._snapshot: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _csr(self, db: Session) -> Dict[str, Any]:
+        version = events.dataset_version()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] == version:
+                return self._snapshot[1]
+            self.graph.sync(db)
+            sub = self.graph.subgraph()
+            # без фильтров локальная нумерация узлов совпадает с глобальной
+            snapshot = {
+                "indptr": sub["indptr"],
+                "arc_node": sub["arc_node"],
+                "arc_edge": sub["arc_edge"],
+                "weights": list(self.graph.edge_w),
+                "node_ids": list(self.graph.node_ids),
+                "node_index": dict(self.graph.node_index),
+                "edge_cable": list(self.graph.edge_cable),
+            }
+            self._snapshot = (version, snapshot)
+            return snapshot
+
+    def _describe(self, csr: Dict[str, Any], from_object_id: int, to_object_id: int, paths: List[Path]) -> Dict[str, Any]:
+        node_ids, edge_cable, weights = csr["node_ids"], csr["edge_cable"], csr["weights"]
+        described = [
+            {
+                "hop_count": len(edges),
+                "distance_km": round(sum(weights[e] for e in edges), 6),
+                "object_ids": [node_ids[n] for n in nodes],
+                "cable_ids": [edge_cable[e] for e in edges],
+            }
+            for nodes, edges in paths
+        ]
+        shared = []
+        if len(paths) == 2:
+            # общие промежуточные объекты: пути не делят кабели, но могут делить узлы
+            inner = set(paths[0][0][1:-1])
+            shared = sorted(node_ids[n] for n in set(paths[1][0][1:-1]) if n in inner)
+        return {
+            "from_object_id": from_object_id,
+            "to_object_id": to_object_id,
+            "diverse": len(paths) == 2 and from_object_id != to_object_id,
+            "path_count": len(paths),
+            "total_distance_km": round(sum(path["distance_km"] for path in described), 6),
+            "shared_object_ids": shared,
+            "paths": described,
+        }
+
+    def pair(self, db: Session, from_object_id: int, to_object_id: int) -> Dict[str, Any]:
+        """Пара непересекающихся путей между двумя объектами; KeyError - объекта нет в графе"""
+        started = time.perf_counter()
+        csr = self._csr(db)
+        source, target = csr["node_index"][from_object_id], csr["node_index"][to_object_id]
+        paths = suurballe(csr["indptr"], csr["arc_node"], csr["arc_edge"], csr["weights"], source, target)
+        return {
+            **self._describe(csr, from_object_id, to_object_id, paths),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def audit(
+        self, db: Session, pairs: Iterable[Tuple[int, int]], only_failures: bool = False, workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Проверить разнесенность маршрутов для многих пар сразу.
+
+        Пары группируются по второму объекту (узлу ядра), см. audit_group.
+        Небольшие пакеты считаются в текущем процессе: запуск пула дороже самих
+        поисков. Иначе группы делятся на шарды, а каждый процесс пула получает
+        снимок графа один раз, при старте.
+        """
+        started = time.perf_counter()
+        csr = self._csr(db)
+        node_index = csr["node_index"]
+        pairs = list(dict.fromkeys(pairs))
+        missing = sorted({o for pair in pairs for o in pair if o not in node_index})
+        pairs = [pair for pair in pairs if pair[0] in node_index and pair[1] in node_index]
+        groups: Dict[int, List[int]] = {}
+        for position, (a, b) in enumerate(pairs):
+            groups.setdefault(node_index[b], []).append(position)
+
+        workers = settings.DIVERSE_PATH_WORKERS if workers is None else workers
+        parallel = workers > 1 and len(pairs) >= settings.DIVERSE_PATH_PARALLEL_MIN_PAIRS
+        # несколько шардов на процесс, чтобы выровнять нагрузку
+        shard_size = max(1, math.ceil(len(pairs) / (workers * 4))) if parallel else len(pairs)
+        shards = [
+            (core, positions[i:i + shard_size])
+            for core, positions in groups.items() for i in range(0, len(positions), shard_size)
+        ]
+        cores = [core for core, _positions in shards]
+        members = [[node_index[pairs[p][0]] for p in positions] for _core, positions in shards]
+        if parallel:
+            initargs = tuple(
+                np.asarray(csr[key], dtype=np.float64 if key == "weights" else np.int64)
+                for key in ("indptr", "arc_node", "arc_edge", "weights")
+            )
+            # spawn: fork из процесса с потоками uvicorn небезопасен
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=initargs,
+            ) as pool:
+                shard_results = list(pool.map(_audit_shard, cores, members))
+        else:
+            args = (csr["indptr"], csr["arc_node"], csr["arc_edge"], csr["weights"])
+            shard_results = [audit_group(*args, core, shard) for core, shard in zip(cores, members)]
+        results: List[List[Path]] = [[] for _ in pairs]
+        for (_core, positions), shard in zip(shards, shard_results):
+            for position, paths in zip(positions, shard):
+                results[position] = paths
+
+        described = [self._describe(csr, a, b, paths) for (a, b), paths in zip(pairs, results)]
+        diverse = sum(1 for item in described if item["diverse"])
+        return {
+            "pair_count": len(described),
+            "diverse_count": diverse,
+            "not_diverse_count": len(described) - diverse,
+            "missing_object_ids": missing,
+            "results": [item for item in described if not (only_failures and item["diverse"])],
+            "workers": workers if parallel else 1,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+diverse_paths = DiversePaths(topology_graph)
@@ -0,0 +1,300 @@
+"""
+Fiber allocation: reserves free fibers on a cable or along a path with
+optimistic concurrency - a compare-and-set on each cable's occupancy_version
+instead of table locks, retried when a concurrent writer got there first
+"""
+
+import random
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from ..models.cable import Cable
+from ..models.fiber_reservation import FiberReservation
+from .topology import occupancy_bitmaps, topology_graph
+
+ID_CHUNK = 500
+# пауза перед повтором: случайная, с верхней границей, удваивающейся до RETRY_BACKOFF_MAX_S
+RETRY_BACKOFF_S = 0.002
+RETRY_BACKOFF_MAX_S = 0.1
+
+_BUMPED_KEY = "occupancy_bumped"
+
+
+class AllocationConflict(Exception):
+    """Свободных волокон не хватает или занятость кабелей менялась на каждой попытке"""
+
+    def __init__(self, message: str, conflicts: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.message = message
+        self.conflicts = conflicts or []
+
+
+def _bump_versions(db: Session, cable_ids: Iterable[int]) -> None:
+    ids = list(cable_ids)
+    for i in range(0, len(ids), ID_CHUNK):
+        db.execute(
+            update(Cable).where(Cable.cable_id.in_(ids[i:i + ID_CHUNK]))
+            .values(occupancy_version=Cable.occupancy_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def lock_occupancy(db: Session, cable_ids: Iterable[int]) -> None:
+    """
+    Сдвинуть версии кабелей до проверки их занятости: запись берет блокировку,
+    и параллельный писатель тех же кабелей ждет коммита, а не проходит проверку
+    по старым данным
+    """
+    bumped = db.info.setdefault(_BUMPED_KEY, set())
+    ids = {cable_id for cable_id in cable_ids if cable_id is not None} - bumped
+    _bump_versions(db, sorted(ids))
+    bumped.update(ids)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_changed_occupancy(session: Session) -> None:
+    # любая запись сварок или резервов сдвигает версии затронутых кабелей,
+    # чтобы параллельное выделение, прочитавшее старую занятость, не прошло CAS
+    if session.in_nested_transaction():
+        return
+    bumped = session.info.pop(_BUMPED_KEY, set())
+    changed = events.pending_changes(session, events.SPLICES_CHANGED)
+    if changed is None:
+        session.execute(
+            update(Cable).values(occupancy_version=Cable.occupancy_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    elif changed - bumped:
+        _bump_versions(session, changed - bumped)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_bumped(session: Session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_BUMPED_KEY, None)
+
+
+def _lowest_bits(free: int, count: int) -> Optional[List[int]]:
+    numbers = []
+    while free and len(numbers) < count:
+        low = free & -free
+        numbers.append(low.bit_length() - 1)
+        free ^= low
+    return numbers if len(numbers) == count else None
+
+
+def _first_run(free: int, count: int) -> Optional[List[int]]:
+    # бит i остается, только если свободны волокна i..i+count-1
+    run = free
+    for k in range(1, count):
+        run &= free >> k
+        if not run:
+            return None
+    if not run:
+        return None
+    start = (run & -run).bit_length() - 1
+    return list(range(start, start + count))
+
+
+def _pick(free: int, count: int, contiguous: bool) -> Optional[List[int]]:
+    return _first_run(free, count) if contiguous else _lowest_bits(free, count)
+
+
+def _choose(
+    cable_ids: List[int],
+    state: Dict[int, Tuple[int, int]],
+    occupied: Dict[int, int],
+    count: Optional[int],
+    fiber_numbers: Optional[List[int]],
+    contiguous: bool,
+) -> Dict[int, List[int]]:
+    """
+    Волокна для каждого кабеля.
+
+    Заданные номера проверяются как есть; при выделении по количеству сначала
+    ищутся одни и те же номера на всех кабелях пути (их проще сварить), а если
+    таких нет - первые подходящие на каждом кабеле отдельно.
+    """
+    free = {
+        cable_id: ~occupied.get(cable_id, 0) & ((1 << state[cable_id][0]) - 1)
+        for cable_id in cable_ids
+    }
+    conflicts: List[Dict[str, Any]] = []
+    if fiber_numbers is not None:
+        for cable_id in cable_ids:
+            for fiber in fiber_numbers:
+                if not free[cable_id] >> fiber & 1:
+                    conflicts.append({"cable_id": cable_id, "fiber_number": fiber, "reason": "occupied"})
+        if conflicts:
+            raise AllocationConflict("Requested fibers are already spliced or reserved", conflicts)
+        return {cable_id: list(fiber_numbers) for cable_id in cable_ids}
+
+    common = -1
+    for cable_id in cable_ids:
+        common &= free[cable_id]
+    shared = _pick(common, count, contiguous)
+    if shared is not None:
+        return {cable_id: shared for cable_id in cable_ids}
+    chosen: Dict[int, List[int]] = {}
+    for cable_id in cable_ids:
+        numbers = _pick(free[cable_id], count, contiguous)
+        if numbers is None:
+            conflicts.append({
+                "cable_id": cable_id, "free_fibers": free[cable_id].bit_count(),
+                "reason": "no_contiguous_run" if contiguous else "not_enough_free",
+            })
+        chosen[cable_id] = numbers
+    if conflicts:
+        raise AllocationConflict(f"Not enough free fibers for {count} on every cable", conflicts)
+    return chosen
+
+
+def _load_state(db: Session, cable_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+    """fiber_count и occupancy_version кабелей"""
+    state: Dict[int, Tuple[int, int]] = {}
+    for i in range(0, len(cable_ids), ID_CHUNK):
+        for cable_id, fiber_count, version in db.query(
+            Cable.cable_id, Cable.fiber_count, Cable.occupancy_version
+        ).filter(Cable.cable_id.in_(cable_ids[i:i + ID_CHUNK])).all():
+            state[cable_id] = (fiber_count or 0, version or 0)
+    return state
+
+
+def resolve_path(db: Session, from_object_id: int, to_object_id: int, min_free_fibers: int) -> List[int]:
+    """Кабели кратчайшего пути, где на каждом кабеле есть нужное число свободных волокон"""
+    topology_graph.sync(db)
+    for object_id in (from_object_id, to_object_id):
+        if object_id not in topology_graph.node_index:
+            raise ValueError(f"Network object {object_id} not found")
+    path = topology_graph.shortest_path(from_object_id, to_object_id, "distance", None, min_free_fibers)
+    if path is None or not path["cable_ids"]:
+        raise AllocationConflict("No path with enough free fibers between these objects")
+    return path["cable_ids"]
+
+
+def allocate_fibers(
+    db: Session,
+    cable_ids: Iterable[int],
+    count: Optional[int] = None,
+    fiber_numbers: Optional[List[int]] = None,
+    contiguous: bool = True,
+    label: Optional[str] = None,
+    user_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Зарезервировать волокна на кабелях атомарно.
+
+    Каждая попытка читает версии кабелей, затем их занятость, выбирает волокна
+    и переводит версии UPDATE ... WHERE occupancy_version = прочитанной. Если
+    хоть один кабель успел измениться, попытка откатывается и повторяется;
+    уникальный индекс резервов страхует от писателей, минующих версии.
+    """
+    cable_ids = list(dict.fromkeys(cable_ids))
+    if not cable_ids:
+        raise ValueError("No cables to allocate on")
+    if fiber_numbers is not None and len(set(fiber_numbers)) != len(fiber_numbers):
+        raise ValueError("fiber_numbers contains duplicates")
+
+    for attempt in range(1, settings.FIBER_ALLOCATION_MAX_ATTEMPTS + 1):
+        state = _load_state(db, cable_ids)
+        missing = [cable_id for cable_id in cable_ids if cable_id not in state]
+        if missing:
+            raise ValueError(f"Cables not found: {missing}")
+        if fiber_numbers is not None:
+            for cable_id in cable_ids:
+                out_of_range = [f for f in fiber_numbers if not 0 <= f < state[cable_id][0]]
+                if out_of_range:
+                    raise ValueError(
+                        f"Fibers {out_of_range} do not exist in cable {cable_id} ({state[cable_id][0]} fibers)"
+                    )
+        chosen = _choose(cable_ids, state, occupancy_bitmaps(db, cable_ids), count, fiber_numbers, contiguous)
+
+        swapped = True
+        for cable_id in sorted(cable_ids):
+            result = db.execute(
+                update(Cable)
+                .where(Cable.cable_id == cable_id, Cable.occupancy_version == state[cable_id][1])
+                .values(occupancy_version=state[cable_id][1] + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                swapped = False
+                break
+
+        if swapped:
+            allocation_id = str(uuid.uuid4())
+            db.execute(insert(FiberReservation), [
+                {
+                    "allocation_id": allocation_id, "cable_id": cable_id, "fiber_number": fiber,
+                    "label": label, "reserved_by": user_id,
+                }
+                for cable_id in cable_ids for fiber in chosen[cable_id]
+            ])
+            db.info.setdefault(_BUMPED_KEY, set()).update(cable_ids)
+            events.mark_changed(db, events.SPLICES_CHANGED, cable_ids)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+            else:
+                return {
+                    "allocation_id": allocation_id,
+                    "label": label,
+                    "attempts": attempt,
+                    "cables": [
+                        {
+                            "cable_id": cable_id,
+                            "fiber_numbers": chosen[cable_id],
+                            "occupancy_version": state[cable_id][1] + 1,
+                        }
+                        for cable_id in cable_ids
+                    ],
+                }
+        else:
+            db.rollback()
+        time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX_S, RETRY_BACKOFF_S * 2 ** attempt)))
+
+    raise AllocationConflict(
+        f"Cable occupancy kept changing during {settings.FIBER_ALLOCATION_MAX_ATTEMPTS} attempts, try again"
+    )
+
+
+def consume_reservations(db: Session, allocation_id: str, splices: Iterable[Dict[str, Any]]) -> int:
+    """
+    Снять резервы выделения с волокон, которые заняли его сварки: дальше волокно
+    держит сварка. Коммит остается за вызывающим; возвращает число снятых резервов.
+    """
+    fibers: Dict[int, set] = {}
+    for splice in splices:
+        for cable_id, fiber in ((splice["cable_id"], splice["fiber_number"]),
+                                (splice.get("splice_to_cable_id"), splice.get("splice_to_fiber"))):
+            if cable_id is not None and fiber is not None:
+                fibers.setdefault(cable_id, set()).add(fiber)
+    consumed = 0
+    for cable_id, numbers in fibers.items():
+        consumed += db.execute(delete(FiberReservation).where(
+            FiberReservation.allocation_id == allocation_id,
+            FiberReservation.cable_id == cable_id,
+            FiberReservation.fiber_number.in_(sorted(numbers)),
+        )).rowcount
+    if consumed:
+        events.mark_changed(db, events.SPLICES_CHANGED, fibers.keys())
+    return consumed
+
+
+def release_allocation(db: Session, allocation_id: str) -> int:
+    """Снять все резервы выделения; возвращает число освобожденных волокон"""
+    cable_ids = {
+        row[0] for row in db.query(FiberReservation.cable_id).filter(FiberReservation.allocation_id == allocation_id).all()
+    }
+    if not cable_ids:
+        return 0
+    released = db.execute(delete(FiberReservation).where(FiberReservation.allocation_id == allocation_id)).rowcount
+    events.mark_changed(db, events.SPLICES_CHANGED, cable_ids)
+    db.commit()
+    return released
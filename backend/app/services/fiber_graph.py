@@ -0,0 +1,323 @@
+"""
+In-memory fiber-level splice graph for end-to-end path tracing, kept current
+from change events instead of being re-read on every request
+"""
+
+import threading
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.cable import Cable
+from ..models.fiber_splice import FiberSplice
+from .splice_integrity import (
+    FROM_END, TO_END, FiberEnd, ID_CHUNK, SPLICE_COLUMNS,
+    splice_from_row, load_touching_splices, splice_fiber_ends,
+)
+
+# fiber_count, from_object_id, to_object_id, distance_km, name, cable_type_id;
+# первые три поля совпадают с CableInfo из splice_integrity
+GraphCable = Tuple[Optional[int], int, int, Optional[float], str, int]
+
+CABLE_COLUMNS = (
+    Cable.cable_id, Cable.fiber_count, Cable.from_object_id, Cable.to_object_id, Cable.distance_km, Cable.name,
+    Cable.cable_type_id,
+)
+
+
+class FiberGraph:
+    """
+    Смежность концов волокон: (cable, fiber, end) -> (cable', fiber', end', splice_id).
+
+    Граф строится при первом обращении. Обработчики событий только копят id
+    измененных кабелей, а перечитываются они при следующем sync(): загружаются
+    заново лишь эти кабели и касающиеся их сварки.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cables: Dict[int, GraphCable] = {}
+        self._splices: Dict[int, Dict[str, Any]] = {}
+        self._by_cable: Dict[int, Set[int]] = {}
+        self._links: Dict[FiberEnd, Tuple[FiberEnd, int]] = {}
+        self._stale = True
+        self._dirty: Set[int] = set()
+        # пути с накопленными длинами для locate(): по каждому волокну пути и по
+        # кабелям, чтобы сбросить пути через измененные кабели и их сварки
+        self._paths: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._paths_by_cable: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self.stats: Dict[str, int] = {"rebuilds": 0, "refreshes": 0}
+
+    def invalidate(self, cable_ids: Optional[Set[int]]) -> None:
+        """Обработчик событий: отметить кабели (или весь граф) устаревшими"""
+        with self._lock:
+            if cable_ids is None:
+                self._stale = True
+            else:
+                self._dirty |= cable_ids
+
+    def sync(self, db: Session) -> None:
+        """Применить накопленные изменения перед чтением"""
+        with self._lock:
+            if self._stale:
+                self._rebuild(db)
+            elif self._dirty:
+                self._refresh(db, self._dirty)
+            self._dirty = set()
+
+    def _rebuild(self, db: Session) -> None:
+        self._cables = {row[0]: tuple(row[1:]) for row in db.query(*CABLE_COLUMNS).all()}
+        self._splices = {}
+        self._by_cable = {}
+        self._links = {}
+        self._paths = {}
+        self._paths_by_cable = {}
+        for row in db.query(*SPLICE_COLUMNS).order_by(FiberSplice.fiber_splices_id).all():
+            self._add_splice(splice_from_row(row))
+        self._stale = False
+        self.stats["rebuilds"] += 1
+
+    def _refresh(self, db: Session, cable_ids: Set[int]) -> None:
+        # смена концов кабеля переносит место его сварок, поэтому связи
+        # перестраиваются для всех сварок, касающихся измененных кабелей
+        self._drop_paths(cable_ids)
+        for cable_id in cable_ids:
+            for splice_id in list(self._by_cable.get(cable_id, ())):
+                self._remove_splice(splice_id)
+            self._cables.pop(cable_id, None)
+        ids = list(cable_ids)
+        for i in range(0, len(ids), ID_CHUNK):
+            for row in db.query(*CABLE_COLUMNS).filter(Cable.cable_id.in_(ids[i:i + ID_CHUNK])).all():
+                self._cables[row[0]] = tuple(row[1:])
+        for splice in sorted(load_touching_splices(db, cable_ids), key=lambda s: s["fiber_splices_id"]):
+            self._add_splice(splice)
+        self.stats["refreshes"] += 1
+
+    def _add_splice(self, splice: Dict[str, Any]) -> None:
+        splice_id = splice["fiber_splices_id"]
+        self._splices[splice_id] = splice
+        for cable_id in (splice["cable_id"], splice["splice_to_cable_id"]):
+            if cable_id is not None:
+                self._by_cable.setdefault(cable_id, set()).add(splice_id)
+        ends = splice_fiber_ends(splice, self._cables)
+        # конфликтующие сварки (см. splice_integrity) не перекрывают уже связанный конец
+        if ends and ends[0] != ends[1] and ends[0] not in self._links and ends[1] not in self._links:
+            self._links[ends[0]] = (ends[1], splice_id)
+            self._links[ends[1]] = (ends[0], splice_id)
+
+    def _remove_splice(self, splice_id: int) -> None:
+        splice = self._splices.pop(splice_id, None)
+        if splice is None:
+            return
+        for cable_id in (splice["cable_id"], splice["splice_to_cable_id"]):
+            self._by_cable.get(cable_id, set()).discard(splice_id)
+        for end in splice_fiber_ends(splice, self._cables):
+            link = self._links.get(end)
+            if link is not None and link[1] == splice_id:
+                del self._links[end]
+
+    def cable(self, cable_id: int) -> Optional[GraphCable]:
+        return self._cables.get(cable_id)
+
+    def _walk(self, start: FiberEnd, seen: Set[Tuple[int, int]]) -> Tuple[List[Tuple[int, int, int, int]], bool]:
+        """Идти от конца волокна через сварки: [(splice_id, cable, fiber, вход), ...], замкнулся ли путь"""
+        steps = []
+        end = start
+        while True:
+            link = self._links.get(end)
+            if link is None:
+                return steps, False
+            (cable_id, fiber, entered), splice_id = link
+            if (cable_id, fiber) in seen:
+                return steps, True
+            seen.add((cable_id, fiber))
+            steps.append((splice_id, cable_id, fiber, entered))
+            end = (cable_id, fiber, 1 - entered)
+
+    def _chain(self, cable_id: int, fiber_number: int, seen: Set[Tuple[int, int]]) -> Dict[str, Any]:
+        """Цепочка волокна от конца A к Z: кабели, сварки между ними и объекты"""
+        back, back_loop = self._walk((cable_id, fiber_number, FROM_END), seen)
+        forward, forward_loop = self._walk((cable_id, fiber_number, TO_END), seen)
+        # (cable, конец входа) по порядку от A к Z
+        legs = [(c, 1 - entered) for _, c, _, entered in reversed(back)]
+        legs.append((cable_id, FROM_END))
+        legs.extend((c, entered) for _, c, _, entered in forward)
+        objects = [self._cables[legs[0][0]][1 + legs[0][1]]]
+        objects.extend(self._cables[c][2 - entered] for c, entered in legs)
+        return {
+            "cables": [c for c, _ in legs],
+            "splices": [s for s, _, _, _ in reversed(back)] + [s for s, _, _, _ in forward],
+            "objects": objects,
+            "loop": back_loop or forward_loop,
+        }
+
+    def circuits(self) -> List[Dict[str, Any]]:
+        """
+        Все сваренные цепочки волокон: кабели, сварки и объекты по порядку от конца A к Z.
+
+        Волокна без сварок не входят - они никуда не ведут дальше своего кабеля.
+        """
+        with self._lock:
+            seen: Set[Tuple[int, int]] = set()
+            result = []
+            for cable_id, fiber_number, _ in list(self._links):
+                if (cable_id, fiber_number) in seen or cable_id not in self._cables:
+                    continue
+                seen.add((cable_id, fiber_number))
+                result.append({**self._chain(cable_id, fiber_number, seen), "start": (cable_id, fiber_number)})
+            return result
+
+    def chains(self, fibers: List[Tuple[int, int]]) -> List[Optional[Dict[str, Any]]]:
+        """Цепочки заданных волокон; None для несуществующего кабеля или номера волокна"""
+        with self._lock:
+            result: List[Optional[Dict[str, Any]]] = []
+            for cable_id, fiber_number in fibers:
+                info = self._cables.get(cable_id)
+                if info is None or not 0 <= fiber_number < (info[0] or 0):
+                    result.append(None)
+                    continue
+                result.append(self._chain(cable_id, fiber_number, {(cable_id, fiber_number)}))
+            return result
+
+    def _drop_paths(self, cable_ids: Set[int]) -> None:
+        for cable_id in cable_ids:
+            for path in list(self._paths_by_cable.get(cable_id, {}).values()):
+                for leg_cable, leg_fiber, _ in path["legs"]:
+                    self._paths.pop((leg_cable, leg_fiber), None)
+                    self._paths_by_cable.get(leg_cable, {}).pop(id(path), None)
+
+    def _path(self, cable_id: int, fiber_number: int) -> Dict[str, Any]:
+        """Путь волокна от A к Z с накопленной длиной на конце каждого участка (из кеша)"""
+        path = self._paths.get((cable_id, fiber_number))
+        if path is not None:
+            return path
+        seen = {(cable_id, fiber_number)}
+        back, back_loop = self._walk((cable_id, fiber_number, FROM_END), seen)
+        forward, forward_loop = self._walk((cable_id, fiber_number, TO_END), seen)
+        # (cable, fiber, конец входа) по порядку от A к Z
+        legs = [(c, f, 1 - entered) for _, c, f, entered in reversed(back)]
+        legs.append((cable_id, fiber_number, FROM_END))
+        legs.extend((c, f, entered) for _, c, f, entered in forward)
+        lengths = [self._cables[c][3] for c, _, _ in legs]
+        path = {
+            "legs": legs,
+            "index": {(c, f): i for i, (c, f, _) in enumerate(legs)},
+            "ends": list(accumulate(length or 0.0 for length in lengths)),
+            "complete": None not in lengths,
+            "loop": back_loop or forward_loop,
+        }
+        for c, f, _ in legs:
+            self._paths[(c, f)] = path
+            self._paths_by_cable.setdefault(c, {})[id(path)] = path
+        return path
+
+    def locate(
+        self, cable_id: int, fiber_number: int, distance_km: float, from_object_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Точка пути волокна на расстоянии distance_km от его конца (рефлектометрия).
+
+        Отсчет идет от конца from_object_id, а без него - от конца пути со стороны
+        начала заданного кабеля, как в trace(). Участок находится бинарным поиском
+        по накопленным длинам, кабели без длины считаются нулевыми.
+        """
+        with self._lock:
+            path = self._path(cable_id, fiber_number)
+            legs, ends = path["legs"], path["ends"]
+            a_end = self._cables[legs[0][0]][1 + legs[0][2]]
+            z_end = self._cables[legs[-1][0]][2 - legs[-1][2]]
+            if from_object_id is None:
+                reverse = legs[path["index"][(cable_id, fiber_number)]][2] != FROM_END
+            elif from_object_id in (a_end, z_end):
+                reverse = from_object_id != a_end
+            else:
+                raise ValueError(f"Object {from_object_id} is not an end of this fiber path ({a_end}, {z_end})")
+
+            total = ends[-1]
+            if distance_km > total + 1e-9:
+                raise ValueError(f"Distance {distance_km} km is beyond the end of the fiber path ({round(total, 6)} km)")
+            position = total - distance_km if reverse else distance_km
+            i = min(bisect_left(ends, position), len(legs) - 1)
+            leg_cable, leg_fiber, entered = legs[i]
+            info = self._cables[leg_cable]
+            length = info[3]
+            near, far = info[1 + entered], info[2 - entered]
+            offset = position - (ends[i - 1] if i else 0.0)
+            if reverse:
+                near, far = far, near
+                offset = (length or 0.0) - offset
+            offset = min(max(offset, 0.0), length or 0.0)
+
+        return {
+            "cable_id": leg_cable,
+            "cable_name": info[4],
+            "fiber_number": leg_fiber,
+            "hop_index": len(legs) - 1 - i if reverse else i,
+            "from_object_id": near,
+            "to_object_id": far,
+            "offset_km": round(offset, 6),
+            "cable_distance_km": length,
+            "fraction": offset / length if length else 0.0,
+            "measured_from_object_id": z_end if reverse else a_end,
+            "path_length_km": round(total, 6),
+            "distance_complete": path["complete"],
+            "loop": path["loop"],
+        }
+
+    def splice(self, splice_id: int) -> Optional[Dict[str, Any]]:
+        return self._splices.get(splice_id)
+
+    def trace(self, cable_id: int, fiber_number: int) -> Dict[str, Any]:
+        """Путь волокна в обе стороны до концов: участки по порядку от конца A к концу Z"""
+        with self._lock:
+            seen = {(cable_id, fiber_number)}
+            back, back_loop = self._walk((cable_id, fiber_number, FROM_END), seen)
+            forward, forward_loop = self._walk((cable_id, fiber_number, TO_END), seen)
+
+            # (cable, fiber, конец входа, сварка с предыдущим участком)
+            legs = []
+            for i in range(len(back) - 1, -1, -1):
+                _, leg_cable, leg_fiber, entered = back[i]
+                legs.append((leg_cable, leg_fiber, 1 - entered, back[i + 1][0] if i + 1 < len(back) else None))
+            legs.append((cable_id, fiber_number, FROM_END, back[0][0] if back else None))
+            for splice_id, leg_cable, leg_fiber, entered in forward:
+                legs.append((leg_cable, leg_fiber, entered, splice_id))
+
+            hops = []
+            total = 0.0
+            complete = True
+            for leg_cable, leg_fiber, entered, splice_id in legs:
+                info = self._cables[leg_cable]
+                distance = info[3]
+                if distance is None:
+                    complete = False
+                else:
+                    total += distance
+                hops.append({
+                    "cable_id": leg_cable,
+                    "cable_name": info[4],
+                    "fiber_number": leg_fiber,
+                    "from_object_id": info[1 + entered],
+                    "to_object_id": info[2 - entered],
+                    "splice_id": splice_id,
+                    "distance_km": distance,
+                    "cumulative_distance_km": round(total, 6),
+                })
+
+        return {
+            "cable_id": cable_id,
+            "fiber_number": fiber_number,
+            "a_end_object_id": hops[0]["from_object_id"],
+            "z_end_object_id": hops[-1]["to_object_id"],
+            "hop_count": len(hops),
+            "total_distance_km": round(total, 6),
+            "distance_complete": complete,
+            "loop": back_loop or forward_loop,
+            "hops": hops,
+        }
+
+
+fiber_graph = FiberGraph()
+events.subscribe(events.SPLICES_CHANGED, fiber_graph.invalidate)
+events.subscribe(events.CABLES_CHANGED, fiber_graph.invalidate)
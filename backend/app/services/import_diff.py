@@ -0,0 +1,378 @@
+"""
+Dry-run diff and hash-based upsert for schema and GeoJSON imports
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy import insert, update
+from ..core import events
+from ..models.network_object import NetworkObject
+from ..models.cable import Cable
+from ..models.fiber_splice import FiberSplice
+from ..models.entity_hash import EntityHash
+from ..utils.content_hash import HASH_PROFILES, content_hash
+from .cable_distances import propagate_object_moves
+from .importers import ImportContext, schema_stages, geojson_stages
+from .import_validation import validate_stages
+from .object_index import SnapIndex, object_index
+
+SAMPLE_SIZE = 10
+DIFF_STATUSES = ("created", "updated", "unchanged", "deleted")
+# изменение этих полей объекта - перемещение, длины кабелей пересчитываются
+MOVE_FIELDS = ("latitude", "longitude")
+
+# проверка строки перед записью: (текущие значения или None, новые) -> причина отказа или None
+Admit = Callable[[Optional[Dict[str, Any]], Dict[str, Any]], Optional[str]]
+
+# модель, первичный ключ и естественный ключ для каждого профиля
+ENTITY_MODELS = {
+    "object": (NetworkObject, "network_object_id", lambda v: v["name"]),
+    "object_geo": (NetworkObject, "network_object_id", lambda v: v["name"]),
+    "cable": (Cable, "cable_id", lambda v: v["name"]),
+    "cable_geo": (Cable, "cable_id", lambda v: v["name"]),
+    "splice": (FiberSplice, "fiber_splices_id", lambda v: (v["cable_id"], v["fiber_number"])),
+}
+
+# тема оповещения по профилю; для сварок передаются id кабелей
+ENTITY_TOPICS = {
+    "object": events.OBJECTS_CHANGED,
+    "object_geo": events.OBJECTS_CHANGED,
+    "cable": events.CABLES_CHANGED,
+    "cable_geo": events.CABLES_CHANGED,
+    "splice": events.SPLICES_CHANGED,
+}
+
+
+def _placeholder(key: Hashable) -> str:
+    # в режиме diff у новых строк нет id; заглушка участвует в хешах зависимых строк
+    return f"new:{key}"
+
+
+def _chunks(items: List[Any], size: int = 500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class EntityDiff:
+    """Счетчики и примеры по одному типу сущностей"""
+
+    def __init__(self):
+        self.counts = {status: 0 for status in DIFF_STATUSES}
+        self.counts["skipped"] = 0
+        self.samples: Dict[str, List[Any]] = {status: [] for status in DIFF_STATUSES}
+        # отвергнутые проверкой строки по причинам; входят в skipped
+        self.rejected: Dict[str, int] = {}
+        # объекты с измененными координатами
+        self.moved_ids: List[int] = []
+
+    def reject(self, reason: str) -> None:
+        self.counts["skipped"] += 1
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def record(self, status: str, label: Any) -> None:
+        self.counts[status] += 1
+        if status in self.samples and len(self.samples[status]) < SAMPLE_SIZE:
+            self.samples[status].append(label)
+
+    def report(self) -> Dict[str, Any]:
+        return {**self.counts, "rejected": self.rejected, "samples": self.samples}
+
+
+def _sync_entities(
+    ctx: ImportContext,
+    profile: str,
+    incoming: List[Tuple[Any, Dict[str, Any]]],
+    apply: bool,
+    label: Callable[[Dict[str, Any]], Any],
+    admit: Optional[Admit] = None,
+) -> Tuple[EntityDiff, Dict[Hashable, Any]]:
+    """
+    Сравнить входящие строки с БД по хешам и, если apply, записать только изменившиеся.
+
+    incoming: список (id из файла, значения полей профиля). Возвращает отчет и
+    соответствие естественного ключа id в БД (или заглушке для новых строк в diff).
+    admit проверяет создаваемые и изменяемые строки; отвергнутые не пишутся.
+    """
+    db = ctx.db
+    model, pk_name, key_fn = ENTITY_MODELS[profile]
+    pk = getattr(model, pk_name)
+    fields = HASH_PROFILES[profile]
+    diff = EntityDiff()
+
+    columns = [pk, model.created_at, model.updated_at] + [getattr(model, f) for f in fields]
+    existing: Dict[Hashable, Tuple] = {}
+    for row in db.query(*columns).all():
+        values = dict(zip(fields, row[3:]))
+        existing[key_fn(values)] = (row[0], row[1], row[2], values)
+
+    stored = {
+        h.entity_id: h
+        for h in db.query(EntityHash).filter(EntityHash.entity_type == profile).all()
+    }
+
+    def current_hash(entity_id, created_at, updated_at, values):
+        h = stored.get(entity_id)
+        if h is not None and h.row_created_at == created_at and h.row_updated_at == updated_at:
+            return h.content_hash, True
+        # хеша нет или строку меняли в обход импорта: считаем по самой строке
+        return content_hash(profile, values), False
+
+    key_map: Dict[Hashable, Any] = {}
+    to_create: List[Tuple[Hashable, Dict[str, Any]]] = []
+    to_update: List[Dict[str, Any]] = []
+    replaced: List[Dict[str, Any]] = []
+    rehash_ids: List[int] = []
+
+    for _source_id, values in incoming:
+        key = key_fn(values)
+        if key in key_map:
+            diff.counts["skipped"] += 1
+            continue
+
+        incoming_hash = content_hash(profile, values)
+        if key not in existing:
+            reason = admit(None, values) if admit else None
+            if reason:
+                diff.reject(reason)
+                continue
+            diff.record("created", label(values))
+            key_map[key] = _placeholder(key)
+            to_create.append((key, values))
+            continue
+
+        entity_id = existing[key][0]
+        key_map[key] = entity_id
+        stored_hash, stored_valid = current_hash(*existing[key])
+        if stored_hash == incoming_hash:
+            diff.record("unchanged", label(values))
+            if not stored_valid:
+                rehash_ids.append(entity_id)
+        else:
+            current = existing[key][3]
+            reason = admit(current, values) if admit else None
+            if reason:
+                diff.reject(reason)
+                continue
+            diff.record("updated", label(values))
+            to_update.append({pk_name: entity_id, **values})
+            replaced.append(current)
+            if all(f in fields for f in MOVE_FIELDS) and any(current[f] != values.get(f) for f in MOVE_FIELDS):
+                diff.moved_ids.append(entity_id)
+
+    for key, (_entity_id, _created_at, _updated_at, values) in existing.items():
+        if key not in key_map:
+            diff.record("deleted", label(values))
+
+    if not apply:
+        return diff, key_map
+
+    now = datetime.utcnow()
+    hashes: Dict[int, str] = {}
+    if to_create:
+        new_rows = [(key, model(**values)) for key, values in to_create]
+        db.add_all([row for _key, row in new_rows])
+        db.flush()
+        for (key, row), (_key, values) in zip(new_rows, to_create):
+            entity_id = getattr(row, pk_name)
+            key_map[key] = entity_id
+            hashes[entity_id] = content_hash(profile, values)
+    if to_update:
+        db.execute(update(model), [{**values, "updated_at": now} for values in to_update])
+        for values in to_update:
+            hashes[values[pk_name]] = content_hash(profile, values)
+    if rehash_ids:
+        row_values = {entity_id: values for entity_id, _created_at, _updated_at, values in existing.values()}
+        for entity_id in rehash_ids:
+            hashes[entity_id] = content_hash(profile, row_values[entity_id])
+
+    _store_hashes(ctx, profile, model, pk, hashes)
+    if profile == "splice":
+        changed = [
+            cable_id for values in [v for _key, v in to_create] + to_update + replaced
+            for cable_id in (values["cable_id"], values["splice_to_cable_id"])
+        ]
+    else:
+        changed = [key_map[key] for key, _values in to_create] + [values[pk_name] for values in to_update]
+    events.mark_changed(db, ENTITY_TOPICS[profile], changed)
+    return diff, key_map
+
+
+def _admit_splice(ctx: ImportContext) -> Admit:
+    """Сварка проходит те же проверки занятости концов волокон, что и при импорте"""
+    def admit(current: Optional[Dict[str, Any]], values: Dict[str, Any]) -> Optional[str]:
+        if current is not None:
+            ctx.release_splice(current)
+        reason = ctx.claim_splice(values)
+        if reason is not None and current is not None:
+            # замена не прошла: старая сварка остается на месте
+            ctx.claim_splice(current)
+        return reason
+    return admit
+
+
+def _keep_stored_distances(ctx: ImportContext, cables_in: List[Tuple[Any, Dict[str, Any]]]) -> None:
+    """Кабелям без distance_km в файле оставить длину из БД: она считается по координатам концов"""
+    names = [values["name"] for _source_id, values in cables_in if values.get("distance_km") is None]
+    stored: Dict[str, Any] = {}
+    for chunk in _chunks(names):
+        stored.update(ctx.db.query(Cable.name, Cable.distance_km).filter(Cable.name.in_(chunk)).all())
+    for _source_id, values in cables_in:
+        if values.get("distance_km") is None:
+            values["distance_km"] = stored.get(values["name"])
+
+
+def _store_hashes(ctx: ImportContext, profile: str, model, pk, hashes: Dict[int, str]) -> None:
+    """Сохранить хеши вместе с отпечатком (created_at, updated_at) записанных строк"""
+    if not hashes:
+        return
+    db = ctx.db
+    ids = list(hashes)
+    rows = []
+    for chunk in _chunks(ids):
+        db.query(EntityHash).filter(
+            EntityHash.entity_type == profile,
+            EntityHash.entity_id.in_(chunk)
+        ).delete(synchronize_session=False)
+        for entity_id, created_at, updated_at in db.query(pk, model.created_at, model.updated_at).filter(pk.in_(chunk)).all():
+            rows.append({
+                "entity_type": profile,
+                "entity_id": entity_id,
+                "content_hash": hashes[entity_id],
+                "row_created_at": created_at,
+                "row_updated_at": updated_at,
+            })
+    if rows:
+        db.execute(insert(EntityHash), rows)
+
+
+def diff_schema(ctx: ImportContext, data: Dict[str, Any], apply: bool) -> Dict[str, Any]:
+    """Отчет о различиях JSON-схемы с БД; при apply записывает только изменения"""
+    # те же проверки строк, что и у обычного импорта: невалидные строки не пишутся
+    stages = schema_stages(data)
+    validation = validate_stages(stages)
+    rows = {stage: validation.clean(stage, records) for stage, records, _handler in stages}
+
+    objects_in = []
+    for obj_data in rows["objects"]:
+        objects_in.append((obj_data["id"], {
+            "name": obj_data["name"],
+            "object_type_id": obj_data.get("object_type_id") or ctx.object_type_id(obj_data.get("object_type", "node")),
+            "latitude": obj_data.get("latitude"),
+            "longitude": obj_data.get("longitude"),
+            "address": obj_data.get("address"),
+            "description": obj_data.get("description"),
+        }))
+    objects_diff, object_keys = _sync_entities(ctx, "object", objects_in, apply, lambda v: v["name"])
+    object_ids = {str(source_id): object_keys[values["name"]] for source_id, values in objects_in}
+
+    cables_in = []
+    skipped_cables = 0
+    for cable_data in rows["cables"]:
+        from_obj_id = object_ids.get(str(cable_data["from_object_id"]))
+        to_obj_id = object_ids.get(str(cable_data["to_object_id"]))
+        if not from_obj_id or not to_obj_id:
+            skipped_cables += 1
+            continue
+        cables_in.append((cable_data["id"], {
+            "name": cable_data["name"],
+            "cable_type_id": ctx.cable_type_id(cable_data),
+            "fiber_count": cable_data.get("fiber_count", 1),
+            "from_object_id": from_obj_id,
+            "to_object_id": to_obj_id,
+            "distance_km": cable_data.get("distance_km"),
+            "description": cable_data.get("description"),
+        }))
+    _keep_stored_distances(ctx, cables_in)
+    cables_diff, cable_keys = _sync_entities(ctx, "cable", cables_in, apply, lambda v: v["name"])
+    cables_diff.counts["skipped"] += skipped_cables
+    cable_ids = {str(source_id): cable_keys[values["name"]] for source_id, values in cables_in}
+
+    splices_in = []
+    skipped_splices = 0
+    for splice_data in rows["fiber_splices"]:
+        from_cable_id = cable_ids.get(str(splice_data["cable_id"]))
+        to_cable_id = cable_ids.get(str(splice_data["splice_to_cable_id"]))
+        if not from_cable_id or not to_cable_id:
+            skipped_splices += 1
+            continue
+        splices_in.append((splice_data.get("id"), {
+            "cable_id": from_cable_id,
+            "fiber_number": splice_data["fiber_number"],
+            "splice_to_cable_id": to_cable_id,
+            "splice_to_fiber": splice_data["splice_to_fiber"],
+            "loss_db": splice_data.get("loss_db"),
+        }))
+    splices_diff, _ = _sync_entities(
+        ctx, "splice", splices_in, apply,
+        lambda v: f"{v['cable_id']}:{v['fiber_number']}->{v['splice_to_cable_id']}:{v['splice_to_fiber']}",
+        admit=_admit_splice(ctx),
+    )
+    splices_diff.counts["skipped"] += skipped_splices
+    if apply:
+        # как при правке объекта: длины кабелей у перемещенных объектов в той же транзакции
+        propagate_object_moves(ctx.db, objects_diff.moved_ids)
+
+    return {
+        "objects": objects_diff.report(),
+        "cables": cables_diff.report(),
+        "fiber_splices": splices_diff.report(),
+        "validation": validation.to_dict(),
+    }
+
+
+def diff_geojson(ctx: ImportContext, geojson: Dict[str, Any], apply: bool) -> Dict[str, Any]:
+    """Отчет о различиях GeoJSON с БД; концы линий привязываются с допуском ctx.snap_tolerance_m"""
+    stages = geojson_stages(geojson)
+    validation = validate_stages(stages)
+    rows = {stage: validation.clean(stage, records) for stage, records, _handler in stages}
+
+    points_in = []
+    for feature in rows["points"]:
+        props = feature["properties"]
+        coords = feature["geometry"]["coordinates"]
+        points_in.append((props.get("id"), {
+            "name": props["name"],
+            "object_type_id": ctx.object_type_id(props.get("type", "node")),
+            "latitude": coords[1],
+            "longitude": coords[0],
+        }))
+    lines = rows["lines"]
+
+    objects_diff, object_keys = _sync_entities(ctx, "object_geo", points_in, apply, lambda v: v["name"])
+
+    # индекс по итоговому состоянию: объекты БД из общего индекса, точки файла поверх
+    from_file = {object_keys[values["name"]]: values for _source_id, values in points_in}
+    point_index = SnapIndex(
+        object_index.committed(), ctx.snap_tolerance_m, exclude=[k for k in from_file if isinstance(k, int)]
+    )
+    for obj_id, values in from_file.items():
+        point_index.insert(values["longitude"], values["latitude"], obj_id)
+
+    cables_in = []
+    skipped_cables = 0
+    for feature in lines:
+        props = feature["properties"]
+        coords = feature["geometry"].get("coordinates", [])
+        ends = [point_index.nearest(*coords[0][:2]), point_index.nearest(*coords[-1][:2])] if len(coords) >= 2 else [None]
+        if any(end is None for end in ends):
+            skipped_cables += 1
+            continue
+        cables_in.append((props.get("id"), {
+            "name": props["name"],
+            "cable_type_id": ctx.cable_type_id(props),
+            "fiber_count": props.get("fiber_count", 1),
+            "from_object_id": ends[0][0],
+            "to_object_id": ends[1][0],
+            "distance_km": props.get("distance_km"),
+        }))
+    _keep_stored_distances(ctx, cables_in)
+    cables_diff, _ = _sync_entities(ctx, "cable_geo", cables_in, apply, lambda v: v["name"])
+    cables_diff.counts["skipped"] += skipped_cables
+    if apply:
+        propagate_object_moves(ctx.db, objects_diff.moved_ids)
+
+    return {
+        "objects": objects_diff.report(),
+        "cables": cables_diff.report(),
+        "validation": validation.to_dict(),
+    }
@@ -0,0 +1,193 @@
+"""
+Background import jobs: chunked commits with resumable checkpoints
+"""
+
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..database.database import SessionLocal
+from ..models.import_job import ImportJob
+from .importers import ImportContext, schema_stages, geojson_stages
+from .import_validation import validate_stages
+
+JOB_STAGES = {
+    "schema": schema_stages,
+    "geojson": geojson_stages,
+}
+STAGE_NAMES = {kind: [name for name, _records, _handler in stages({})] for kind, stages in JOB_STAGES.items()}
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMPORT_JOB_WORKERS, thread_name_prefix="import-job")
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+
+def _jobs_dir() -> str:
+    path = os.path.join(settings.UPLOAD_DIR, "import_jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def create_job(
+    db: Session,
+    kind: str,
+    filename: Optional[str],
+    source: BinaryIO,
+    chunk_size: int,
+    snap_tolerance_m: Optional[float] = None,
+) -> ImportJob:
+    """Сохранить файл на диск и зарегистрировать задачу импорта"""
+    job = ImportJob(
+        kind=kind,
+        status="pending",
+        filename=filename,
+        file_path="",
+        chunk_size=chunk_size,
+        snap_tolerance_m=snap_tolerance_m,
+    )
+    db.add(job)
+    db.flush()
+
+    file_path = os.path.join(_jobs_dir(), f"{job.import_job_id}.json")
+    with open(file_path, "wb") as out:
+        shutil.copyfileobj(source, out)
+    job.file_path = file_path
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def is_active(job_id: int) -> bool:
+    """Выполняется ли задача в этом процессе"""
+    with _active_lock:
+        return job_id in _active_jobs
+
+
+def can_resume(job: ImportJob) -> bool:
+    """Задачу можно продолжить после отмены, ошибки или падения процесса"""
+    if job.status in ("failed", "cancelled"):
+        return True
+    return job.status in ("pending", "running") and not is_active(job.import_job_id)
+
+
+def submit_job(job_id: int) -> bool:
+    """Запустить задачу в фоновом пуле, если она еще не выполняется"""
+    with _active_lock:
+        if job_id in _active_jobs:
+            return False
+        _active_jobs.add(job_id)
+    _executor.submit(_run_job, job_id)
+    return True
+
+
+def _load_stages(job: ImportJob):
+    with open(job.file_path, "rb") as f:
+        data = json.loads(f.read())
+    if job.kind == "geojson" and data.get("type") != "FeatureCollection":
+        raise ValueError("Invalid GeoJSON: must be FeatureCollection")
+    return JOB_STAGES[job.kind](data)
+
+
+def _begin_chunk(db: Session) -> None:
+    # pysqlite открывает транзакцию только перед DML, и RELEASE первого SAVEPOINT
+    # без нее фиксировал бы каждую строку отдельно от контрольной точки
+    if db.get_bind().dialect.name == "sqlite":
+        db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _cancel_requested(db: Session, job_id: int) -> bool:
+    status = db.query(ImportJob.status).filter(ImportJob.import_job_id == job_id).scalar()
+    return status == "cancelled"
+
+
+def _run_job(job_id: int) -> None:
+    db = SessionLocal()
+    try:
+        job = db.query(ImportJob).filter(ImportJob.import_job_id == job_id).first()
+        if job is None or job.status not in ("pending", "running"):
+            return
+
+        job.status = "running"
+        job.message = None
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+        stages = _load_stages(job)
+        validation = validate_stages(stages)
+        if job.total is None:
+            job.total = sum(len(records) for _name, records, _handler in stages)
+
+        ctx = ImportContext(
+            db,
+            snap_tolerance_m=job.snap_tolerance_m,
+            checkpoint=json.loads(job.checkpoint) if job.checkpoint else None,
+        )
+        errors: List[Dict[str, Any]] = json.loads(job.errors) if job.errors else []
+
+        for stage_index in range(job.stage_index, len(stages)):
+            stage, records, handler = stages[stage_index]
+            offset = job.offset if stage_index == job.stage_index else 0
+
+            while offset < len(records):
+                chunk_end = min(offset + job.chunk_size, len(records))
+                _begin_chunk(db)
+                for index in range(offset, chunk_end):
+                    invalid = validation.error_for(stage, index)
+                    if invalid:
+                        job.error_count += 1
+                        if len(errors) < settings.IMPORT_JOB_MAX_ERRORS:
+                            errors.append({"stage": stage, "index": index, "error": invalid})
+                        continue
+                    # ошибочная строка откатывается отдельно и не валит весь чанк
+                    savepoint = db.begin_nested()
+                    try:
+                        handler(ctx, records[index])
+                        savepoint.commit()
+                    except Exception as e:
+                        savepoint.rollback()
+                        job.error_count += 1
+                        if len(errors) < settings.IMPORT_JOB_MAX_ERRORS:
+                            errors.append({"stage": stage, "index": index, "error": str(e)})
+
+                # контрольная точка фиксируется в той же транзакции, что и данные чанка
+                job.processed += chunk_end - offset
+                job.stage_index = stage_index
+                job.offset = chunk_end
+                job.checkpoint = json.dumps(ctx.checkpoint())
+                job.errors = json.dumps(errors)
+                job.updated_at = datetime.utcnow()
+                # обработчики строк сами отмечают записанные id по темам этапа
+                db.commit()
+                offset = chunk_end
+
+                if _cancel_requested(db, job_id):
+                    return
+
+            if stage_index + 1 < len(stages):
+                job.stage_index = stage_index + 1
+                job.offset = 0
+                db.commit()
+
+        if _cancel_requested(db, job_id):
+            return
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        job.updated_at = job.finished_at
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        job = db.query(ImportJob).filter(ImportJob.import_job_id == job_id).first()
+        if job is not None:
+            job.status = "failed"
+            job.message = str(e)
+            job.updated_at = datetime.utcnow()
+            db.commit()
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+        db.close()
@@ -0,0 +1,214 @@
+"""
+Validation stage for imports: shards parsed records across a process pool
+and returns a columnar report, so writers only receive clean rows
+"""
+
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from ..core.config import settings
+from ..utils.validators import (
+    validate_name,
+    validate_coordinates,
+    validate_fiber_count,
+    validate_fiber_number,
+    validate_distance,
+    validate_geojson_feature,
+)
+
+# (номер строки, поле, сообщение)
+RowError = Tuple[int, str, str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _check_required(row: Dict[str, Any], fields: Sequence[str]) -> Optional[Tuple[str, str]]:
+    for field in fields:
+        if row.get(field) is None:
+            return field, "required"
+    return None
+
+
+def _check_object(row: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not isinstance(row, dict):
+        return "row", "must be an object"
+    missing = _check_required(row, ("id",))
+    if missing:
+        return missing
+    if not validate_name(row.get("name"), settings.MAX_NAME_LENGTH):
+        return "name", "invalid name"
+    lat, lon = row.get("latitude"), row.get("longitude")
+    if (lat is not None or lon is not None) and not validate_coordinates(lat, lon):
+        return "coordinates", "invalid coordinates"
+    return None
+
+
+def _check_cable(row: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not isinstance(row, dict):
+        return "row", "must be an object"
+    missing = _check_required(row, ("id", "from_object_id", "to_object_id"))
+    if missing:
+        return missing
+    if not validate_name(row.get("name"), settings.MAX_NAME_LENGTH):
+        return "name", "invalid name"
+    if row.get("fiber_count") is not None and not validate_fiber_count(row["fiber_count"]):
+        return "fiber_count", "invalid fiber count"
+    if not validate_distance(row.get("distance_km")):
+        return "distance_km", "invalid distance"
+    return None
+
+
+def _check_splice(row: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not isinstance(row, dict):
+        return "row", "must be an object"
+    missing = _check_required(row, ("cable_id", "splice_to_cable_id", "fiber_number", "splice_to_fiber"))
+    if missing:
+        return missing
+    for field in ("fiber_number", "splice_to_fiber"):
+        # диапазон по fiber_count проверяется при записи, когда кабель известен
+        if not validate_fiber_number(row[field]):
+            return field, "invalid fiber number"
+    return None
+
+
+def _check_point(feature: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not validate_geojson_feature(feature):
+        return "feature", "invalid GeoJSON feature"
+    props = feature.get("properties") or {}
+    if not validate_name(props.get("name"), settings.MAX_NAME_LENGTH):
+        return "name", "invalid name"
+    coords = feature["geometry"].get("coordinates")
+    if not isinstance(coords, (list, tuple)) or len(coords) < 2 or not validate_coordinates(coords[1], coords[0]):
+        return "coordinates", "invalid coordinates"
+    return None
+
+
+def _check_line(feature: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not validate_geojson_feature(feature):
+        return "feature", "invalid GeoJSON feature"
+    props = feature.get("properties") or {}
+    if not validate_name(props.get("name"), settings.MAX_NAME_LENGTH):
+        return "name", "invalid name"
+    coords = feature["geometry"].get("coordinates")
+    if not isinstance(coords, (list, tuple)) or len(coords) < 2:
+        return "coordinates", "LineString needs at least two points"
+    for point in coords:
+        if not isinstance(point, (list, tuple)) or len(point) < 2 or not validate_coordinates(point[1], point[0]):
+            return "coordinates", "invalid coordinates"
+    if props.get("fiber_count") is not None and not validate_fiber_count(props["fiber_count"]):
+        return "fiber_count", "invalid fiber count"
+    return None
+
+
+STAGE_CHECKS = {
+    "objects": _check_object,
+    "cables": _check_cable,
+    "fiber_splices": _check_splice,
+    "points": _check_point,
+    "lines": _check_line,
+}
+
+
+def _validate_shard(stage: str, offset: int, records: List[Dict[str, Any]]) -> List[RowError]:
+    """Проверка одного шарда; выполняется в рабочем процессе"""
+    check = STAGE_CHECKS[stage]
+    errors = []
+    for i, row in enumerate(records):
+        try:
+            problem = check(row)
+        except Exception as e:
+            problem = ("row", str(e))
+        if problem:
+            errors.append((offset + i, problem[0], problem[1]))
+    return errors
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: fork из процесса с потоками uvicorn небезопасен
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+class ValidationReport:
+    """Колоночный отчет: параллельные списки stage/index/field/message"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.rows = 0
+        self.invalid: Dict[str, Dict[int, str]] = {}
+        self.columns: Dict[str, List[Any]] = {"stage": [], "index": [], "field": [], "message": []}
+
+    def add(self, stage: str, total: int, errors: List[RowError]) -> None:
+        self.rows += total
+        bad = self.invalid.setdefault(stage, {})
+        for index, field, message in sorted(errors):
+            bad[index] = f"{field}: {message}"
+            self.columns["stage"].append(stage)
+            self.columns["index"].append(index)
+            self.columns["field"].append(field)
+            self.columns["message"].append(message)
+
+    def error_for(self, stage: str, index: int) -> Optional[str]:
+        """Текст ошибки строки или None, если строка чистая"""
+        return self.invalid.get(stage, {}).get(index)
+
+    def clean(self, stage: str, records: List[Any]) -> List[Any]:
+        """Только прошедшие проверку строки этапа"""
+        bad = self.invalid.get(stage)
+        if not bad:
+            return records
+        return [row for i, row in enumerate(records) if i not in bad]
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        invalid = sum(len(bad) for bad in self.invalid.values())
+        limit = settings.IMPORT_JOB_MAX_ERRORS if limit is None else limit
+        return {
+            "rows": self.rows,
+            "valid": self.rows - invalid,
+            "invalid": invalid,
+            "workers": self.workers,
+            "truncated": len(self.columns["index"]) > limit,
+            "errors": {name: values[:limit] for name, values in self.columns.items()},
+        }
+
+
+def validate_stages(stages, workers: Optional[int] = None) -> ValidationReport:
+    """
+    Проверить все записи этапов импорта.
+
+    stages: список (имя этапа, записи, обработчик) из importers. Небольшие
+    файлы проверяются в текущем процессе: запуск пула дороже самой проверки.
+    """
+    workers = settings.IMPORT_VALIDATION_WORKERS if workers is None else workers
+    total = sum(len(records) for _stage, records, _handler in stages)
+    parallel = workers > 1 and total >= settings.IMPORT_VALIDATION_PARALLEL_MIN_ROWS
+    report = ValidationReport(workers if parallel else 1)
+
+    if not parallel:
+        for stage, records, _handler in stages:
+            report.add(stage, len(records), _validate_shard(stage, 0, records))
+        return report
+
+    pool = _get_pool(workers)
+    for stage, records, _handler in stages:
+        # несколько шардов на процесс, чтобы выровнять нагрузку
+        shard_size = max(1, math.ceil(len(records) / (workers * 4)))
+        futures = [
+            pool.submit(_validate_shard, stage, start, records[start:start + shard_size])
+            for start in range(0, len(records), shard_size)
+        ]
+        errors: List[RowError] = []
+        for future in futures:
+            errors.extend(future.result())
+        report.add(stage, len(records), errors)
+    return report
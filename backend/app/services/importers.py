@@ -0,0 +1,320 @@
+"""
+Row-level importers shared by the synchronous import endpoints and background jobs
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from ..models.cable import Cable
+from ..models.fiber_splice import FiberSplice
+from .cable_types import cable_type_resolver
+from .splice_integrity import (
+    CableInfo, FiberEnd, fiber_in_range, load_cable_info, load_reserved_fibers, load_touching_splices,
+    splice_fiber_ends,
+)
+from .object_index import SnapIndex, object_index
+
+
+class ImportContext:
+    """Состояние одного импорта: соответствие id файла и БД, счетчики, индекс точек"""
+
+    def __init__(self, db: Session, snap_tolerance_m: Optional[float] = None, checkpoint: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.snap_tolerance_m = settings.IMPORT_SNAP_TOLERANCE_M if snap_tolerance_m is None else snap_tolerance_m
+        checkpoint = checkpoint or {}
+        # ключи приводятся к строкам, чтобы карты переживали сохранение в JSON
+        self.object_id_map: Dict[str, int] = dict(checkpoint.get("object_id_map", {}))
+        self.cable_id_map: Dict[str, int] = dict(checkpoint.get("cable_id_map", {}))
+        self.counts: Dict[str, int] = dict(checkpoint.get("counts", {}))
+        self._object_type_ids: Optional[Dict[str, int]] = None
+        self._point_index: Optional[SnapIndex] = None
+        # занятые концы волокон -> стороны занявшей сварки {(cable_id, fiber_number)}:
+        # сварки этого импорта и сохраненные в БД на встреченных кабелях
+        self.used_fibers: Dict[FiberEnd, FrozenSet[Tuple[int, int]]] = {}
+        self._splice_cables: Dict[int, CableInfo] = {}
+        self._seeded_cables: Set[int] = set()
+        # волокна под резервами выделений на встреченных кабелях
+        self._reserved: Set[Tuple[int, int]] = set()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "object_id_map": self.object_id_map,
+            "cable_id_map": self.cable_id_map,
+            "counts": self.counts,
+        }
+
+    def object_type_id(self, name: str) -> int:
+        if self._object_type_ids is None:
+            self._object_type_ids = {
+                type_name: type_id
+                for type_id, type_name in self.db.query(ObjectType.object_type_id, ObjectType.name).all()
+            }
+        return self._object_type_ids.get(name, 1)
+
+    def cable_type_id(self, row: Dict[str, Any]) -> int:
+        """Тип кабеля строки: явный id, имя типа или optical/copper с числом волокон"""
+        return cable_type_resolver.resolve(
+            self.db,
+            row.get("cable_type") or row.get("cable_type_name"),
+            row.get("cable_type_id"),
+            row.get("fiber_count"),
+        )
+
+    def claim_splice(self, splice: Dict[str, Any]) -> Optional[str]:
+        """
+        Занять концы волокон сварки. None - концы свободны и заняты; "out_of_range" -
+        волокна нет в кабеле; "reserved" - волокно под резервом выделения;
+        "existing" - та же сварка уже есть; "conflicting" - конец занят другой сваркой.
+        """
+        self._seed_splices(splice)
+        for cable_id, fiber in ((splice["cable_id"], splice["fiber_number"]),
+                                (splice["splice_to_cable_id"], splice["splice_to_fiber"])):
+            if cable_id in self._splice_cables and not fiber_in_range(fiber, self._splice_cables[cable_id]):
+                return "out_of_range"
+
+        sides = _splice_sides(splice)
+        if sides & self._reserved:
+            return "reserved"
+        ends = splice_fiber_ends(splice, self._splice_cables)
+        taken = {self.used_fibers[end] for end in ends if end in self.used_fibers}
+        if taken:
+            return "existing" if taken == {sides} else "conflicting"
+        for end in ends:
+            self.used_fibers[end] = sides
+        return None
+
+    def release_splice(self, splice: Dict[str, Any]) -> None:
+        """Освободить концы волокон сварки, которую заменяет запись"""
+        self._seed_splices(splice)
+        sides = _splice_sides(splice)
+        for end in splice_fiber_ends(splice, self._splice_cables):
+            if self.used_fibers.get(end) == sides:
+                del self.used_fibers[end]
+
+    def _seed_splices(self, splice: Dict[str, Any]) -> None:
+        # сварки БД на кабеле подгружаются при первой встрече кабеля
+        new_cables = {splice["cable_id"], splice["splice_to_cable_id"]} - self._seeded_cables - {None}
+        if not new_cables:
+            return
+        self._seeded_cables |= new_cables
+        self._reserved.update(load_reserved_fibers(self.db, new_cables))
+        stored = load_touching_splices(self.db, new_cables)
+        wanted = new_cables | {s["cable_id"] for s in stored} | {s["splice_to_cable_id"] for s in stored}
+        self._splice_cables.update(load_cable_info(self.db, wanted - self._splice_cables.keys() - {None}))
+        for row in stored:
+            for end in splice_fiber_ends(row, self._splice_cables):
+                self.used_fibers.setdefault(end, _splice_sides(row))
+
+    @property
+    def point_index(self) -> SnapIndex:
+        # объекты БД берутся из общего индекса, а записанные этим импортом
+        # (возможно, еще не зафиксированные) - из сессии импорта
+        if self._point_index is None:
+            own = sorted(set(self.object_id_map.values()))
+            self._point_index = SnapIndex(object_index.committed(), self.snap_tolerance_m, exclude=own)
+            for i in range(0, len(own), 500):
+                for obj_id, lon, lat in self.db.query(
+                    NetworkObject.network_object_id, NetworkObject.longitude, NetworkObject.latitude
+                ).filter(NetworkObject.network_object_id.in_(own[i:i + 500])).all():
+                    self._point_index.insert(lon, lat, obj_id)
+        return self._point_index
+
+
+def _splice_sides(splice: Dict[str, Any]) -> FrozenSet[Tuple[int, int]]:
+    # сварка не направлена: A->B и B->A - одна и та же
+    return frozenset({
+        (splice["cable_id"], splice["fiber_number"]), (splice["splice_to_cable_id"], splice["splice_to_fiber"])
+    })
+
+
+def import_object_row(ctx: ImportContext, obj_data: Dict[str, Any]) -> None:
+    """Объект из JSON-схемы"""
+    db = ctx.db
+    existing = db.query(NetworkObject).filter(
+        NetworkObject.name == obj_data["name"]
+    ).first()
+
+    if existing:
+        ctx.object_id_map[str(obj_data["id"])] = existing.network_object_id
+        return
+
+    object_type_value = obj_data.get("object_type_id")
+    if not object_type_value:
+        object_type_value = ctx.object_type_id(obj_data.get("object_type", "node"))
+
+    new_obj = NetworkObject(
+        name=obj_data["name"],
+        object_type_id=object_type_value,
+        latitude=obj_data.get("latitude"),
+        longitude=obj_data.get("longitude"),
+        address=obj_data.get("address"),
+        description=obj_data.get("description")
+    )
+    db.add(new_obj)
+    db.flush()
+    ctx.object_id_map[str(obj_data["id"])] = new_obj.network_object_id
+    events.mark_changed(db, events.OBJECTS_CHANGED, [new_obj.network_object_id])
+    ctx.count("objects")
+
+
+def import_cable_row(ctx: ImportContext, cable_data: Dict[str, Any]) -> None:
+    """Кабель из JSON-схемы; концы ищутся через уже импортированные объекты"""
+    db = ctx.db
+    from_obj_id = ctx.object_id_map.get(str(cable_data["from_object_id"]))
+    to_obj_id = ctx.object_id_map.get(str(cable_data["to_object_id"]))
+    if not from_obj_id or not to_obj_id:
+        return
+
+    existing = db.query(Cable).filter(
+        Cable.name == cable_data["name"]
+    ).first()
+
+    if existing:
+        if existing.from_object_id == from_obj_id and existing.to_object_id == to_obj_id:
+            ctx.cable_id_map[str(cable_data["id"])] = existing.cable_id
+        return
+
+    new_cable = Cable(
+        name=cable_data["name"],
+        cable_type_id=ctx.cable_type_id(cable_data),
+        fiber_count=cable_data.get("fiber_count", 1),
+        from_object_id=from_obj_id,
+        to_object_id=to_obj_id,
+        distance_km=cable_data.get("distance_km"),
+        description=cable_data.get("description")
+    )
+    db.add(new_cable)
+    db.flush()
+    ctx.cable_id_map[str(cable_data["id"])] = new_cable.cable_id
+    events.mark_changed(db, events.CABLES_CHANGED, [new_cable.cable_id])
+    ctx.count("cables")
+
+
+def import_splice_row(ctx: ImportContext, splice_data: Dict[str, Any]) -> None:
+    """Сварка из JSON-схемы"""
+    from_cable_id = ctx.cable_id_map.get(str(splice_data["cable_id"]))
+    to_cable_id = ctx.cable_id_map.get(str(splice_data["splice_to_cable_id"]))
+    if not from_cable_id or not to_cable_id:
+        return
+    claim = ctx.claim_splice({
+        "cable_id": from_cable_id, "fiber_number": splice_data["fiber_number"],
+        "splice_to_cable_id": to_cable_id, "splice_to_fiber": splice_data["splice_to_fiber"],
+    })
+    if claim is not None:
+        ctx.count(f"splices_{claim}")
+        return
+
+    ctx.db.add(FiberSplice(
+        cable_id=from_cable_id,
+        fiber_number=splice_data["fiber_number"],
+        splice_to_cable_id=to_cable_id,
+        splice_to_fiber=splice_data["splice_to_fiber"],
+        loss_db=splice_data.get("loss_db")
+    ))
+    events.mark_changed(ctx.db, events.SPLICES_CHANGED, [from_cable_id, to_cable_id])
+    ctx.count("splices")
+
+
+def import_point_feature(ctx: ImportContext, feature: Dict[str, Any]) -> None:
+    """Объект из GeoJSON Point"""
+    db = ctx.db
+    props = feature["properties"]
+    coords = feature.get("geometry", {}).get("coordinates", [0, 0])
+    point_index = ctx.point_index
+
+    existing = db.query(NetworkObject).filter(
+        NetworkObject.name == props["name"]
+    ).first()
+    if existing:
+        return
+
+    new_obj = NetworkObject(
+        name=props["name"],
+        object_type_id=ctx.object_type_id(props.get("type", "node")),
+        longitude=coords[0],
+        latitude=coords[1]
+    )
+    db.add(new_obj)
+    db.flush()
+    ctx.object_id_map[str(props["id"])] = new_obj.network_object_id
+    point_index.insert(coords[0], coords[1], new_obj.network_object_id)
+    events.mark_changed(db, events.OBJECTS_CHANGED, [new_obj.network_object_id])
+    ctx.count("objects")
+
+
+def _resolve_endpoint(ctx: ImportContext, coords: List[float]) -> Optional[int]:
+    found = ctx.point_index.nearest(coords[0], coords[1])
+    if found is None:
+        ctx.count("endpoints_unmatched")
+        return None
+    obj_id, dist = found
+    ctx.count("endpoints_matched" if dist == 0 else "endpoints_snapped")
+    return obj_id
+
+
+def import_line_feature(ctx: ImportContext, feature: Dict[str, Any]) -> None:
+    """Кабель из GeoJSON LineString; концы привязываются к ближайшим объектам"""
+    db = ctx.db
+    props = feature["properties"]
+    coords = feature.get("geometry", {}).get("coordinates", [])
+    if len(coords) < 2:
+        return
+
+    from_obj_id = _resolve_endpoint(ctx, coords[0])
+    to_obj_id = _resolve_endpoint(ctx, coords[-1])
+    if not from_obj_id or not to_obj_id:
+        return
+
+    existing = db.query(Cable).filter(
+        Cable.name == props["name"]
+    ).first()
+    if existing:
+        return
+
+    new_cable = Cable(
+        name=props["name"],
+        cable_type_id=ctx.cable_type_id(props),
+        fiber_count=props.get("fiber_count", 1),
+        from_object_id=from_obj_id,
+        to_object_id=to_obj_id,
+        distance_km=props.get("distance_km")
+    )
+    db.add(new_cable)
+    db.flush()
+    events.mark_changed(db, events.CABLES_CHANGED, [new_cable.cable_id])
+    ctx.count("cables")
+
+
+RowHandler = Callable[[ImportContext, Dict[str, Any]], None]
+
+
+def schema_stages(data: Dict[str, Any]) -> List[Tuple[str, List[Dict[str, Any]], RowHandler]]:
+    """Этапы импорта JSON-схемы в порядке зависимостей"""
+    return [
+        ("objects", data.get("objects", []), import_object_row),
+        ("cables", data.get("cables", []), import_cable_row),
+        ("fiber_splices", data.get("fiber_splices", []), import_splice_row),
+    ]
+
+
+def geojson_stages(geojson: Dict[str, Any]) -> List[Tuple[str, List[Dict[str, Any]], RowHandler]]:
+    """Этапы импорта GeoJSON: сначала точки, затем линии"""
+    points = []
+    lines = []
+    for feature in geojson.get("features", []):
+        props = feature.get("properties") or {}
+        geom_type = (feature.get("geometry") or {}).get("type")
+        if props.get("feature_type") == "network_object" and geom_type == "Point":
+            points.append(feature)
+        elif props.get("feature_type") == "cable" and geom_type == "LineString":
+            lines.append(feature)
+    return [
+        ("points", points, import_point_feature),
+        ("lines", lines, import_line_feature),
+    ]
@@ -0,0 +1,157 @@
+"""
+Optical loss budget over traced fiber paths: per-km attenuation by cable
+type, splice and connector losses, accumulated for many paths at once with
+NumPy and checked against the budget of the end objects
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.cable_type import CableType
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from .fiber_graph import FiberGraph, fiber_graph
+from .outage_impact import SUBSCRIBER_TYPE
+
+ID_CHUNK = 500
+
+
+def _object_info(db: Session, object_ids: List[int]) -> Dict[int, Tuple[Optional[str], Optional[float]]]:
+    """Тип и бюджет затухания (из типа объекта) по id объектов"""
+    info: Dict[int, Tuple[Optional[str], Optional[float]]] = {}
+    for i in range(0, len(object_ids), ID_CHUNK):
+        for object_id, type_name, budget in db.query(
+            NetworkObject.network_object_id, ObjectType.name, ObjectType.loss_budget_db
+        ).join(ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id).filter(
+            NetworkObject.network_object_id.in_(object_ids[i:i + ID_CHUNK])
+        ).all():
+            info[object_id] = (type_name, budget)
+    return info
+
+
+class LossBudget:
+    """Расчет затухания по цепочкам из графа сварок"""
+
+    def __init__(self, fibers: FiberGraph):
+        self.fibers = fibers
+
+    def evaluate(
+        self,
+        db: Session,
+        fibers: Optional[List[Tuple[int, int]]] = None,
+        subscribers: bool = False,
+        connectors: int = 2,
+        budget_db: Optional[float] = None,
+        only_failures: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Затухание по волокнам (cable_id, fiber_number) или, при subscribers,
+        по всем сваренным цепочкам, которые заканчиваются у абонента.
+
+        Обход графа дает плоские массивы участков и сварок с номером пути,
+        после чего суммы по путям считаются одним np.bincount на каждую
+        составляющую. Бюджет - меньший из бюджетов концов пути, у которых он
+        задан типом объекта; иначе budget_db из запроса.
+        """
+        started = time.perf_counter()
+        self.fibers.sync(db)
+        if subscribers:
+            subscriber_ids = {
+                row[0] for row in db.query(NetworkObject.network_object_id).join(
+                    ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id
+                ).filter(ObjectType.name == SUBSCRIBER_TYPE).all()
+            }
+            chains = [
+                c for c in self.fibers.circuits()
+                if c["objects"][0] in subscriber_ids or c["objects"][-1] in subscriber_ids
+            ]
+            starts = [c["start"] for c in chains]
+        else:
+            starts = list(fibers or [])
+            chains = self.fibers.chains(starts)
+        invalid = [{"cable_id": s[0], "fiber_number": s[1]} for s, c in zip(starts, chains) if c is None]
+        paths = [(s, c) for s, c in zip(starts, chains) if c is not None]
+
+        count = len(paths)
+        leg_counts = np.fromiter((len(c["cables"]) for _, c in paths), dtype=np.int64, count=count)
+        splice_counts = np.fromiter((len(c["splices"]) for _, c in paths), dtype=np.int64, count=count)
+        leg_cables = np.fromiter((cable for _, c in paths for cable in c["cables"]), dtype=np.int64,
+                                 count=int(leg_counts.sum()))
+        leg_path = np.repeat(np.arange(count), leg_counts)
+        splice_path = np.repeat(np.arange(count), splice_counts)
+
+        # свойства считаются один раз на уникальный кабель, затем разносятся по участкам
+        unique_cables, leg_slot = np.unique(leg_cables, return_inverse=True)
+        attenuation = {
+            type_id: value for type_id, value in db.query(CableType.cable_type_id, CableType.attenuation_db_per_km).all()
+            if value is not None
+        }
+        cable_info = [self.fibers.cable(int(c)) for c in unique_cables]
+        length = np.array([np.nan if info[3] is None else info[3] for info in cable_info], dtype=np.float64)
+        per_km = np.array([attenuation.get(info[5], settings.LOSS_DEFAULT_DB_PER_KM) for info in cable_info],
+                          dtype=np.float64)
+        leg_length = length[leg_slot]
+        missing = np.bincount(leg_path, weights=np.isnan(leg_length), minlength=count) > 0
+        leg_length = np.nan_to_num(leg_length)
+        path_length = np.bincount(leg_path, weights=leg_length, minlength=count)
+        fiber_loss = np.bincount(leg_path, weights=leg_length * per_km[leg_slot], minlength=count)
+
+        def splice_loss_db(splice_id: int) -> float:
+            loss = (self.fibers.splice(splice_id) or {}).get("loss_db")
+            return settings.LOSS_SPLICE_DB if loss is None else loss
+        splice_loss_values = np.fromiter(
+            (splice_loss_db(s) for _, c in paths for s in c["splices"]), dtype=np.float64, count=int(splice_counts.sum())
+        )
+        splice_loss = np.bincount(splice_path, weights=splice_loss_values, minlength=count)
+        connector_loss = connectors * settings.LOSS_CONNECTOR_DB
+        total = fiber_loss + splice_loss + connector_loss
+
+        ends = _object_info(db, sorted({o for _, c in paths for o in (c["objects"][0], c["objects"][-1])}))
+        budgets = np.full(count, np.nan)
+        for i, (_, c) in enumerate(paths):
+            values = [ends.get(o, (None, None))[1] for o in (c["objects"][0], c["objects"][-1])]
+            values = [v for v in values if v is not None]
+            if values:
+                budgets[i] = min(values)
+            elif budget_db is not None:
+                budgets[i] = budget_db
+        margin = budgets - total
+        with np.errstate(invalid="ignore"):
+            over = margin < 0
+        unbudgeted = np.isnan(budgets)
+
+        rows = []
+        for i, ((cable_id, fiber_number), c) in enumerate(paths):
+            if only_failures and not over[i]:
+                continue
+            rows.append({
+                "cable_id": cable_id,
+                "fiber_number": fiber_number,
+                "a_end_object_id": c["objects"][0],
+                "z_end_object_id": c["objects"][-1],
+                "hop_count": int(leg_counts[i]),
+                "splice_count": int(splice_counts[i]),
+                "length_km": round(float(path_length[i]), 6),
+                "distance_complete": not bool(missing[i]),
+                "fiber_loss_db": round(float(fiber_loss[i]), 4),
+                "splice_loss_db": round(float(splice_loss[i]), 4),
+                "connector_loss_db": round(connector_loss, 4),
+                "total_loss_db": round(float(total[i]), 4),
+                "budget_db": None if unbudgeted[i] else float(budgets[i]),
+                "margin_db": None if unbudgeted[i] else round(float(margin[i]), 4),
+                "within_budget": None if unbudgeted[i] else not bool(over[i]),
+                "loop": c["loop"],
+            })
+        return {
+            "path_count": count,
+            "over_budget_count": int(over.sum()),
+            "unbudgeted_count": int(unbudgeted.sum()),
+            "invalid_fibers": invalid,
+            "paths": rows,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+loss_budget = LossBudget(fiber_graph)
@@ -0,0 +1,228 @@
+"""
+Nearest-object index for the drawing tools and imports: a KD-tree over
+object coordinates on the unit sphere, kept current from change events
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core import events
+from ..database.database import SessionLocal
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from ..utils.spatial_index import HaversineKDTree, SpatialHash, chord2_to_m, m_to_chord2, unit_vectors
+
+ID_CHUNK = 500
+
+# правки после построения дерева копятся в дельте; сверх порога дерево пересобирается
+DELTA_MIN_POINTS = 1000
+DELTA_MAX_SHARE = 0.02
+
+Point = Tuple[float, float]
+
+
+class NearestSnapshot:
+    """
+    Неизменяемое состояние индекса: дерево, точки, добавленные или
+    сдвинутые после его построения, и id, вычеркнутые из дерева
+    """
+
+    def __init__(self, tree: HaversineKDTree, extra: Dict[int, Point], removed: FrozenSet[int]):
+        self.tree = tree
+        self.removed = removed
+        self.extra_ids = np.fromiter(extra.keys(), dtype=np.int64, count=len(extra))
+        self.extra_xyz = unit_vectors([p[0] for p in extra.values()], [p[1] for p in extra.values()])
+        self.size = len(tree) - len(removed) + len(extra)
+
+    def nearest_many(
+        self,
+        points: Iterable[Point],
+        k: int = 1,
+        max_m: Optional[float] = None,
+        exclude: FrozenSet[int] = frozenset(),
+    ) -> List[List[Tuple[int, float]]]:
+        """Для каждой точки (lat, lon) до k ближайших объектов: [(id, метры)] по возрастанию"""
+        points = list(points)
+        if not points:
+            return []
+        bound2 = math.inf if max_m is None else m_to_chord2(max_m)
+        skip = self.removed | exclude if exclude else self.removed
+        queries = unit_vectors([p[0] for p in points], [p[1] for p in points])
+        results = []
+        for q in queries:
+            found = self.tree.query(tuple(q.tolist()), k, bound2, skip)
+            if len(self.extra_ids):
+                # дельта мала, ее просматриваем целиком
+                diff = self.extra_xyz - q
+                dist2 = np.einsum("ij,ij->i", diff, diff)
+                limit = found[-1][0] if len(found) == k else bound2
+                for i in np.flatnonzero(dist2 <= limit).tolist():
+                    item_id = int(self.extra_ids[i])
+                    if item_id not in exclude:
+                        found.append((float(dist2[i]), item_id))
+                found = sorted(found)[:k]
+            results.append([(item_id, chord2_to_m(d2)) for d2, item_id in found])
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_m: Optional[float] = None,
+                exclude: FrozenSet[int] = frozenset()) -> List[Tuple[int, float]]:
+        """До k ближайших объектов к точке: [(id, метры)] по возрастанию"""
+        return self.nearest_many([(lat, lon)], k, max_m, exclude)[0]
+
+
+class SnapIndex:
+    """
+    Привязка концов при импорте: объекты БД ищутся в общем индексе, а
+    записанные этим импортом - в сетке с их координатами из файла.
+    Интерфейс как у SpatialHash: insert(lon, lat, id) и nearest(lon, lat).
+    """
+
+    def __init__(self, snapshot: NearestSnapshot, tolerance_m: float, exclude: Iterable[int] = ()):
+        self.snapshot = snapshot
+        self.added = SpatialHash(tolerance_m)
+        self.tolerance_m = self.added.tolerance_m
+        self.exclude = frozenset(exclude)
+
+    def insert(self, lon: float, lat: float, item_id: Any) -> None:
+        self.added.insert(lon, lat, item_id)
+
+    def nearest(self, lon: float, lat: float) -> Optional[Tuple[Any, float]]:
+        if lon is None or lat is None:
+            return None
+        found = self.added.nearest(lon, lat)
+        if found is not None and found[1] == 0:
+            return found
+        hits = self.snapshot.nearest(lat, lon, 1, self.tolerance_m, self.exclude)
+        if hits and (found is None or hits[0][1] < found[1]):
+            return hits[0]
+        return found
+
+
+class ObjectIndex:
+    """Индекс координат всех объектов; изменения применяются лениво в sync"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stale = True
+        self._dirty: Set[int] = set()
+        self._compiled: Dict[int, Point] = {}
+        self._extra: Dict[int, Point] = {}
+        self._removed: Set[int] = set()
+        self._snapshot: Optional[NearestSnapshot] = None
+
+    def on_objects_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty |= ids
+
+    def sync(self, db: Session) -> NearestSnapshot:
+        """Применить накопленные изменения и вернуть текущий снимок"""
+        with self._lock:
+            if self._stale or self._snapshot is None:
+                self._rebuild(db)
+            elif self._dirty:
+                self._refresh(db)
+            return self._snapshot
+
+    def committed(self) -> NearestSnapshot:
+        """Снимок по зафиксированным данным: своя сессия не видит чужую незавершенную транзакцию"""
+        db = SessionLocal()
+        try:
+            return self.sync(db)
+        finally:
+            db.close()
+
+    def _rebuild(self, db: Session) -> None:
+        self._stale = False
+        self._dirty = set()
+        rows = db.query(NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude).filter(
+            NetworkObject.latitude.isnot(None), NetworkObject.longitude.isnot(None)
+        ).all()
+        self._compile({object_id: (lat, lon) for object_id, lat, lon in rows})
+
+    def _compile(self, points: Dict[int, Point]) -> None:
+        self._compiled = points
+        self._extra = {}
+        self._removed = set()
+        tree = HaversineKDTree(
+            list(points.keys()), [p[0] for p in points.values()], [p[1] for p in points.values()]
+        )
+        self._snapshot = NearestSnapshot(tree, {}, frozenset())
+
+    def _refresh(self, db: Session) -> None:
+        dirty = list(self._dirty)
+        self._dirty = set()
+        current: Dict[int, Point] = {}
+        for i in range(0, len(dirty), ID_CHUNK):
+            for object_id, lat, lon in db.query(
+                NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+            ).filter(NetworkObject.network_object_id.in_(dirty[i:i + ID_CHUNK])).all():
+                if lat is not None and lon is not None:
+                    current[object_id] = (lat, lon)
+
+        compiled, extra, removed = self._compiled, self._extra, self._removed
+        for object_id in dirty:
+            position = current.get(object_id)
+            extra.pop(object_id, None)
+            if object_id in compiled:
+                if compiled[object_id] == position:
+                    removed.discard(object_id)
+                    continue
+                removed.add(object_id)
+            if position is not None:
+                extra[object_id] = position
+
+        if len(extra) + len(removed) > max(DELTA_MIN_POINTS, DELTA_MAX_SHARE * len(compiled)):
+            points = {object_id: p for object_id, p in compiled.items() if object_id not in removed}
+            points.update(extra)
+            self._compile(points)
+        else:
+            self._snapshot = NearestSnapshot(self._snapshot.tree, dict(extra), frozenset(removed))
+
+    def nearest(self, db: Session, points: List[Point], k: int = 1, max_m: Optional[float] = None) -> Dict[str, Any]:
+        """k ближайших объектов к каждой точке (lat, lon) с именами и типами, одним запросом к БД"""
+        snapshot = self.sync(db)
+        started = time.perf_counter()
+        found = snapshot.nearest_many(points, k, max_m)
+        ids = sorted({object_id for hits in found for object_id, _dist in hits})
+        rows = {}
+        for i in range(0, len(ids), ID_CHUNK):
+            for row in db.query(
+                NetworkObject.network_object_id, NetworkObject.name, ObjectType.name,
+                NetworkObject.latitude, NetworkObject.longitude,
+            ).outerjoin(ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id).filter(
+                NetworkObject.network_object_id.in_(ids[i:i + ID_CHUNK])
+            ).all():
+                rows[row[0]] = row
+        return {
+            "object_count": snapshot.size,
+            "points": [
+                {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "results": [
+                        {
+                            "id": object_id,
+                            "name": rows[object_id][1],
+                            "object_type": rows[object_id][2],
+                            "latitude": rows[object_id][3],
+                            "longitude": rows[object_id][4],
+                            "distance_m": round(dist, 3),
+                        }
+                        # объект мог быть удален после синхронизации
+                        for object_id, dist in hits if object_id in rows
+                    ],
+                }
+                for (lat, lon), hits in zip(points, found)
+            ],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+object_index = ObjectIndex()
+events.subscribe(events.OBJECTS_CHANGED, object_index.on_objects_changed)
@@ -0,0 +1,291 @@
+"""
+Outage impact: subscribers cut off by failed cables or objects, answered
+from a DFS tree precomputed per dataset version plus the fiber circuits
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from .topology import TopologyGraph, topology_graph
+from .fiber_graph import FiberGraph, fiber_graph
+
+SUBSCRIBER_TYPE = "subscriber"
+CACHE_SIZE = 4
+
+
+def dfs_tree(indptr: List[int], arc_node: List[int], arc_edge: List[int], roots: Iterable[int]):
+    """
+    Итеративный DFS от источников (как от одного виртуального корня).
+
+    Возвращает pre (номер в прямом порядке или -1), end (граница поддерева:
+    потомки узла v - это order[pre[v]:end[v]]), order и parent_edge.
+    """
+    n = len(indptr) - 1
+    pre = [-1] * n
+    end = [0] * n
+    parent_edge = [-1] * n
+    next_arc = indptr[:-1]
+    order: List[int] = []
+    for root in roots:
+        if pre[root] != -1:
+            continue
+        pre[root] = len(order)
+        order.append(root)
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            i = next_arc[node]
+            if i < indptr[node + 1]:
+                next_arc[node] = i + 1
+                nbr = arc_node[i]
+                if pre[nbr] == -1:
+                    pre[nbr] = len(order)
+                    order.append(nbr)
+                    parent_edge[nbr] = arc_edge[i]
+                    stack.append(nbr)
+            else:
+                end[node] = len(order)
+                stack.pop()
+    return pre, end, order, parent_edge
+
+
+class _Snapshot:
+    """Предрасчет на одну версию данных и один набор источников"""
+
+    def __init__(self, graph: TopologyGraph, circuits: List[Dict[str, List[int]]],
+                 source_ids: Set[int], subscriber_ids: Set[int]):
+        sub = graph.subgraph()
+        self.graph = graph
+        self.indptr, self.arc_node, self.arc_edge = sub["indptr"], sub["arc_node"], sub["arc_edge"]
+        self.sources = sorted(graph.node_index[o] for o in source_ids if o in graph.node_index)
+        self.subscribers = {graph.node_index[o] for o in subscriber_ids if o in graph.node_index}
+        self.pre, self.end, self.order, self.parent_edge = dfs_tree(
+            self.indptr, self.arc_node, self.arc_edge, self.sources
+        )
+
+        # волоконные цепочки: индексы по кабелям, объектам и абонентам на концах
+        self.circuits = circuits
+        self.by_cable: Dict[int, List[int]] = {}
+        self.by_object: Dict[int, List[int]] = {}
+        self.by_subscriber: Dict[int, List[Tuple[int, int]]] = {}
+        for index, circuit in enumerate(circuits):
+            for cable_id in set(circuit["cables"]):
+                self.by_cable.setdefault(cable_id, []).append(index)
+            for object_id in set(circuit["objects"]):
+                self.by_object.setdefault(object_id, []).append(index)
+            a_end, z_end = circuit["objects"][0], circuit["objects"][-1]
+            # для абонента на одном конце важен объект на другом
+            for here, far in ((a_end, z_end), (z_end, a_end)):
+                if here in subscriber_ids:
+                    self.by_subscriber.setdefault(here, []).append((index, far))
+
+    def disconnected(self, failed_edges: Set[int], failed_nodes: Set[int]) -> Set[int]:
+        """
+        Узлы (достижимые до отказа), потерявшие связь со всеми источниками.
+
+        Узел, у которого путь к корню в дереве DFS цел, связь сохраняет, поэтому
+        под подозрением только поддеревья под отказавшими ребрами дерева и узлами
+        (области). Из корня каждой нерешенной области идет BFS в обход отказов и
+        останавливается на первом узле с известным состоянием: в сетке обход
+        находится за несколько шагов, а целиком проходится только реально
+        отрезанная часть.
+        """
+        pre, end, order, parent_edge = self.pre, self.end, self.order, self.parent_edge
+        indptr, arc_node, arc_edge = self.indptr, self.arc_node, self.arc_edge
+        graph = self.graph
+
+        roots: Set[int] = set()
+        for node in failed_nodes:
+            if pre[node] == -1:
+                continue
+            for i in range(indptr[node], indptr[node + 1]):
+                if parent_edge[arc_node[i]] == arc_edge[i] and arc_node[i] != node:
+                    roots.add(arc_node[i])
+        for e in failed_edges:
+            for child in (graph.edge_u[e], graph.edge_v[e]):
+                if parent_edge[child] == e:
+                    roots.add(child)
+        roots -= failed_nodes
+
+        # области вложены друг в друга: outer - ближайшая охватывающая
+        ordered = sorted(roots, key=pre.__getitem__)
+        starts = [pre[r] for r in ordered]
+        outer = [-1] * len(ordered)
+        stack: List[int] = []
+        for k, root in enumerate(ordered):
+            while stack and end[ordered[stack[-1]]] <= pre[root]:
+                stack.pop()
+            outer[k] = stack[-1] if stack else -1
+            stack.append(k)
+
+        def region(node: int) -> int:
+            position = pre[node]
+            k = bisect_right(starts, position) - 1
+            while k != -1 and end[ordered[k]] <= position:
+                k = outer[k]
+            return k
+
+        status: List[Optional[bool]] = [None] * len(ordered)
+        # источники живы всегда, даже если DFS вошел в них из другого источника
+        known: Dict[int, bool] = {node: True for node in self.sources if node not in failed_nodes}
+
+        def state(node: int) -> Optional[bool]:
+            if node in known:
+                return known[node]
+            k = region(node)
+            return True if k == -1 else status[k]
+
+        for k, root in enumerate(ordered):
+            if status[k] is not None:
+                continue
+            if root in known:
+                status[k] = known[root]
+                continue
+            seen = {root}
+            queue = deque([root])
+            alive = False
+            while queue:
+                node = queue.popleft()
+                for i in range(indptr[node], indptr[node + 1]):
+                    nbr = arc_node[i]
+                    if nbr in seen or nbr in failed_nodes or arc_edge[i] in failed_edges:
+                        continue
+                    nbr_state = state(nbr)
+                    if nbr_state is None:
+                        seen.add(nbr)
+                        queue.append(nbr)
+                    else:
+                        # связь с отрезанной частью - это та же отрезанная компонента
+                        alive = nbr_state
+                        queue.clear()
+                        break
+            for node in seen:
+                known[node] = alive
+                node_region = region(node)
+                if ordered[node_region] == node:
+                    status[node_region] = alive
+
+        cut = {node for node, alive in known.items() if not alive}
+        children: Dict[int, List[int]] = {}
+        for k in range(len(ordered)):
+            children.setdefault(outer[k], []).append(k)
+        for k, root in enumerate(ordered):
+            if status[k]:
+                continue
+            position = pre[root]
+            for child in children.get(k, ()):
+                cut.update(order[position:pre[ordered[child]]])
+                position = end[ordered[child]]
+            cut.update(order[position:end[root]])
+        cut -= failed_nodes
+        cut.update(node for node in failed_nodes if pre[node] != -1)
+        return cut
+
+
+class OutageImpact:
+    """Снимки предрасчета в LRU по (версия данных, источники)"""
+
+    def __init__(self, graph: TopologyGraph, fibers: FiberGraph):
+        self.graph = graph
+        self.fibers = fibers
+        self._snapshots: "OrderedDict[Tuple[int, Optional[FrozenSet[int]]], _Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _snapshot(self, db: Session, source_ids: Optional[Iterable[int]]) -> Tuple[_Snapshot, bool]:
+        key = (events.dataset_version(), frozenset(source_ids) if source_ids is not None else None)
+        with self._lock:
+            if key in self._snapshots:
+                self._snapshots.move_to_end(key)
+                return self._snapshots[key], True
+
+            self.graph.sync(db)
+            self.fibers.sync(db)
+            source_types = [name.strip() for name in settings.IMPACT_SOURCE_OBJECT_TYPES.split(",") if name.strip()]
+            typed = db.query(NetworkObject.network_object_id, ObjectType.name).join(
+                ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id
+            ).filter(ObjectType.name.in_(source_types + [SUBSCRIBER_TYPE])).all()
+            subscribers = {object_id for object_id, type_name in typed if type_name == SUBSCRIBER_TYPE}
+            sources = set(source_ids) if source_ids is not None else {
+                object_id for object_id, type_name in typed if type_name in source_types
+            }
+            snapshot = _Snapshot(self.graph, self.fibers.circuits(), sources, subscribers)
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > CACHE_SIZE:
+                self._snapshots.popitem(last=False)
+            return snapshot, False
+
+    def impact(
+        self,
+        db: Session,
+        cable_ids: Iterable[int] = (),
+        object_ids: Iterable[int] = (),
+        source_object_ids: Optional[Iterable[int]] = None,
+        fiber_aware: bool = True,
+    ) -> Dict[str, Any]:
+        """Абоненты, отрезанные от источников отказом кабелей и объектов"""
+        snapshot, precomputed = self._snapshot(db, source_object_ids)
+        started = time.perf_counter()
+        graph = self.graph
+        cable_ids, object_ids = set(cable_ids), set(object_ids)
+        failed_edges = {graph.cable_edge[c] for c in cable_ids if c in graph.cable_edge}
+        failed_nodes = {graph.node_index[o] for o in object_ids if o in graph.node_index}
+
+        cut_off = snapshot.disconnected(failed_edges, failed_nodes)
+        cut_off_ids = {graph.node_ids[n] for n in cut_off}
+        affected: Dict[int, str] = {
+            graph.node_ids[n]: "topology" for n in cut_off if n in snapshot.subscribers and snapshot.pre[n] != -1
+        }
+
+        if fiber_aware and snapshot.circuits:
+            hit: Set[int] = set()
+            for cable_id in cable_ids:
+                hit.update(snapshot.by_cable.get(cable_id, ()))
+            for object_id in object_ids:
+                hit.update(snapshot.by_object.get(object_id, ()))
+            # абонент со сварными цепочками обслуживается только по ним: он
+            # отрезан, если ни одна целая цепочка не приводит к живому объекту
+            check = {graph.node_ids[n] for n in cut_off} | {
+                end for index in hit for end in (snapshot.circuits[index]["objects"][0], snapshot.circuits[index]["objects"][-1])
+            }
+            for subscriber_id in check:
+                circuits = snapshot.by_subscriber.get(subscriber_id)
+                if not circuits:
+                    continue
+                alive = any(
+                    index not in hit and far not in cut_off_ids and far not in object_ids
+                    and far in graph.node_index and snapshot.pre[graph.node_index[far]] != -1
+                    for index, far in circuits
+                )
+                if alive:
+                    affected.pop(subscriber_id, None)
+                elif subscriber_id not in affected:
+                    affected[subscriber_id] = "fiber"
+
+        names = {}
+        ids = sorted(affected)
+        for i in range(0, len(ids), 500):
+            names.update(db.query(NetworkObject.network_object_id, NetworkObject.name).filter(
+                NetworkObject.network_object_id.in_(ids[i:i + 500])
+            ).all())
+        return {
+            "failed_cable_ids": sorted(cable_ids),
+            "failed_object_ids": sorted(object_ids),
+            "source_count": len(snapshot.sources),
+            "disconnected_object_count": len(cut_off),
+            "affected_subscriber_count": len(ids),
+            "affected_subscribers": [
+                {"object_id": object_id, "name": names.get(object_id), "reason": affected[object_id]} for object_id in ids
+            ],
+            "precomputed": precomputed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+outage_impact = OutageImpact(topology_graph, fiber_graph)
@@ -0,0 +1,37 @@
+"""
+Dirty-column updates for PATCH endpoints: compare the payload with the
+stored row and write only the columns that actually changed
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+
+def load_row(db: Session, model, pk_name: str, entity_id: int, fields: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """Текущие значения полей одной строки без загрузки ORM-объекта"""
+    fields = list(fields)
+    row = db.query(*[getattr(model, f) for f in fields]).filter(getattr(model, pk_name) == entity_id).first()
+    return dict(zip(fields, row)) if row is not None else None
+
+
+def dirty_fields(current: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля, значение которых отличается от сохраненного"""
+    return {key: value for key, value in payload.items() if key in current and current[key] != value}
+
+
+def write_dirty(db: Session, model, pk_name: str, entity_id: int, dirty: Dict[str, Any]) -> Optional[datetime]:
+    """UPDATE только измененных колонок и updated_at; без изменений запись пропускается"""
+    if not dirty:
+        return None
+    now = datetime.utcnow()
+    db.execute(
+        update(model).where(getattr(model, pk_name) == entity_id).values(**dirty, updated_at=now)
+    )
+    return now
+
+
+def patch_response(entity_id: int, dirty: Dict[str, Any], updated_at: Optional[datetime], **extra) -> Dict[str, Any]:
+    """Минимальный ответ PATCH: id и новые значения измененных полей"""
+    return {"id": entity_id, "changed": dirty, "updated_at": updated_at, **extra}
@@ -0,0 +1,392 @@
+"""
+PON tree analysis: downstream subscriber count, depth and cable length for
+every splitter and node, from a BFS forest rooted at the sources and kept
+current incrementally as cables are added or removed
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core import events
+from ..core.config import settings
+from ..models.network_object import NetworkObject
+from ..models.object_type import ObjectType
+from .splice_integrity import ID_CHUNK
+from .topology import TopologyGraph, topology_graph
+from .outage_impact import SUBSCRIBER_TYPE
+
+SPLITTER_TYPE = "splitter"
+
+
+def _type_names(value: str) -> Set[str]:
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class PonTrees:
+    """
+    Лес кратчайших по числу кабелей путей от источников и агрегаты поддеревьев.
+
+    Полный расчет - BFS от всех источников и один проход в обратном порядке
+    обхода (потомки раньше предков). Изменения кабелей применяются к дереву на
+    месте: новый кабель к неподключенной части подвешивает ее под дерево,
+    удаленный кабель дерева отрезает поддерево, смена длины поправляет суммы
+    предков. Пересчет целиком нужен, только если изменение может перестроить
+    сам лес: кабель между узлами дерева с разницей глубин больше 1 или
+    отрезанная часть, у которой есть другой путь в дерево.
+    """
+
+    def __init__(self, graph: TopologyGraph):
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._stale = True
+        self._dirty_cables: Set[int] = set()
+        self._dirty_objects: Set[int] = set()
+        self._graph_rebuilds = -1
+        self._items: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+        self.stats: Dict[str, int] = {"rebuilds": 0, "updates": 0}
+        self._reset()
+
+    def _reset(self) -> None:
+        self.type_name: List[Optional[str]] = []
+        self.parent: List[int] = []
+        self.first_child: List[int] = []
+        self.next_sibling: List[int] = []
+        self.prev_sibling: List[int] = []
+        self.depth: List[int] = []
+        self.root: List[int] = []
+        # длина кабеля к родителю, какой она учтена в суммах
+        self.weight: List[float] = []
+        self.parent_cable: List[int] = []
+        self.subscribers: List[int] = []
+        self.distance: List[float] = []
+        self.height: List[int] = []
+        self.splits: List[int] = []
+        self.tree_cable: Dict[int, int] = {}
+
+    # ---------- события ----------
+
+    def on_cables_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty_cables |= ids
+
+    def on_objects_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty_objects |= ids
+
+    def sync(self, db: Session) -> bool:
+        """Привести лес к текущим данным; True - пришлось пересчитать целиком"""
+        with self._lock:
+            cable_ids, object_ids = self._dirty_cables, self._dirty_objects
+            self._dirty_cables, self._dirty_objects = set(), set()
+            stale = self._stale
+            self._stale = False
+        # граф держится под своей блокировкой, пока лес читает его дуги
+        with self.graph._lock:
+            self.graph.sync(db)
+            if stale or self.graph.stats["rebuilds"] != self._graph_rebuilds:
+                self._rebuild(db)
+                return True
+            # объекты, которые граф добавил вместе с кабелями, тоже нужно типизировать
+            known = len(self.parent)
+            self._grow()
+            object_ids = object_ids | set(self.graph.node_ids[known:])
+            if (object_ids and not self._apply_objects(db, object_ids)) or (
+                cable_ids and not self._apply_cables(cable_ids)
+            ):
+                self._rebuild(db)
+                return True
+            if cable_ids or object_ids:
+                self.stats["updates"] += 1
+            return False
+
+    # ---------- полный расчет ----------
+
+    def _load_types(self, db: Session, object_ids: Optional[List[int]] = None) -> Dict[int, str]:
+        query = db.query(NetworkObject.network_object_id, ObjectType.name).join(
+            ObjectType, NetworkObject.object_type_id == ObjectType.object_type_id
+        )
+        if object_ids is None:
+            return dict(query.all())
+        types: Dict[int, str] = {}
+        for i in range(0, len(object_ids), ID_CHUNK):
+            types.update(query.filter(NetworkObject.network_object_id.in_(object_ids[i:i + ID_CHUNK])).all())
+        return types
+
+    def _grow(self) -> None:
+        missing = len(self.graph.node_ids) - len(self.parent)
+        if missing <= 0:
+            return
+        for values, fill in (
+            (self.type_name, None), (self.parent, -1), (self.first_child, -1), (self.next_sibling, -1),
+            (self.prev_sibling, -1), (self.depth, -1), (self.root, -1), (self.weight, 0.0), (self.parent_cable, -1),
+            (self.subscribers, 0), (self.distance, 0.0), (self.height, 0), (self.splits, 0),
+        ):
+            values.extend([fill] * missing)
+
+    def _rebuild(self, db: Session) -> None:
+        graph = self.graph
+        self._reset()
+        self._grow()
+        self._graph_rebuilds = graph.stats["rebuilds"]
+        types = self._load_types(db)
+        type_name = self.type_name
+        for node, object_id in enumerate(graph.node_ids):
+            type_name[node] = types.get(object_id)
+        sources = _type_names(settings.IMPACT_SOURCE_OBJECT_TYPES)
+
+        parent, depth, root, weight = self.parent, self.depth, self.root, self.weight
+        active, edge_w, edge_cable = graph.edge_active, graph.edge_w, graph.edge_cable
+        order = [node for node in range(len(type_name)) if type_name[node] in sources]
+        for node in order:
+            depth[node] = 0
+            root[node] = node
+        i = 0
+        while i < len(order):
+            node = order[i]
+            i += 1
+            for nbr, e in graph.arcs(node):
+                if active[e] and depth[nbr] == -1:
+                    depth[nbr] = depth[node] + 1
+                    root[nbr] = root[node]
+                    parent[nbr] = node
+                    weight[nbr] = edge_w[e]
+                    self.parent_cable[nbr] = edge_cable[e]
+                    self.tree_cable[edge_cable[e]] = nbr
+                    order.append(nbr)
+
+        subscribers, distance, height, splits = self.subscribers, self.distance, self.height, self.splits
+        for node, name in enumerate(type_name):
+            subscribers[node] = 1 if name == SUBSCRIBER_TYPE else 0
+            splits[node] = 1 if name == SPLITTER_TYPE else 0
+        # обратный порядок BFS - потомки раньше предков
+        for node in reversed(order):
+            p = parent[node]
+            if p == -1:
+                continue
+            self._link(p, node)
+            subscribers[p] += subscribers[node]
+            distance[p] += distance[node] + weight[node]
+            if height[node] + 1 > height[p]:
+                height[p] = height[node] + 1
+            split = splits[node] + (1 if type_name[p] == SPLITTER_TYPE else 0)
+            if split > splits[p]:
+                splits[p] = split
+        self.stats["rebuilds"] += 1
+
+    # ---------- правка на месте ----------
+
+    def _link(self, parent: int, child: int) -> None:
+        head = self.first_child[parent]
+        self.next_sibling[child] = head
+        self.prev_sibling[child] = -1
+        if head != -1:
+            self.prev_sibling[head] = child
+        self.first_child[parent] = child
+        self.parent[child] = parent
+
+    def _unlink(self, child: int) -> None:
+        prev, nxt = self.prev_sibling[child], self.next_sibling[child]
+        if prev != -1:
+            self.next_sibling[prev] = nxt
+        else:
+            self.first_child[self.parent[child]] = nxt
+        if nxt != -1:
+            self.prev_sibling[nxt] = prev
+        self.parent[child] = self.prev_sibling[child] = self.next_sibling[child] = -1
+
+    def _children(self, node: int):
+        child = self.first_child[node]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    def _propagate(self, node: int, subscribers: int, distance: float) -> None:
+        """Добавить к суммам узла и всех предков, пересчитав их глубину и каскад сплиттеров"""
+        while node != -1:
+            self.subscribers[node] += subscribers
+            self.distance[node] += distance
+            height = splits = 0
+            for child in self._children(node):
+                height = max(height, self.height[child] + 1)
+                splits = max(splits, self.splits[child])
+            self.height[node] = height
+            self.splits[node] = splits + (1 if self.type_name[node] == SPLITTER_TYPE else 0)
+            node = self.parent[node]
+
+    def _detach(self, child: int) -> List[int]:
+        """Отрезать поддерево от родителя; возвращает его узлы, они становятся неподключенными"""
+        parent = self.parent[child]
+        self._unlink(child)
+        self._propagate(parent, -self.subscribers[child], -(self.distance[child] + self.weight[child]))
+        nodes = [child]
+        i = 0
+        while i < len(nodes):
+            nodes.extend(self._children(nodes[i]))
+            i += 1
+        for node in nodes:
+            self.tree_cable.pop(self.parent_cable[node], None)
+            self.parent_cable[node] = -1
+            self.first_child[node] = self.parent[node] = self.prev_sibling[node] = self.next_sibling[node] = -1
+            self.depth[node] = self.root[node] = -1
+            self.weight[node] = self.distance[node] = 0.0
+            self.height[node] = 0
+            self.subscribers[node] = 1 if self.type_name[node] == SUBSCRIBER_TYPE else 0
+            self.splits[node] = 1 if self.type_name[node] == SPLITTER_TYPE else 0
+        return nodes
+
+    def _attach(self, node: int, start: int, e: int) -> bool:
+        """
+        Подвесить неподключенную часть, содержащую start, под узел дерева по ребру e.
+
+        False - у части есть еще выход в дерево: глубины могут зависеть от него.
+        """
+        graph, depth, parent, weight = self.graph, self.depth, self.parent, self.weight
+        active, edge_w, edge_cable = graph.edge_active, graph.edge_w, graph.edge_cable
+        order = [start]
+        found = {start: (node, e)}
+        i = 0
+        while i < len(order):
+            current = order[i]
+            i += 1
+            for nbr, arc_e in graph.arcs(current):
+                if not active[arc_e] or arc_e == found[current][1]:
+                    continue
+                if depth[nbr] != -1:
+                    return False
+                if nbr not in found:
+                    found[nbr] = (current, arc_e)
+                    order.append(nbr)
+
+        for current in order:
+            up, arc_e = found[current]
+            depth[current] = depth[up] + 1
+            self.root[current] = self.root[node]
+            weight[current] = edge_w[arc_e]
+            self.parent_cable[current] = edge_cable[arc_e]
+            self.tree_cable[edge_cable[arc_e]] = current
+            if up != node:
+                self._link(up, current)
+        for current in reversed(order):
+            if current == start:
+                break
+            p = parent[current]
+            self.subscribers[p] += self.subscribers[current]
+            self.distance[p] += self.distance[current] + weight[current]
+            self.height[p] = max(self.height[p], self.height[current] + 1)
+            self.splits[p] = max(
+                self.splits[p], self.splits[current] + (1 if self.type_name[p] == SPLITTER_TYPE else 0)
+            )
+        self._link(node, start)
+        self._propagate(node, self.subscribers[start], self.distance[start] + weight[start])
+        return True
+
+    def _apply_cables(self, cable_ids: Set[int]) -> bool:
+        """Применить изменения кабелей; False - нужен полный пересчет"""
+        graph = self.graph
+        edge_u, edge_v, edge_w = graph.edge_u, graph.edge_v, graph.edge_w
+        detached: List[int] = []
+        added: List[int] = []
+        for cable_id in cable_ids:
+            e = graph.cable_edge.get(cable_id)
+            child = self.tree_cable.get(cable_id)
+            if child is not None:
+                p = self.parent[child]
+                if e is not None and {edge_u[e], edge_v[e]} == {p, child}:
+                    # тот же кабель дерева: поменяться могла только длина
+                    delta = edge_w[e] - self.weight[child]
+                    if delta:
+                        self.weight[child] = edge_w[e]
+                        self._propagate(p, 0, delta)
+                    continue
+                detached.extend(self._detach(child))
+            if e is not None:
+                added.append(e)
+
+        # отрезанная часть, у которой остался другой путь в дерево, может подключиться на другой глубине
+        if detached:
+            for node in detached:
+                for nbr, e in graph.arcs(node):
+                    if graph.edge_active[e] and self.depth[nbr] != -1:
+                        return False
+
+        for e in added:
+            u, v = edge_u[e], edge_v[e]
+            du, dv = self.depth[u], self.depth[v]
+            if du != -1 and dv != -1:
+                if abs(du - dv) > 1:
+                    return False
+            elif du != -1 or dv != -1:
+                node, start = (u, v) if du != -1 else (v, u)
+                if not self._attach(node, start, e):
+                    return False
+        return True
+
+    def _apply_objects(self, db: Session, object_ids: Set[int]) -> bool:
+        """Сменить типы объектов; False - изменился состав источников"""
+        sources = _type_names(settings.IMPACT_SOURCE_OBJECT_TYPES)
+        types = self._load_types(db, list(object_ids))
+        for object_id in object_ids:
+            node = self.graph.node_index.get(object_id)
+            if node is None:
+                continue
+            old, new = self.type_name[node], types.get(object_id)
+            if old == new:
+                continue
+            if (old in sources) != (new in sources):
+                return False
+            self.type_name[node] = new
+            delta = (new == SUBSCRIBER_TYPE) - (old == SUBSCRIBER_TYPE)
+            if self.depth[node] == -1:
+                self.subscribers[node] += delta
+                self.splits[node] = 1 if new == SPLITTER_TYPE else 0
+            else:
+                self._propagate(node, delta, 0.0)
+        return True
+
+    # ---------- результат ----------
+
+    def analyze(self, db: Session) -> Dict[str, Any]:
+        """Строки по всем объектам отчетных типов; при той же версии данных - из кеша"""
+        started = time.perf_counter()
+        version = events.dataset_version()
+        cached = self._items
+        if cached is not None and cached[0] == version:
+            return {"dataset_version": version, "items": cached[1], "cached": True, "rebuilt": False,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+        rebuilt = self.sync(db)
+        reported = _type_names(settings.PON_TREE_OBJECT_TYPES)
+        items = []
+        with self.graph._lock:
+            node_ids = self.graph.node_ids
+            for node, type_name in enumerate(self.type_name):
+                if type_name not in reported:
+                    continue
+                connected = self.depth[node] != -1
+                items.append({
+                    "object_id": node_ids[node],
+                    "object_type": type_name,
+                    "connected": connected,
+                    "source_object_id": node_ids[self.root[node]] if connected else None,
+                    "depth": self.depth[node] if connected else None,
+                    "subscriber_count": self.subscribers[node],
+                    "max_depth": self.height[node],
+                    "split_levels": self.splits[node],
+                    "downstream_distance_km": round(self.distance[node], 6),
+                })
+        items.sort(key=lambda item: item["object_id"])
+        self._items = (version, items)
+        return {"dataset_version": version, "items": items, "cached": False, "rebuilt": rebuilt,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+pon_trees = PonTrees(topology_graph)
+events.subscribe(events.CABLES_CHANGED, pon_trees.on_cables_changed)
+events.subscribe(events.OBJECTS_CHANGED, pon_trees.on_objects_changed)
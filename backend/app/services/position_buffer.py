@@ -0,0 +1,118 @@
+"""
+Write coalescing for high-frequency object moves: the latest position per
+object is buffered and flushed on a short timer in one transaction
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import update
+from ..core.config import settings
+from ..database.database import SessionLocal
+from ..models.network_object import NetworkObject
+from .cable_distances import propagate_object_moves
+
+ID_CHUNK = 500
+
+
+class PositionBuffer:
+    """Буфер перемещений: на объект хранится только последняя позиция"""
+
+    def __init__(self, flush_interval_ms: Optional[int] = None, session_factory=SessionLocal):
+        self.flush_interval_ms = settings.POSITION_FLUSH_INTERVAL_MS if flush_interval_ms is None else flush_interval_ms
+        self._session_factory = session_factory
+        self._pending: Dict[int, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        # сброс выполняется строго по одному, чтобы порядок перемещений сохранялся
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.stats: Dict[str, Any] = {"received": 0, "coalesced": 0, "flushes": 0, "failed_flushes": 0, "last_flush": None}
+
+    def submit(self, moves: Iterable[Tuple[int, float, float]]) -> Dict[str, Any]:
+        """Поставить перемещения в очередь; сброс запланирован через flush_interval_ms"""
+        accepted = 0
+        with self._lock:
+            for object_id, latitude, longitude in moves:
+                if object_id in self._pending:
+                    self.stats["coalesced"] += 1
+                self._pending[object_id] = (latitude, longitude)
+                accepted += 1
+            self.stats["received"] += accepted
+            self._schedule()
+            pending = len(self._pending)
+        return {"accepted": accepted, "pending": pending, "flush_in_ms": self.flush_interval_ms}
+
+    def _schedule(self) -> None:
+        # вызывается под self._lock
+        if self._pending and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval_ms / 1000.0, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Записать накопленные позиции одной транзакцией и один раз пересчитать производные данные.
+        При ошибке записи позиции возвращаются в очередь (кроме перекрытых более новыми),
+        а в результате есть error и requeued.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, {}
+            result = {"written": 0, "unchanged": 0, "missing": 0, "affected_cable_ids": []}
+            if batch:
+                result = self._write(batch)
+                with self._lock:
+                    if "error" in result:
+                        requeued = 0
+                        for object_id, position in batch.items():
+                            # пришедшая за время записи позиция новее неудачной
+                            if object_id not in self._pending:
+                                self._pending[object_id] = position
+                                requeued += 1
+                        result["requeued"] = requeued
+                        self.stats["failed_flushes"] += 1
+                        self._schedule()
+                    self.stats["flushes"] += 1
+                    self.stats["last_flush"] = {**result, "at": datetime.utcnow().isoformat()}
+            return result
+
+    def _write(self, batch: Dict[int, Tuple[float, float]]) -> Dict[str, Any]:
+        db = self._session_factory()
+        try:
+            ids = list(batch)
+            current: Dict[int, Tuple[float, float]] = {}
+            for i in range(0, len(ids), ID_CHUNK):
+                for object_id, latitude, longitude in db.query(
+                    NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+                ).filter(NetworkObject.network_object_id.in_(ids[i:i + ID_CHUNK])).all():
+                    current[object_id] = (latitude, longitude)
+
+            now = datetime.utcnow()
+            rows = [
+                {"network_object_id": object_id, "latitude": position[0], "longitude": position[1], "updated_at": now}
+                for object_id, position in batch.items()
+                if object_id in current and current[object_id] != position
+            ]
+            affected = []
+            if rows:
+                db.execute(update(NetworkObject), rows)
+                affected = propagate_object_moves(db, [row["network_object_id"] for row in rows])
+            db.commit()
+            return {
+                "written": len(rows),
+                "unchanged": sum(1 for object_id in batch if object_id in current) - len(rows),
+                "missing": sum(1 for object_id in batch if object_id not in current),
+                "affected_cable_ids": affected,
+            }
+        except Exception as e:
+            db.rollback()
+            print(f"Error flushing position updates: {e}")
+            return {"written": 0, "unchanged": 0, "missing": 0, "affected_cable_ids": [], "error": str(e)}
+        finally:
+            db.close()
+
+
+position_buffer = PositionBuffer()
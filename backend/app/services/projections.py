@@ -0,0 +1,76 @@
+"""
+Response projections: select exactly the columns a response needs in one
+statement and build plain dicts, bypassing the ORM identity map and
+response_model re-validation
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models.cable import Cable
+from ..models.cable_type import CableType
+from ..models.region import region_cables
+
+_cables = Cable.__table__
+_cable_types = CableType.__table__
+
+# порядок совпадает с полями CableResponse
+CABLE_COLUMNS = (
+    _cables.c.cable_id.label("id"),
+    _cables.c.name,
+    _cables.c.cable_type_id,
+    _cable_types.c.name.label("cable_type_name"),
+    _cable_types.c.color.label("cable_type_color"),
+    _cables.c.fiber_count,
+    _cables.c.from_object_id,
+    _cables.c.to_object_id,
+    _cables.c.distance_km,
+    _cables.c.description,
+    _cables.c.created_at,
+    _cables.c.updated_at,
+)
+
+
+def iso(value: Optional[datetime]) -> Optional[str]:
+    """datetime в строку ISO, как ее сериализует pydantic"""
+    return value.isoformat() if value is not None else None
+
+
+def cable_select():
+    """SELECT колонок CableResponse с LEFT JOIN cable_types"""
+    return select(*CABLE_COLUMNS).select_from(
+        _cables.outerjoin(_cable_types, _cables.c.cable_type_id == _cable_types.c.cable_type_id)
+    )
+
+
+def _cable_dicts(db: Session, stmt) -> List[Dict[str, Any]]:
+    rows = []
+    for row in db.execute(stmt).mappings():
+        item = dict(row)
+        item["created_at"] = iso(item["created_at"])
+        item["updated_at"] = iso(item["updated_at"])
+        rows.append(item)
+    return rows
+
+
+def list_cables(db: Session, skip: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Кабели в форме CableResponse одним запросом"""
+    stmt = cable_select().order_by(_cables.c.cable_id).offset(skip)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return _cable_dicts(db, stmt)
+
+
+def get_cable(db: Session, cable_id: int) -> Optional[Dict[str, Any]]:
+    """Один кабель в форме CableResponse или None"""
+    rows = _cable_dicts(db, cable_select().where(_cables.c.cable_id == cable_id))
+    return rows[0] if rows else None
+
+
+def list_region_cables(db: Session, region_id: int) -> List[Dict[str, Any]]:
+    """Кабели региона в форме CableResponse одним запросом"""
+    stmt = cable_select().join(
+        region_cables, region_cables.c.cable_id == _cables.c.cable_id
+    ).where(region_cables.c.region_id == region_id).order_by(_cables.c.cable_id)
+    return _cable_dicts(db, stmt)
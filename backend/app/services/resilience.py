@@ -0,0 +1,151 @@
+"""
+Single-point-of-failure analysis over the topology graph: bridges,
+articulation points and connected components, cached per dataset version
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.region import region_objects, region_cables
+from .topology import TopologyGraph, topology_graph
+
+CACHE_SIZE = 16
+
+
+def tarjan(indptr: List[int], arc_node: List[int], arc_edge: List[int]) -> Tuple[List[int], List[bool], List[int]]:
+    """
+    Мосты, точки сочленения и компоненты связности одним итеративным обходом.
+
+    Вместо рекурсии - явный стек и указатель на следующую дугу каждого узла,
+    поэтому глубина графа не ограничена лимитом рекурсии. Родительская дуга
+    пропускается по id ребра, а не по соседу: параллельные кабели мостами не считаются.
+    Возвращает (ребра-мосты, флаги сочленения по узлам, номер компоненты по узлам).
+    """
+    n = len(indptr) - 1
+    disc = [-1] * n
+    low = [0] * n
+    parent_edge = [-1] * n
+    next_arc = indptr[:-1]
+    articulation = [False] * n
+    component = [-1] * n
+    bridges: List[int] = []
+    counter = 0
+
+    for root in range(n):
+        if disc[root] != -1:
+            continue
+        comp_id = root
+        disc[root] = low[root] = counter
+        counter += 1
+        component[root] = comp_id
+        root_children = 0
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            i = next_arc[node]
+            if i < indptr[node + 1]:
+                next_arc[node] = i + 1
+                edge = arc_edge[i]
+                if edge == parent_edge[node]:
+                    continue
+                nbr = arc_node[i]
+                if disc[nbr] == -1:
+                    disc[nbr] = low[nbr] = counter
+                    counter += 1
+                    parent_edge[nbr] = edge
+                    component[nbr] = comp_id
+                    if node == root:
+                        root_children += 1
+                    stack.append(nbr)
+                elif disc[nbr] < low[node]:
+                    low[node] = disc[nbr]
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                    if low[node] > disc[parent]:
+                        bridges.append(parent_edge[node])
+                    if parent != root and low[node] >= disc[parent]:
+                        articulation[parent] = True
+        if root_children > 1:
+            articulation[root] = True
+    return bridges, articulation, component
+
+
+class ResilienceAnalyzer:
+    """Кеш результатов анализа по (версия данных, регион)"""
+
+    def __init__(self, graph: TopologyGraph):
+        self.graph = graph
+        self._cache: "OrderedDict[Tuple[int, Optional[int]], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, db: Session, region_id: Optional[int] = None) -> Dict[str, Any]:
+        """Полный результат анализа; повторный запрос при той же версии данных берется из кеша"""
+        key = (events.dataset_version(), region_id)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return {**self._cache[key], "cached": True}
+
+        started = time.perf_counter()
+        self.graph.sync(db)
+        if region_id is None:
+            sub = self.graph.subgraph()
+        else:
+            cable_ids = db.scalars(select(region_cables.c.cable_id).where(region_cables.c.region_id == region_id)).all()
+            object_ids = db.scalars(
+                select(region_objects.c.network_object_id).where(region_objects.c.region_id == region_id)
+            ).all()
+            sub = self.graph.subgraph(cable_ids, object_ids)
+
+        bridges, articulation, component = tarjan(sub["indptr"], sub["arc_node"], sub["arc_edge"])
+        nodes = sub["nodes"]
+        node_ids = np.asarray(self.graph.node_ids, dtype=np.int64)[nodes] if len(nodes) else np.zeros(0, dtype=np.int64)
+        edge_cable = self.graph.edge_cable
+        edge_u = self.graph.edge_u
+
+        labels = np.asarray(component, dtype=np.int64)
+        roots, object_counts = np.unique(labels, return_counts=True)
+        local = np.full(len(self.graph.node_ids), -1, dtype=np.int64)
+        local[nodes] = np.arange(len(nodes))
+        edge_labels = labels[local[np.asarray(edge_u, dtype=np.int64)[sub["edges"]]]] if len(sub["edges"]) else labels[:0]
+        cable_counts = dict(zip(*np.unique(edge_labels, return_counts=True))) if len(edge_labels) else {}
+        components = sorted(
+            (
+                {
+                    "object_count": int(count),
+                    "cable_count": int(cable_counts.get(root, 0)),
+                    "sample_object_id": int(node_ids[root]),
+                }
+                for root, count in zip(roots.tolist(), object_counts.tolist())
+            ),
+            key=lambda c: (-c["object_count"], c["sample_object_id"]),
+        )
+
+        result = {
+            "dataset_version": key[0],
+            "region_id": region_id,
+            "object_count": int(len(nodes)),
+            "cable_count": int(len(sub["edges"])),
+            "component_count": len(components),
+            "components": components,
+            "bridges": sorted(edge_cable[e] for e in bridges),
+            "articulation_points": sorted(int(node_ids[i]) for i, flag in enumerate(articulation) if flag),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return {**result, "cached": False}
+
+
+resilience_analyzer = ResilienceAnalyzer(topology_graph)
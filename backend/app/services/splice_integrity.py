@@ -0,0 +1,292 @@
+"""
+Splice integrity: bulk validation of proposed splices against fiber counts
+and current occupancy, and a single-pass scan of the whole network.
+
+A fiber is addressed as (cable_id, fiber_number), numbering starts at 0 as in
+the schema editor. A fiber has two ends (at the cable's from and to objects)
+and each end can take part in one splice, so a fiber may be spliced once at
+each end, which is what lets a path continue through several couplings.
+A fiber reserved by a fiber allocation is taken at both ends: only a splice
+made for that allocation may use it.
+"""
+
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..models.cable import Cable
+from ..models.fiber_splice import FiberSplice
+from ..models.fiber_reservation import FiberReservation
+
+ID_CHUNK = 500
+MAX_REPORTED_CONFLICTS = 1000
+
+FROM_END = 0
+TO_END = 1
+
+# (cable_id, fiber_number, end)
+FiberEnd = Tuple[int, int, int]
+# fiber_count, from_object_id, to_object_id
+CableInfo = Tuple[Optional[int], int, int]
+
+
+def _conflict(kind: str, message: str, **details) -> Dict[str, Any]:
+    return {"kind": kind, "message": message, **details}
+
+
+def _end_name(end: int) -> str:
+    return "to" if end == TO_END else "from"
+
+
+def splice_end_pair(source: CableInfo, target: CableInfo) -> Optional[Tuple[int, int]]:
+    """
+    Концы двух кабелей, на которых сделана сварка: объект, общий для обоих.
+
+    Если общих объектов два (параллельные кабели), выбирается конец to
+    исходного кабеля и конец from целевого - направление записи сварки.
+    None - кабели не сходятся ни в одном объекте.
+    """
+    for i in (TO_END, FROM_END):
+        for j in (FROM_END, TO_END):
+            if source[1 + i] == target[1 + j]:
+                return (i, j)
+    return None
+
+
+def fiber_in_range(fiber: int, cable: CableInfo) -> bool:
+    """Волокно есть в кабеле: 0 <= fiber < fiber_count"""
+    return 0 <= fiber < (cable[0] or 0)
+
+
+def load_cable_info(db: Session, cable_ids: Iterable[int]) -> Dict[int, CableInfo]:
+    """fiber_count и концы кабелей по id"""
+    info: Dict[int, CableInfo] = {}
+    ids = list(set(cable_ids))
+    for i in range(0, len(ids), ID_CHUNK):
+        for cable_id, fiber_count, from_id, to_id in db.query(
+            Cable.cable_id, Cable.fiber_count, Cable.from_object_id, Cable.to_object_id
+        ).filter(Cable.cable_id.in_(ids[i:i + ID_CHUNK])).all():
+            info[cable_id] = (fiber_count, from_id, to_id)
+    return info
+
+
+def splice_fiber_ends(splice: Dict[str, Any], cables: Dict[int, CableInfo]) -> List[FiberEnd]:
+    """Концы волокон, которые занимает сварка; пусто, если место сварки не определить"""
+    source = cables.get(splice["cable_id"])
+    target = cables.get(splice.get("splice_to_cable_id"))
+    if source is None or target is None:
+        return []
+    pair = splice_end_pair(source, target)
+    if pair is None:
+        return []
+    return [
+        (splice["cable_id"], splice["fiber_number"], pair[0]),
+        (splice["splice_to_cable_id"], splice["splice_to_fiber"], pair[1]),
+    ]
+
+
+def splice_from_row(row) -> Dict[str, Any]:
+    return {
+        "fiber_splices_id": row[0], "cable_id": row[1], "fiber_number": row[2],
+        "splice_to_cable_id": row[3], "splice_to_fiber": row[4], "loss_db": row[5],
+    }
+
+
+SPLICE_COLUMNS = (
+    FiberSplice.fiber_splices_id, FiberSplice.cable_id, FiberSplice.fiber_number,
+    FiberSplice.splice_to_cable_id, FiberSplice.splice_to_fiber, FiberSplice.loss_db,
+)
+
+
+def load_touching_splices(db: Session, cable_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Сварки, у которых хотя бы одна сторона на одном из кабелей"""
+    ids = list(set(cable_ids))
+    found: Dict[int, Dict[str, Any]] = {}
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        for row in db.query(*SPLICE_COLUMNS).filter(
+            or_(FiberSplice.cable_id.in_(chunk), FiberSplice.splice_to_cable_id.in_(chunk))
+        ).all():
+            found[row[0]] = splice_from_row(row)
+    return list(found.values())
+
+
+def load_reserved_fibers(db: Session, cable_ids: Iterable[int]) -> Dict[Tuple[int, int], str]:
+    """Зарезервированные волокна кабелей: (cable_id, fiber_number) -> allocation_id"""
+    reserved: Dict[Tuple[int, int], str] = {}
+    ids = list(set(cable_ids))
+    for i in range(0, len(ids), ID_CHUNK):
+        for cable_id, fiber, allocation_id in db.query(
+            FiberReservation.cable_id, FiberReservation.fiber_number, FiberReservation.allocation_id
+        ).filter(FiberReservation.cable_id.in_(ids[i:i + ID_CHUNK])).all():
+            reserved[(cable_id, fiber)] = allocation_id
+    return reserved
+
+
+def validate_splice_batch(
+    db: Session, splices: List[Dict[str, Any]], replacing: Iterable[int] = (), allocation_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Проверить пакет новых сварок до записи.
+
+    Номер волокна сверяется с fiber_count обоих кабелей, повторы внутри пакета
+    ищутся счетчиком, а пересечение с уже занятыми концами волокон - пересечением
+    множеств. Сварки из replacing считаются удаленными (их заменяет пакет).
+    Зарезервированные волокна заняты, кроме резервов выделения allocation_id.
+    """
+    cable_ids = ({s["cable_id"] for s in splices} | {s["splice_to_cable_id"] for s in splices}) - {None}
+    replacing = set(replacing)
+    existing = [s for s in load_touching_splices(db, cable_ids) if s["fiber_splices_id"] not in replacing]
+    # концы соседних кабелей нужны, чтобы определить место уже существующих сварок
+    neighbour_ids = {s["cable_id"] for s in existing} | {s["splice_to_cable_id"] for s in existing}
+    cables = load_cable_info(db, (cable_ids | neighbour_ids) - {None})
+    conflicts: List[Dict[str, Any]] = []
+
+    claims: Dict[FiberEnd, List[int]] = defaultdict(list)
+    for index, splice in enumerate(splices):
+        sides = [(splice["cable_id"], splice["fiber_number"])]
+        if splice.get("splice_to_cable_id") is not None:
+            sides.append((splice["splice_to_cable_id"], splice["splice_to_fiber"]))
+        if len(sides) == 2 and sides[0] == sides[1]:
+            conflicts.append(_conflict(
+                "self_splice", f"Fiber {sides[0][1]} of cable {sides[0][0]} is spliced to itself", index=index
+            ))
+        missing = False
+        for cable_id, fiber in sides:
+            if cable_id not in cables:
+                missing = True
+                conflicts.append(_conflict(
+                    "cable_not_found", f"Cable {cable_id} not found", index=index, cable_id=cable_id
+                ))
+                continue
+            if not fiber_in_range(fiber, cables[cable_id]):
+                conflicts.append(_conflict(
+                    "fiber_out_of_range",
+                    f"Fiber {fiber} does not exist in cable {cable_id} ({cables[cable_id][0] or 0} fibers)",
+                    index=index, cable_id=cable_id, fiber_number=fiber,
+                ))
+        ends = splice_fiber_ends(splice, cables)
+        if len(sides) == 2 and not missing and not ends:
+            conflicts.append(_conflict(
+                "cables_not_adjacent", f"Cables {sides[0][0]} and {sides[1][0]} do not meet at a common object",
+                index=index,
+            ))
+        for key in set(ends):
+            claims[key].append(index)
+
+    for (cable_id, fiber, end), indexes in claims.items():
+        if len(indexes) > 1:
+            conflicts.append(_conflict(
+                "duplicate_in_batch",
+                f"Fiber {fiber} of cable {cable_id} is used by several splices in the request at its {_end_name(end)} end",
+                indexes=indexes, cable_id=cable_id, fiber_number=fiber,
+            ))
+
+    occupied: Dict[FiberEnd, int] = {}
+    for splice in existing:
+        for key in splice_fiber_ends(splice, cables):
+            occupied[key] = splice["fiber_splices_id"]
+    for key in sorted(claims.keys() & occupied.keys()):
+        cable_id, fiber, end = key
+        conflicts.append(_conflict(
+            "fiber_occupied",
+            f"Fiber {fiber} of cable {cable_id} is already used by splice {occupied[key]} at its {_end_name(end)} end",
+            indexes=claims[key], cable_id=cable_id, fiber_number=fiber, splice_id=occupied[key],
+        ))
+
+    reserved = load_reserved_fibers(db, cable_ids)
+    claimed_fibers: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+    for (cable_id, fiber, _end), indexes in claims.items():
+        claimed_fibers[(cable_id, fiber)].update(indexes)
+    for key in sorted(claimed_fibers.keys() & reserved.keys()):
+        if reserved[key] == allocation_id:
+            continue
+        cable_id, fiber = key
+        conflicts.append(_conflict(
+            "fiber_reserved",
+            f"Fiber {fiber} of cable {cable_id} is reserved by allocation {reserved[key]}",
+            indexes=sorted(claimed_fibers[key]), cable_id=cable_id, fiber_number=fiber, allocation_id=reserved[key],
+        ))
+    return conflicts
+
+
+def scan_integrity(db: Session) -> Dict[str, Any]:
+    """Проверка всех сварок сети за один проход по таблице"""
+    cables: Dict[int, CableInfo] = {
+        cable_id: (fiber_count, from_id, to_id)
+        for cable_id, fiber_count, from_id, to_id in db.query(
+            Cable.cable_id, Cable.fiber_count, Cable.from_object_id, Cable.to_object_id
+        ).all()
+    }
+    rows = db.query(*SPLICE_COLUMNS).order_by(FiberSplice.fiber_splices_id).all()
+
+    conflicts: List[Dict[str, Any]] = []
+    users: Dict[Any, List[int]] = defaultdict(list)
+    for row in rows:
+        splice = splice_from_row(row)
+        splice_id = splice["fiber_splices_id"]
+        sides = [(splice["cable_id"], splice["fiber_number"])]
+        if splice["splice_to_cable_id"] is not None:
+            sides.append((splice["splice_to_cable_id"], splice["splice_to_fiber"]))
+            if sides[0] == sides[1]:
+                conflicts.append(_conflict(
+                    "self_splice", f"Splice {splice_id} connects fiber {sides[0][1]} of cable {sides[0][0]} to itself",
+                    splice_id=splice_id,
+                ))
+        missing = False
+        for cable_id, fiber in sides:
+            if cable_id not in cables:
+                missing = True
+                conflicts.append(_conflict(
+                    "cable_not_found", f"Splice {splice_id} references missing cable {cable_id}",
+                    splice_id=splice_id, cable_id=cable_id,
+                ))
+            elif not fiber_in_range(fiber, cables[cable_id]):
+                conflicts.append(_conflict(
+                    "fiber_out_of_range",
+                    f"Splice {splice_id} uses fiber {fiber} of cable {cable_id} ({cables[cable_id][0] or 0} fibers)",
+                    splice_id=splice_id, cable_id=cable_id, fiber_number=fiber,
+                ))
+        ends = splice_fiber_ends(splice, cables)
+        if len(sides) == 2 and not missing and not ends:
+            conflicts.append(_conflict(
+                "cables_not_adjacent", f"Splice {splice_id} joins cables that do not meet at a common object",
+                splice_id=splice_id,
+            ))
+        for key in set(ends):
+            users[key].append(splice_id)
+
+    for (cable_id, fiber, end), splice_ids in users.items():
+        if len(splice_ids) > 1:
+            conflicts.append(_conflict(
+                "fiber_reused",
+                f"Fiber {fiber} of cable {cable_id} is used by splices {sorted(splice_ids)} at its {_end_name(end)} end",
+                cable_id=cable_id, fiber_number=fiber, splice_ids=sorted(splice_ids),
+            ))
+
+    # резерв держит волокно целиком: сварка на нем - двойное использование
+    spliced: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+    for (cable_id, fiber, _end), splice_ids in users.items():
+        spliced[(cable_id, fiber)].update(splice_ids)
+    reservations = db.query(
+        FiberReservation.cable_id, FiberReservation.fiber_number, FiberReservation.allocation_id
+    ).order_by(FiberReservation.cable_id, FiberReservation.fiber_number).all()
+    for cable_id, fiber, allocation_id in reservations:
+        splice_ids = spliced.get((cable_id, fiber))
+        if splice_ids:
+            conflicts.append(_conflict(
+                "fiber_reserved",
+                f"Fiber {fiber} of cable {cable_id} is reserved by allocation {allocation_id} and used by splices {sorted(splice_ids)}",
+                cable_id=cable_id, fiber_number=fiber, allocation_id=allocation_id, splice_ids=sorted(splice_ids),
+            ))
+
+    counts = Counter(conflict["kind"] for conflict in conflicts)
+    return {
+        "splices_checked": len(rows),
+        "fiber_ends_in_use": len(users),
+        "fibers_reserved": len(reservations),
+        "conflict_count": len(conflicts),
+        "counts": dict(counts),
+        "conflicts": conflicts[:MAX_REPORTED_CONFLICTS],
+        "truncated": len(conflicts) > MAX_REPORTED_CONFLICTS,
+    }
@@ -0,0 +1,93 @@
+"""
+Diff-based replacement of the full splice set of one cable: the desired set
+is compared with the stored rows in memory and only the difference is written
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.fiber_splice import FiberSplice
+from ..models.entity_hash import EntityHash
+
+ID_CHUNK = 500
+
+SPLICE_TARGET_FIELDS = ("splice_to_cable_id", "splice_to_fiber")
+
+
+def cable_splice_ids(db: Session, cable_id: int) -> List[int]:
+    """id сварок, исходящих из кабеля"""
+    return [row[0] for row in db.query(FiberSplice.fiber_splices_id).filter(FiberSplice.cable_id == cable_id).all()]
+
+
+def load_cable_splices(db: Session, cable_id: int) -> List[Dict[str, Any]]:
+    """Сварки кабеля как словари, без загрузки ORM-объектов"""
+    rows = db.query(
+        FiberSplice.fiber_splices_id, FiberSplice.fiber_number,
+        FiberSplice.splice_to_cable_id, FiberSplice.splice_to_fiber
+    ).filter(FiberSplice.cable_id == cable_id).order_by(FiberSplice.fiber_splices_id).all()
+    return [
+        {"fiber_splices_id": r[0], "fiber_number": r[1], "splice_to_cable_id": r[2], "splice_to_fiber": r[3]}
+        for r in rows
+    ]
+
+
+def replace_cable_splices(db: Session, cable_id: int, desired: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Привести сварки кабеля к заданному набору (ключ - номер волокна).
+
+    Новые волокна вставляются, измененные обновляются, отсутствующие в наборе
+    удаляются; каждая группа пишется одним executemany. Коммит остается за вызывающим.
+    """
+    existing: Dict[int, Dict[str, Any]] = {}
+    to_delete: List[int] = []
+    for row in load_cable_splices(db, cable_id):
+        # лишние дубликаты одного волокна удаляются, остается самая ранняя строка
+        if row["fiber_number"] in existing:
+            to_delete.append(row["fiber_splices_id"])
+        else:
+            existing[row["fiber_number"]] = row
+
+    now = datetime.utcnow()
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    touched_cables = {cable_id}
+    unchanged = 0
+    for item in desired:
+        current = existing.pop(item["fiber_number"], None)
+        if current is None:
+            inserts.append({"cable_id": cable_id, **item})
+            touched_cables.add(item["splice_to_cable_id"])
+        elif any(current[f] != item[f] for f in SPLICE_TARGET_FIELDS):
+            updates.append({
+                "fiber_splices_id": current["fiber_splices_id"],
+                "splice_to_cable_id": item["splice_to_cable_id"],
+                "splice_to_fiber": item["splice_to_fiber"],
+                "updated_at": now,
+            })
+            touched_cables.update((current["splice_to_cable_id"], item["splice_to_cable_id"]))
+        else:
+            unchanged += 1
+    for row in existing.values():
+        to_delete.append(row["fiber_splices_id"])
+        touched_cables.add(row["splice_to_cable_id"])
+
+    for i in range(0, len(to_delete), ID_CHUNK):
+        chunk = to_delete[i:i + ID_CHUNK]
+        db.execute(delete(EntityHash).where(EntityHash.entity_type == "splice", EntityHash.entity_id.in_(chunk)))
+        db.execute(delete(FiberSplice).where(FiberSplice.fiber_splices_id.in_(chunk)))
+    if updates:
+        db.execute(update(FiberSplice), updates)
+    if inserts:
+        db.execute(insert(FiberSplice), inserts)
+
+    if inserts or updates or to_delete:
+        events.mark_changed(db, events.SPLICES_CHANGED, touched_cables)
+    return {
+        "cable_id": cable_id,
+        "created": len(inserts),
+        "updated": len(updates),
+        "deleted": len(to_delete),
+        "unchanged": unchanged,
+    }
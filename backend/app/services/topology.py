@@ -0,0 +1,535 @@
+"""
+Compiled network topology: objects and cables as a CSR adjacency over dense
+node ids, kept current from change events, with shortest-path queries
+"""
+
+import heapq
+import math
+import threading
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core import events
+from ..models.network_object import NetworkObject
+from ..models.cable import Cable
+from ..models.fiber_reservation import FiberReservation
+from ..utils.geodesy import EARTH_MEAN_RADIUS_KM, haversine_km
+from .splice_integrity import SPLICE_COLUMNS, splice_from_row, load_touching_splices
+
+ID_CHUNK = 500
+
+# правки после компиляции копятся в дельте; сверх порога CSR пересобирается
+DELTA_MIN_EDGES = 1000
+DELTA_MAX_SHARE = 0.05
+
+CABLE_COLUMNS = (
+    Cable.cable_id, Cable.from_object_id, Cable.to_object_id, Cable.distance_km, Cable.cable_type_id, Cable.fiber_count,
+)
+
+
+def _straight_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_MEAN_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0.0), 1.0)))
+
+
+def occupancy_bitmaps(db: Session, cable_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """
+    Битовые карты занятых волокон по кабелям: бит i - волокно i занято
+    сваркой (с любой стороны) или резервом. Без cable_ids - обе таблицы за
+    один проход, иначе только строки, касающиеся этих кабелей.
+    """
+    if cable_ids is None:
+        splices = (splice_from_row(row) for row in db.query(*SPLICE_COLUMNS).all())
+        reservations = db.query(FiberReservation.cable_id, FiberReservation.fiber_number).all()
+        wanted = None
+    else:
+        wanted = set(cable_ids)
+        splices = load_touching_splices(db, wanted)
+        ids = list(wanted)
+        reservations = []
+        for i in range(0, len(ids), ID_CHUNK):
+            reservations.extend(db.query(FiberReservation.cable_id, FiberReservation.fiber_number).filter(
+                FiberReservation.cable_id.in_(ids[i:i + ID_CHUNK])
+            ).all())
+    fibers: List[Tuple[Optional[int], Optional[int]]] = list(reservations)
+    for splice in splices:
+        fibers.append((splice["cable_id"], splice["fiber_number"]))
+        fibers.append((splice["splice_to_cable_id"], splice["splice_to_fiber"]))
+    bitmaps: Dict[int, int] = {}
+    for cable_id, fiber in fibers:
+        if cable_id is None or fiber is None or fiber < 0 or (wanted is not None and cable_id not in wanted):
+            continue
+        bitmaps[cable_id] = bitmaps.get(cable_id, 0) | (1 << fiber)
+    return bitmaps
+
+
+def occupied_count(bitmap: int, fiber_count: int) -> int:
+    """Число занятых волокон в пределах fiber_count"""
+    return (bitmap & ((1 << fiber_count) - 1)).bit_count()
+
+
+def free_fiber_numbers(bitmap: int, fiber_count: int) -> List[int]:
+    """Номера свободных волокон по возрастанию"""
+    free = ~bitmap & ((1 << fiber_count) - 1)
+    numbers = []
+    while free:
+        low = free & -free
+        numbers.append(low.bit_length() - 1)
+        free ^= low
+    return numbers
+
+
+class TopologyGraph:
+    """
+    Граф сети: узлы - объекты, ребра - кабели (неориентированные).
+
+    Смежность хранится в CSR: indptr/arc_node/arc_edge, где дуги узла i лежат
+    в диапазоне indptr[i]:indptr[i+1]. Компиляция выполняется NumPy, а для
+    обхода массивы копируются в списки - поэлементный доступ к ним быстрее.
+    Изменения кабелей применяются на месте: атрибуты ребра переписываются,
+    удаленное ребро гасится флагом, новое попадает в дельту смежности.
+    Занятость волокон хранится битовой картой на ребро (edge_occupied) и
+    пересчитывается только для кабелей, у которых менялись сварки.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._stale = True
+        self._dirty_cables: Set[int] = set()
+        self._dirty_objects: Set[int] = set()
+        self._dirty_splices: Set[int] = set()
+        self.stats: Dict[str, int] = {"rebuilds": 0, "compiles": 0, "refreshes": 0}
+
+    def _reset(self) -> None:
+        self.node_ids: List[int] = []
+        self.node_index: Dict[int, int] = {}
+        self.lat: List[float] = []
+        self.lon: List[float] = []
+
+        self.edge_cable: List[int] = []
+        self.edge_u: List[int] = []
+        self.edge_v: List[int] = []
+        self.edge_w: List[float] = []
+        self.edge_type: List[int] = []
+        self.edge_fibers: List[int] = []
+        self.edge_used: List[int] = []
+        self.edge_occupied: List[int] = []
+        self.edge_active: List[bool] = []
+        self.cable_edge: Dict[int, int] = {}
+
+        self.indptr: List[int] = [0]
+        self.arc_node: List[int] = []
+        self.arc_edge: List[int] = []
+        self.compiled_nodes = 0
+        self.extra: Dict[int, List[Tuple[int, int]]] = {}
+        self.delta_edges = 0
+        # множитель эвристики A*: не больше минимального отношения длины кабеля к прямой
+        self.h_scale = 1.0
+        # узлы без координат; если к ним подходят кабели, прямая не оценивает путь снизу
+        self.coordless: Set[int] = set()
+        self.geo_heuristic = True
+
+    # ---------- события ----------
+
+    def on_cables_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty_cables |= ids
+
+    def on_objects_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty_objects |= ids
+
+    def on_splices_changed(self, ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty_splices |= ids
+
+    def sync(self, db: Session) -> None:
+        """Применить накопленные изменения перед запросом"""
+        with self._lock:
+            if self._stale:
+                self._rebuild(db)
+            elif self._dirty_cables or self._dirty_objects or self._dirty_splices:
+                self._refresh(db)
+            if self.delta_edges > max(DELTA_MIN_EDGES, DELTA_MAX_SHARE * len(self.edge_cable)):
+                self.compile()
+
+    # ---------- построение ----------
+
+    def load(self, objects: Iterable[Tuple[int, float, float]], cables: Iterable[Tuple], occupied: Dict[int, int]) -> None:
+        """
+        Полная загрузка: объекты (id, lat, lon), кабели (id, from, to, distance_km,
+        type, fiber_count) и битовые карты занятых волокон по кабелям
+        """
+        with self._lock:
+            self._reset()
+            for object_id, latitude, longitude in objects:
+                self._add_node(object_id, latitude, longitude)
+
+            rows = [row for row in cables if row[1] in self.node_index and row[2] in self.node_index]
+            count = len(rows)
+            self.edge_cable = [row[0] for row in rows]
+            u = np.fromiter((self.node_index[row[1]] for row in rows), dtype=np.int64, count=count)
+            v = np.fromiter((self.node_index[row[2]] for row in rows), dtype=np.int64, count=count)
+            lat = np.asarray(self.lat, dtype=np.float64)
+            lon = np.asarray(self.lon, dtype=np.float64)
+            # у объекта без координат прямая - NaN
+            straight = haversine_km(lat[u], lon[u], lat[v], lon[v]) if count else np.zeros(0)
+            w = np.fromiter((np.nan if row[3] is None else row[3] for row in rows), dtype=np.float64, count=count)
+            # кабель без длины весит как прямая между концами, а без координат - нулем
+            w = np.where(np.isnan(w), straight, w)
+            w = np.where(np.isnan(w), 0.0, w)
+
+            self.edge_u = u.tolist()
+            self.edge_v = v.tolist()
+            self.edge_w = w.tolist()
+            self.edge_type = [row[4] for row in rows]
+            self.edge_fibers = [row[5] or 0 for row in rows]
+            self.edge_occupied = [occupied.get(row[0], 0) for row in rows]
+            self.edge_used = [occupied_count(bits, fibers) for bits, fibers in zip(self.edge_occupied, self.edge_fibers)]
+            self.edge_active = [True] * count
+            self.cable_edge = {cable_id: e for e, cable_id in enumerate(self.edge_cable)}
+            positive = straight > 1e-9
+            ratio = float(np.min(w[positive] / straight[positive])) if positive.any() else 1.0
+            self.h_scale = min(1.0, ratio) * 0.995
+            self.compile()
+            self._update_heuristic()
+            self._stale = False
+            self._dirty_cables, self._dirty_objects, self._dirty_splices = set(), set(), set()
+
+    def compile(self) -> None:
+        """Собрать CSR из активных ребер; погашенные ребра и дельта исчезают"""
+        with self._lock:
+            active = np.asarray(self.edge_active, dtype=bool)
+            edges = np.flatnonzero(active)
+            u = np.asarray(self.edge_u, dtype=np.int64)[edges]
+            v = np.asarray(self.edge_v, dtype=np.int64)[edges]
+            tails = np.concatenate([u, v])
+            heads = np.concatenate([v, u])
+            arc_edges = np.concatenate([edges, edges])
+            order = np.argsort(tails, kind="stable")
+            n = len(self.node_ids)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(tails, minlength=n), out=indptr[1:])
+            self.indptr = indptr.tolist()
+            self.arc_node = heads[order].tolist()
+            self.arc_edge = arc_edges[order].tolist()
+            self.compiled_nodes = n
+            self.extra = {}
+            self.delta_edges = 0
+            self.stats["compiles"] += 1
+
+    def subgraph(
+        self, cable_ids: Optional[Iterable[int]] = None, object_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        CSR активных ребер с локальной нумерацией узлов.
+
+        Без фильтров - вся сеть; иначе кабели из cable_ids, их концы и объекты
+        из object_ids. nodes - глобальные индексы узлов, arc_edge - глобальные ребра.
+        """
+        with self._lock:
+            n = len(self.node_ids)
+            edges = np.flatnonzero(np.asarray(self.edge_active, dtype=bool))
+            u = np.asarray(self.edge_u, dtype=np.int64)
+            v = np.asarray(self.edge_v, dtype=np.int64)
+            if cable_ids is None and object_ids is None:
+                nodes = np.arange(n, dtype=np.int64)
+            else:
+                if cable_ids is not None:
+                    wanted = np.fromiter(cable_ids, dtype=np.int64)
+                    edges = edges[np.isin(np.asarray(self.edge_cable, dtype=np.int64)[edges], wanted)]
+                extra_nodes = [self.node_index[o] for o in (object_ids or ()) if o in self.node_index]
+                nodes = np.unique(np.concatenate([u[edges], v[edges], np.asarray(extra_nodes, dtype=np.int64)]))
+            local = np.full(n, -1, dtype=np.int64)
+            local[nodes] = np.arange(len(nodes))
+            tails = np.concatenate([local[u[edges]], local[v[edges]]])
+            heads = np.concatenate([local[v[edges]], local[u[edges]]])
+            arc_edges = np.concatenate([edges, edges])
+            order = np.argsort(tails, kind="stable")
+            indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(tails, minlength=len(nodes)), out=indptr[1:])
+            return {
+                "nodes": nodes,
+                "edges": edges,
+                "indptr": indptr.tolist(),
+                "arc_node": heads[order].tolist(),
+                "arc_edge": arc_edges[order].tolist(),
+            }
+
+    def _rebuild(self, db: Session) -> None:
+        objects = db.query(NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude).all()
+        cables = db.query(*CABLE_COLUMNS).all()
+        self.load(objects, cables, occupancy_bitmaps(db))
+        self.stats["rebuilds"] += 1
+
+    def _add_node(self, object_id: int, latitude: float, longitude: float) -> int:
+        index = len(self.node_ids)
+        self.node_ids.append(object_id)
+        self.node_index[object_id] = index
+        self.lat.append(latitude)
+        self.lon.append(longitude)
+        if latitude is None or longitude is None:
+            self.coordless.add(index)
+        return index
+
+    def _update_heuristic(self) -> None:
+        active = self.edge_active
+        self.geo_heuristic = not any(active[e] for node in self.coordless for _, e in self.arcs(node))
+
+    def _refresh(self, db: Session) -> None:
+        object_ids = set(self._dirty_objects)
+        cable_ids = set(self._dirty_cables)
+        splice_cable_ids = set(self._dirty_splices)
+        self._dirty_objects, self._dirty_cables, self._dirty_splices = set(), set(), set()
+
+        if object_ids:
+            ids = list(object_ids)
+            for i in range(0, len(ids), ID_CHUNK):
+                for object_id, latitude, longitude in db.query(
+                    NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+                ).filter(NetworkObject.network_object_id.in_(ids[i:i + ID_CHUNK])).all():
+                    index = self.node_index.get(object_id)
+                    if index is None:
+                        self._add_node(object_id, latitude, longitude)
+                    else:
+                        self.lat[index], self.lon[index] = latitude, longitude
+                        if latitude is None or longitude is None:
+                            self.coordless.add(index)
+                        else:
+                            self.coordless.discard(index)
+            # удаленные объекты остаются изолированными узлами до следующей пересборки
+
+        if cable_ids:
+            ids = list(cable_ids)
+            rows: Dict[int, Tuple] = {}
+            for i in range(0, len(ids), ID_CHUNK):
+                for row in db.query(*CABLE_COLUMNS).filter(Cable.cable_id.in_(ids[i:i + ID_CHUNK])).all():
+                    rows[row[0]] = row
+            missing = {row[1] for row in rows.values()} | {row[2] for row in rows.values()}
+            missing = [object_id for object_id in missing if object_id not in self.node_index]
+            for i in range(0, len(missing), ID_CHUNK):
+                for object_id, latitude, longitude in db.query(
+                    NetworkObject.network_object_id, NetworkObject.latitude, NetworkObject.longitude
+                ).filter(NetworkObject.network_object_id.in_(missing[i:i + ID_CHUNK])).all():
+                    self._add_node(object_id, latitude, longitude)
+            occupied = occupancy_bitmaps(db, ids)
+            for cable_id in ids:
+                self._apply_cable(cable_id, rows.get(cable_id), occupied.get(cable_id, 0))
+
+        splice_only = splice_cable_ids - cable_ids
+        if splice_only:
+            occupied = occupancy_bitmaps(db, splice_only)
+            for cable_id in splice_only:
+                e = self.cable_edge.get(cable_id)
+                if e is not None:
+                    self.edge_occupied[e] = occupied.get(cable_id, 0)
+                    self.edge_used[e] = occupied_count(self.edge_occupied[e], self.edge_fibers[e])
+        self._update_heuristic()
+        self.stats["refreshes"] += 1
+
+    def _apply_cable(self, cable_id: int, row: Optional[Tuple], occupied: int) -> None:
+        e = self.cable_edge.get(cable_id)
+        if row is None or row[1] not in self.node_index or row[2] not in self.node_index:
+            if e is not None:
+                self.edge_active[e] = False
+                del self.cable_edge[cable_id]
+            return
+        u, v = self.node_index[row[1]], self.node_index[row[2]]
+        if u in self.coordless or v in self.coordless:
+            # без координат длину берем только из distance_km
+            weight = row[3] or 0.0
+        else:
+            straight = _straight_km(self.lat[u], self.lon[u], self.lat[v], self.lon[v])
+            weight = straight if row[3] is None else row[3]
+            if straight > 1e-9:
+                self.h_scale = min(self.h_scale, weight / straight * 0.995)
+
+        if e is not None and self.edge_u[e] == u and self.edge_v[e] == v:
+            self.edge_w[e] = weight
+            self.edge_type[e] = row[4]
+            self.edge_fibers[e] = row[5] or 0
+            self.edge_occupied[e] = occupied
+            self.edge_used[e] = occupied_count(occupied, self.edge_fibers[e])
+            return
+        if e is not None:
+            self.edge_active[e] = False
+        e = len(self.edge_cable)
+        self.edge_cable.append(cable_id)
+        self.edge_u.append(u)
+        self.edge_v.append(v)
+        self.edge_w.append(weight)
+        self.edge_type.append(row[4])
+        self.edge_fibers.append(row[5] or 0)
+        self.edge_occupied.append(occupied)
+        self.edge_used.append(occupied_count(occupied, row[5] or 0))
+        self.edge_active.append(True)
+        self.cable_edge[cable_id] = e
+        self.extra.setdefault(u, []).append((v, e))
+        self.extra.setdefault(v, []).append((u, e))
+        self.delta_edges += 1
+
+    # ---------- обход ----------
+
+    def arcs(self, node: int):
+        """Дуги узла (сосед, ребро), включая дельту; погашенные ребра не отфильтрованы"""
+        extra = self.extra.get(node)
+        if node >= self.compiled_nodes:
+            return extra or ()
+        start, end = self.indptr[node], self.indptr[node + 1]
+        compiled = zip(self.arc_node[start:end], self.arc_edge[start:end])
+        return chain(compiled, extra) if extra else compiled
+
+    def edge_filter(
+        self, cable_type_ids: Optional[Iterable[int]] = None, min_free_fibers: Optional[int] = None
+    ) -> Optional[Callable[[int], bool]]:
+        """Предикат допустимости ребра по типу кабеля и числу свободных волокон"""
+        types = set(cable_type_ids) if cable_type_ids else None
+        if types is None and not min_free_fibers:
+            return None
+        edge_type, fibers, used = self.edge_type, self.edge_fibers, self.edge_used
+
+        def allowed(e: int) -> bool:
+            if types is not None and edge_type[e] not in types:
+                return False
+            return not min_free_fibers or fibers[e] - used[e] >= min_free_fibers
+        return allowed
+
+    def _astar(self, source: int, target: int, allowed) -> Tuple[Optional[Dict[int, Tuple[int, int]]], int]:
+        lat, lon = self.lat, self.lon
+        if not self.geo_heuristic or source in self.coordless or target in self.coordless:
+            # без оценки по прямой A* вырождается в Дейкстру
+            return self._search(source, target, allowed, lambda node: 0.0)
+        t_phi = math.radians(lat[target])
+        t_cos = math.cos(t_phi)
+        t_lam = math.radians(lon[target])
+        k = 2 * EARTH_MEAN_RADIUS_KM * self.h_scale
+
+        def h(node: int) -> float:
+            phi = math.radians(lat[node])
+            a = math.sin((t_phi - phi) / 2) ** 2 + math.cos(phi) * t_cos * math.sin((t_lam - math.radians(lon[node])) / 2) ** 2
+            return k * math.asin(math.sqrt(min(a, 1.0)))
+
+        return self._search(source, target, allowed, h)
+
+    def _search(
+        self, source: int, target: int, allowed, h: Callable[[int], float]
+    ) -> Tuple[Optional[Dict[int, Tuple[int, int]]], int]:
+        active, weights = self.edge_active, self.edge_w
+        dist = {source: 0.0}
+        prev: Dict[int, Tuple[int, int]] = {}
+        heap = [(h(source), 0.0, source)]
+        closed = set()
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node in closed:
+                continue
+            if node == target:
+                return prev, len(closed)
+            closed.add(node)
+            for nbr, e in self.arcs(node):
+                if not active[e] or nbr in closed or (allowed is not None and not allowed(e)):
+                    continue
+                ng = g + weights[e]
+                if ng < dist.get(nbr, math.inf):
+                    dist[nbr] = ng
+                    prev[nbr] = (node, e)
+                    heapq.heappush(heap, (ng + h(nbr), ng, nbr))
+        return None, len(closed)
+
+    def _bfs(self, source: int, target: int, allowed) -> Tuple[Optional[Dict[int, Tuple[int, int]]], int]:
+        """Двунаправленный BFS: на каждом шаге расширяется меньший фронт"""
+        active = self.edge_active
+        parents = ({source: None}, {target: None})
+        frontiers = ([source], [target])
+        expanded = 0
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            mine, other = parents[side], parents[1 - side]
+            next_frontier = []
+            meet = None
+            for node in frontiers[side]:
+                expanded += 1
+                for nbr, e in self.arcs(node):
+                    if not active[e] or nbr in mine or (allowed is not None and not allowed(e)):
+                        continue
+                    mine[nbr] = (node, e)
+                    if nbr in other:
+                        meet = nbr
+                        break
+                    next_frontier.append(nbr)
+                if meet is not None:
+                    break
+            if meet is not None:
+                # склеиваем: от source до meet по parents[0], затем от meet до target по parents[1]
+                prev: Dict[int, Tuple[int, int]] = {}
+                node = meet
+                while parents[0][node] is not None:
+                    prev[node] = parents[0][node]
+                    node = parents[0][node][0]
+                node = meet
+                while parents[1][node] is not None:
+                    nxt, e = parents[1][node]
+                    prev[nxt] = (node, e)
+                    node = nxt
+                return prev, expanded
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+        return None, expanded
+
+    def shortest_path(
+        self,
+        from_object_id: int,
+        to_object_id: int,
+        weight: str = "distance",
+        cable_type_ids: Optional[Iterable[int]] = None,
+        min_free_fibers: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Кратчайший путь между объектами по длине (A*) или числу кабелей (BFS); None - пути нет"""
+        with self._lock:
+            source = self.node_index[from_object_id]
+            target = self.node_index[to_object_id]
+            allowed = self.edge_filter(cable_type_ids, min_free_fibers)
+            if source == target:
+                prev, expanded = {}, 0
+            elif weight == "hops":
+                prev, expanded = self._bfs(source, target, allowed)
+            else:
+                prev, expanded = self._astar(source, target, allowed)
+            if prev is None:
+                return None
+
+            nodes = [target]
+            edges = []
+            while nodes[-1] != source:
+                node, e = prev[nodes[-1]]
+                nodes.append(node)
+                edges.append(e)
+            nodes.reverse()
+            edges.reverse()
+            return {
+                "from_object_id": from_object_id,
+                "to_object_id": to_object_id,
+                "weight": weight,
+                "hop_count": len(edges),
+                "distance_km": round(sum(self.edge_w[e] for e in edges), 6),
+                "object_ids": [self.node_ids[n] for n in nodes],
+                "cable_ids": [self.edge_cable[e] for e in edges],
+                "nodes_expanded": expanded,
+            }
+
+
+topology_graph = TopologyGraph()
+events.subscribe(events.CABLES_CHANGED, topology_graph.on_cables_changed)
+events.subscribe(events.OBJECTS_CHANGED, topology_graph.on_objects_changed)
+events.subscribe(events.SPLICES_CHANGED, topology_graph.on_splices_changed)
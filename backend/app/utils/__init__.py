@@ -4,6 +4,7 @@ from .validators import (
     validate_name,
     validate_coordinates,
     validate_fiber_count,
+    validate_fiber_number,
     validate_distance,
     calculate_distance,
     format_distance,
@@ -15,6 +16,7 @@ __all__ = [
     "validate_name",
     "validate_coordinates",
     "validate_fiber_count",
+    "validate_fiber_number",
     "validate_distance",
     "calculate_distance",
     "format_distance",
@@ -0,0 +1,38 @@
+"""
+Content hashing of normalized entity fields for import diffs
+"""
+
+import hashlib
+import json
+from typing import Any, Dict
+
+# поля, входящие в хеш; GeoJSON несет меньше полей, чем JSON-схема,
+# поэтому для него свои профили, иначе любая строка с адресом считалась бы измененной
+HASH_PROFILES = {
+    "object": ("name", "object_type_id", "latitude", "longitude", "address", "description"),
+    "object_geo": ("name", "object_type_id", "latitude", "longitude"),
+    "cable": ("name", "cable_type_id", "fiber_count", "from_object_id", "to_object_id", "distance_km", "description"),
+    "cable_geo": ("name", "cable_type_id", "fiber_count", "from_object_id", "to_object_id", "distance_km"),
+    "splice": ("cable_id", "fiber_number", "splice_to_cable_id", "splice_to_fiber", "loss_db"),
+}
+
+
+def _normalize(value: Any) -> Any:
+    """Приведение значения к каноничному виду"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        # ~1 см для координат, убирает шум сериализации
+        rounded = round(value, 7)
+        return int(rounded) if rounded.is_integer() else rounded
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def content_hash(profile: str, values: Dict[str, Any]) -> str:
+    """SHA-256 от нормализованных полей профиля"""
+    normalized = [_normalize(values.get(field)) for field in HASH_PROFILES[profile]]
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
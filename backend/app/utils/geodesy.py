@@ -0,0 +1,139 @@
+"""
+Vectorized geodesy: batch distances between arrays of coordinate pairs
+"""
+
+from typing import Tuple
+import numpy as np
+from geographiclib.geodesic import Geodesic
+
+# WGS-84
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+EARTH_MEAN_RADIUS_KM = 6371.0088
+
+DISTANCE_METHODS = ("haversine", "vincenty", "karney")
+
+
+def _as_arrays(*values) -> Tuple[np.ndarray, ...]:
+    return tuple(np.asarray(v, dtype=np.float64) for v in values)
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Расстояние по сфере, км; погрешность до ~0.5% относительно эллипсоида"""
+    lat1, lon1, lat2, lon2 = _as_arrays(lat1, lon1, lat2, lon2)
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2 - lon1)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_MEAN_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def karney_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Точное решение обратной задачи (Karney, geographiclib), поэлементно"""
+    lat1, lon1, lat2, lon2 = _as_arrays(lat1, lon1, lat2, lon2)
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+    inverse = Geodesic.WGS84.Inverse
+    out = np.empty(lat1.shape, dtype=np.float64)
+    flat = out.reshape(-1)
+    for i, (a, b, c, d) in enumerate(zip(lat1.flat, lon1.flat, lat2.flat, lon2.flat)):
+        flat[i] = inverse(a, b, c, d, Geodesic.DISTANCE)["s12"] / 1000.0
+    return out
+
+
+def vincenty_km(lat1, lon1, lat2, lon2, tolerance: float = 1e-12, max_iterations: int = 200) -> np.ndarray:
+    """
+    Обратная задача Винсенти на эллипсоиде WGS-84, векторизованно, км.
+
+    Итерации идут по маске еще не сошедшихся пар. Почти антиподальные пары,
+    где метод не сходится, досчитываются по Karney.
+    """
+    lat1, lon1, lat2, lon2 = _as_arrays(lat1, lon1, lat2, lon2)
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = (v.reshape(-1) for v in (lat1, lon1, lat2, lon2))
+
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    sin_sigma = np.zeros_like(L)
+    cos_sigma = np.ones_like(L)
+    sigma = np.zeros_like(L)
+    cos_sq_alpha = np.ones_like(L)
+    cos_2sigma_m = np.zeros_like(L)
+    active = np.ones(L.shape, dtype=bool)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        idx = np.nonzero(active)[0]
+        lam_i = lam[idx]
+        sin_lam, cos_lam = np.sin(lam_i), np.cos(lam_i)
+        s1, c1, s2, c2 = sinU1[idx], cosU1[idx], sinU2[idx], cosU2[idx]
+
+        sin_s = np.sqrt((c2 * sin_lam) ** 2 + (c1 * s2 - s1 * c2 * cos_lam) ** 2)
+        cos_s = s1 * s2 + c1 * c2 * cos_lam
+        sig = np.arctan2(sin_s, cos_s)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sin_alpha = np.where(sin_s == 0, 0.0, c1 * c2 * sin_lam / sin_s)
+            csa = 1 - sin_alpha ** 2
+            # на экваторе cos²α = 0 и cos2σm не определен
+            c2sm = np.where(csa == 0, 0.0, cos_s - 2 * s1 * s2 / csa)
+        C = f / 16 * csa * (4 + f * (4 - 3 * csa))
+        lam_new = L[idx] + (1 - C) * f * sin_alpha * (
+            sig + C * sin_s * (c2sm + C * cos_s * (-1 + 2 * c2sm ** 2))
+        )
+
+        sin_sigma[idx] = sin_s
+        cos_sigma[idx] = cos_s
+        sigma[idx] = sig
+        cos_sq_alpha[idx] = csa
+        cos_2sigma_m[idx] = c2sm
+        converged = np.abs(lam_new - lam_i) <= tolerance
+        lam[idx] = lam_new
+        active[idx[converged]] = False
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = B * sin_sigma * (
+        cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        )
+    )
+    result = WGS84_B * A * (sigma - delta_sigma) / 1000.0
+
+    if active.any():
+        idx = np.nonzero(active)[0]
+        result[idx] = karney_km(lat1[idx], lon1[idx], lat2[idx], lon2[idx])
+    return result.reshape(shape)
+
+
+def distance_km(lat1, lon1, lat2, lon2, method: str = "vincenty") -> np.ndarray:
+    """
+    Расстояния между массивами точек, км.
+
+    method: haversine (быстро, ~0.5%), vincenty (мм, по умолчанию),
+    karney (точно, поэлементно и медленно)
+    """
+    if method == "haversine":
+        return haversine_km(lat1, lon1, lat2, lon2)
+    if method == "vincenty":
+        return vincenty_km(lat1, lon1, lat2, lon2)
+    if method == "karney":
+        return karney_km(lat1, lon1, lat2, lon2)
+    raise ValueError(f"Unknown distance method: {method}")
+
+
+def batch_distance_km(points_from, points_to, method: str = "vincenty") -> np.ndarray:
+    """Расстояния между массивами формы (N, 2) с парами (широта, долгота), км"""
+    points_from = np.asarray(points_from, dtype=np.float64).reshape(-1, 2)
+    points_to = np.asarray(points_to, dtype=np.float64).reshape(-1, 2)
+    return distance_km(points_from[:, 0], points_from[:, 1], points_to[:, 0], points_to[:, 1], method=method)
@@ -0,0 +1,205 @@
+"""
+Spatial indexes over network object coordinates: a hash grid for snapping
+within a fixed tolerance and a KD-tree for k-nearest queries
+"""
+
+import heapq
+import math
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по дуге большого круга в метрах"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialHash:
+    """
+    Сетка из ячеек размером не меньше допуска привязки.
+
+    Точка ищется только в своей ячейке и соседних, поэтому поиск
+    ближайшего объекта в пределах допуска стоит O(1) в среднем.
+    """
+
+    def __init__(self, tolerance_m: float):
+        self.tolerance_m = max(float(tolerance_m), 0.0)
+        # при нулевом допуске сетка все равно нужна для точных совпадений
+        self.cell_deg = max(self.tolerance_m, 1.0) / METERS_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, int]]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return int(math.floor(lon / self.cell_deg)), int(math.floor(lat / self.cell_deg))
+
+    def insert(self, lon: float, lat: float, item_id: int) -> None:
+        """Добавить точку с идентификатором объекта"""
+        if lon is None or lat is None:
+            return
+        self._cells.setdefault(self._cell(lon, lat), []).append((lon, lat, item_id))
+        self._size += 1
+
+    def nearest(self, lon: float, lat: float) -> Optional[Tuple[int, float]]:
+        """Ближайший объект в пределах допуска: (id, расстояние в метрах) или None"""
+        if lon is None or lat is None:
+            return None
+
+        cx, cy = self._cell(lon, lat)
+        # градус долготы сужается к полюсам, поэтому по долготе смотрим шире
+        lon_scale = max(math.cos(math.radians(lat)), 1e-3)
+        span = int(math.ceil(self.tolerance_m / (METERS_PER_DEGREE * lon_scale) / self.cell_deg))
+        best_id = None
+        best_dist = None
+        for dx in range(-span, span + 1):
+            for dy in (-1, 0, 1):
+                for p_lon, p_lat, item_id in self._cells.get((cx + dx, cy + dy), ()):
+                    if p_lon == lon and p_lat == lat:
+                        return item_id, 0.0
+                    dist = haversine_m(lat, lon, p_lat, p_lon)
+                    if dist <= self.tolerance_m and (best_dist is None or dist < best_dist):
+                        best_id = item_id
+                        best_dist = dist
+
+        if best_id is None:
+            return None
+        return best_id, best_dist
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """Точки на единичной сфере, массив (n, 3), по широте и долготе в градусах"""
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    lam = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def chord2_to_m(chord2: float) -> float:
+    """Квадрат хорды единичной сферы в метры по дуге большого круга"""
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(max(chord2, 0.0)) / 2))
+
+
+def m_to_chord2(meters: float) -> float:
+    """Метры по дуге в квадрат хорды (с запасом на округление)"""
+    angle = min(max(meters, 0.0) / EARTH_RADIUS_M, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2 * (1 + 1e-12) + 1e-300
+
+
+class HaversineKDTree:
+    """
+    KD-дерево по точкам на единичной сфере.
+
+    Хорда монотонна по дуге большого круга, поэтому k ближайших по евклидову
+    расстоянию в R^3 - это ровно k ближайших по haversine. Дерево статично:
+    точки переставлены так, что лист - непрерывный срез массива, а у каждого
+    узла хранится охватывающий параллелепипед для отсечения.
+    """
+
+    LEAF_SIZE = 32
+
+    def __init__(self, ids: Sequence[int], lat: Sequence[float], lon: Sequence[float], leaf_size: int = LEAF_SIZE):
+        ids = np.asarray(ids, dtype=np.int64)
+        xyz = unit_vectors(lat, lon)
+        n = len(ids)
+        perm = np.arange(n)
+        self.lo: List[int] = []
+        self.hi: List[int] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.box_min: List[Tuple[float, float, float]] = []
+        self.box_max: List[Tuple[float, float, float]] = []
+
+        def new_node(lo: int, hi: int) -> int:
+            self.lo.append(lo)
+            self.hi.append(hi)
+            self.left.append(-1)
+            self.right.append(-1)
+            self.box_min.append((0.0, 0.0, 0.0))
+            self.box_max.append((0.0, 0.0, 0.0))
+            return len(self.lo) - 1
+
+        stack = [new_node(0, n)] if n else []
+        while stack:
+            node = stack.pop()
+            lo, hi = self.lo[node], self.hi[node]
+            points = xyz[perm[lo:hi]]
+            low, high = points.min(axis=0), points.max(axis=0)
+            self.box_min[node] = tuple(low.tolist())
+            self.box_max[node] = tuple(high.tolist())
+            if hi - lo <= leaf_size:
+                continue
+            # делим по медиане вдоль самой широкой оси
+            dim = int(np.argmax(high - low))
+            mid = (lo + hi) // 2
+            order = np.argpartition(points[:, dim], mid - lo)
+            perm[lo:hi] = perm[lo:hi][order]
+            self.left[node] = new_node(lo, mid)
+            self.right[node] = new_node(mid, hi)
+            stack.extend((self.left[node], self.right[node]))
+
+        self.ids = ids[perm]
+        self.xyz = np.ascontiguousarray(xyz[perm])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _box_chord2(self, node: int, q: Tuple[float, float, float]) -> float:
+        total = 0.0
+        for value, low, high in zip(q, self.box_min[node], self.box_max[node]):
+            if value < low:
+                total += (low - value) ** 2
+            elif value > high:
+                total += (value - high) ** 2
+        return total
+
+    def query(
+        self, q: Tuple[float, float, float], k: int, bound2: float = math.inf, skip: FrozenSet[int] = frozenset()
+    ) -> List[Tuple[float, int]]:
+        """
+        До k ближайших к точке q (единичный вектор) не дальше bound2 (квадрат
+        хорды), кроме id из skip: список (квадрат хорды, id) по возрастанию
+        """
+        if not len(self.ids) or k <= 0:
+            return []
+        best: List[Tuple[float, int]] = []  # max-куча (-d2, id)
+        limit = bound2
+        queue = [(self._box_chord2(0, q), 0)]
+        qv = np.asarray(q)
+        while queue:
+            d2, node = heapq.heappop(queue)
+            if d2 > limit:
+                break
+            left = self.left[node]
+            if left == -1:
+                lo = self.lo[node]
+                diff = self.xyz[lo:self.hi[node]] - qv
+                dist2 = np.einsum("ij,ij->i", diff, diff)
+                for i in np.flatnonzero(dist2 <= limit).tolist():
+                    item_id = int(self.ids[lo + i])
+                    if item_id in skip:
+                        continue
+                    value = float(dist2[i])
+                    if len(best) < k:
+                        heapq.heappush(best, (-value, item_id))
+                    elif value < -best[0][0]:
+                        heapq.heapreplace(best, (-value, item_id))
+                    else:
+                        continue
+                    if len(best) == k:
+                        limit = min(bound2, -best[0][0])
+                continue
+            for child in (left, self.right[node]):
+                child_d2 = self._box_chord2(child, q)
+                if child_d2 <= limit:
+                    heapq.heappush(queue, (child_d2, child))
+        return sorted((-neg, item_id) for neg, item_id in best)
@@ -40,6 +40,11 @@ def validate_fiber_count(count: int) -> bool:
         return False
 
 
+def validate_fiber_number(number: int) -> bool:
+    """Проверка номера волокна: целое, нумерация с 0"""
+    return isinstance(number, int) and not isinstance(number, bool) and number >= 0
+
+
 def validate_distance(distance: float) -> bool:
     """Проверка длины кабеля"""
     if distance is None:
@@ -0,0 +1,209 @@
+"""
+Stress test: concurrent fiber allocators must never reserve the same fiber
+twice, and a reserved fiber cannot be spliced outside its allocation
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models import NetworkObject, Cable, CableType, ObjectType, FiberReservation, FiberSplice
+from app.services.fiber_allocation import AllocationConflict, allocate_fibers, consume_reservations, lock_occupancy
+from app.services.splice_integrity import scan_integrity, validate_splice_batch
+
+WORKERS = int(os.getenv("STRESS_WORKERS", "16"))
+FIBER_COUNT = int(os.getenv("STRESS_FIBER_COUNT", "288"))
+RESERVED_FIBER_COUNT = 12
+
+
+def main():
+    # отдельная временная база, рабочая test.db не трогается
+    db_file = os.path.join(tempfile.mkdtemp(), "stress.db")
+    engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    db = Session()
+    db.add(ObjectType(object_type_id=1, name="coupling", display_name="Муфта"))
+    db.add(CableType(cable_type_id=1, name="ОКГ-stress", fiber_count=FIBER_COUNT, color="#000000"))
+    objects = [NetworkObject(name=f"S{i}", object_type_id=1, latitude=55.0, longitude=37.0 + i * 0.01) for i in range(4)]
+    db.add_all(objects)
+    db.flush()
+    cables = [
+        Cable(name=f"C{i}", cable_type_id=1, fiber_count=FIBER_COUNT,
+              from_object_id=objects[i].network_object_id, to_object_id=objects[i + 1].network_object_id)
+        for i in range(3)
+    ]
+    # отдельная пара кабелей для проверки сварок на зарезервированных волокнах
+    splice_cables = [
+        Cable(name=f"R{i}", cable_type_id=1, fiber_count=RESERVED_FIBER_COUNT,
+              from_object_id=objects[i].network_object_id, to_object_id=objects[i + 1].network_object_id)
+        for i in range(2)
+    ]
+    db.add_all(cables + splice_cables)
+    db.commit()
+    cable_ids = [cable.cable_id for cable in cables]
+    splice_cable_ids = [cable.cable_id for cable in splice_cables]
+    db.close()
+
+    results = []
+    errors = []
+    gave_up = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(WORKERS)
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        session = Session()
+        start_gate.wait()
+        try:
+            while True:
+                # вперемешку: один кабель, весь путь, непрерывный и произвольный набор
+                target = [rng.choice(cable_ids)] if rng.random() < 0.5 else cable_ids
+                try:
+                    result = allocate_fibers(
+                        session, target, count=rng.randint(1, 4), contiguous=rng.random() < 0.5,
+                        label=f"worker-{seed}",
+                    )
+                except AllocationConflict as e:
+                    if e.conflicts:
+                        # кабели заполнены - больше выделять нечего
+                        if all(c["free_fibers"] == 0 for c in e.conflicts):
+                            break
+                        continue
+                    # повторы исчерпаны - клиент получит 409; это не двойное выделение
+                    with lock:
+                        gave_up.append(e.message)
+                    continue
+                with lock:
+                    results.append(result)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    claimed = Counter(
+        (cable["cable_id"], fiber) for result in results for cable in result["cables"] for fiber in cable["fiber_numbers"]
+    )
+    doubles = [key for key, n in claimed.items() if n > 1]
+    db = Session()
+    stored = Counter((r.cable_id, r.fiber_number) for r in db.query(FiberReservation).all())
+    db.close()
+    attempts = Counter(result["attempts"] for result in results)
+
+    print(f"Workers: {WORKERS}, cables: {len(cable_ids)} x {FIBER_COUNT} fibers")
+    print(f"Allocations: {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+    print(f"Attempts per allocation: {dict(sorted(attempts.items()))}")
+    print(f"Fibers reserved: {len(claimed)} of {len(cable_ids) * FIBER_COUNT}")
+    print(f"Gave up after retries (409 to the client): {len(gave_up)}")
+    print(f"Errors: {len(errors)} {errors[:5]}")
+
+    ok = not doubles and stored == claimed and not errors
+    if doubles:
+        print(f"✗ Fibers allocated twice: {doubles[:20]}")
+    if stored != claimed:
+        print("✗ Stored reservations differ from the allocations reported to clients")
+    if ok:
+        print("✅ No fiber was allocated twice")
+    return check_reserved_splices(Session, splice_cable_ids) and ok
+
+
+def _splice(session, source: int, target: int, fiber: int, allocation_id=None) -> bool:
+    """Сварка как в POST /api/fiber-splices/: блокировка версий, проверка, запись"""
+    data = {"cable_id": source, "fiber_number": fiber, "splice_to_cable_id": target, "splice_to_fiber": fiber}
+    lock_occupancy(session, [source, target])
+    if validate_splice_batch(session, [data], allocation_id=allocation_id):
+        session.rollback()
+        return False
+    if allocation_id:
+        consume_reservations(session, allocation_id, [data])
+    session.add(FiberSplice(**data))
+    session.commit()
+    return True
+
+
+def check_reserved_splices(Session, cable_ids) -> bool:
+    """Зарезервированное волокно сваривается только с allocation_id, а в гонке достается одному"""
+    source, target = cable_ids
+    db = Session()
+    allocation = allocate_fibers(db, cable_ids, count=2)
+    reserved = allocation["cables"][0]["fiber_numbers"][0]
+    splice = {"cable_id": source, "fiber_number": reserved, "splice_to_cable_id": target, "splice_to_fiber": reserved}
+    foreign = [c["kind"] for c in validate_splice_batch(db, [splice])]
+    own = validate_splice_batch(db, [splice], allocation_id=allocation["allocation_id"])
+    spliced_own = _splice(db, source, target, reserved, allocation["allocation_id"])
+    db.close()
+
+    # аллокатор и сварщик одновременно берут одно и то же свободное волокно
+    races = []
+    for fiber in range(2, RESERVED_FIBER_COUNT):
+        outcome = {}
+        gate = threading.Barrier(2)
+
+        def allocator():
+            session = Session()
+            gate.wait()
+            try:
+                allocate_fibers(session, [source], fiber_numbers=[fiber])
+                outcome["allocated"] = True
+            except AllocationConflict:
+                outcome["allocated"] = False
+            finally:
+                session.close()
+
+        def splicer():
+            session = Session()
+            gate.wait()
+            try:
+                outcome["spliced"] = _splice(session, source, target, fiber)
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=allocator), threading.Thread(target=splicer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        races.append(outcome)
+
+    db = Session()
+    clean = scan_integrity(db)
+    # сварка в обход проверки на чужом резерве видна в отчете целостности
+    other = allocation["cables"][0]["fiber_numbers"][1]
+    db.add(FiberSplice(cable_id=source, fiber_number=other, splice_to_cable_id=target, splice_to_fiber=other))
+    db.commit()
+    dirty = scan_integrity(db)
+    db.close()
+
+    both = [fiber for fiber, outcome in enumerate(races, start=2) if outcome.get("allocated") and outcome.get("spliced")]
+    print(f"Reserved fiber {reserved}: foreign splice -> {foreign}, with allocation_id -> {own or 'ok'}")
+    print(f"Allocator vs splicer races: {len(races)}, fiber taken by both: {both}")
+    print(f"Integrity after races: {clean['conflict_count']} conflicts; after a splice on a reservation: {dirty['counts']}")
+
+    ok = (
+        foreign == ["fiber_reserved", "fiber_reserved"] and not own and spliced_own
+        and not both and clean["conflict_count"] == 0 and dirty["counts"] == {"fiber_reserved": 2}
+    )
+    print("✅ Reserved fibers are not spliced outside their allocation" if ok else "✗ Reserved fiber was spliced")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
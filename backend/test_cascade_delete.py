@@ -0,0 +1,135 @@
+"""Test cascading deletes of objects and cables: no row may keep pointing at deleted ids"""
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core import events
+from app.database.database import Base
+from app.models import (
+    NetworkObject, Cable, CableType, ObjectType, Connection, FiberSplice, FiberReservation, Region, EntityHash,
+)
+from app.models.region import region_objects, region_cables
+from app.services.cascade_delete import delete_cables_cascade, delete_objects_cascade
+
+# отдельная временная база, рабочая test.db не трогается
+db_file = os.path.join(tempfile.mkdtemp(), "cascade.db")
+engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+Base.metadata.create_all(engine)
+db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+
+db.add(ObjectType(object_type_id=1, name="coupling", display_name="Муфта"))
+db.add(CableType(cable_type_id=1, name="ОКГ-8", fiber_count=8, color="#000000"))
+# A - B - C - D - E по прямой
+a, b, c, d, e = objects = [
+    NetworkObject(name=name, object_type_id=1, latitude=55.0, longitude=37.0 + i * 0.01)
+    for i, name in enumerate("ABCDE")
+]
+db.add_all(objects)
+db.flush()
+ab, bc, cd, de = cables = [
+    Cable(name=f"{x.name}{y.name}", cable_type_id=1, fiber_count=8,
+          from_object_id=x.network_object_id, to_object_id=y.network_object_id)
+    for x, y in zip(objects, objects[1:])
+]
+db.add_all(cables)
+db.flush()
+
+
+def splice(source, target, fiber):
+    return FiberSplice(cable_id=source.cable_id, fiber_number=fiber, splice_to_cable_id=target.cable_id, splice_to_fiber=fiber)
+
+
+splices = [splice(ab, bc, 0), splice(bc, cd, 1), splice(cd, de, 3)]
+db.add_all(splices)
+db.add_all([
+    FiberReservation(allocation_id="bc", cable_id=bc.cable_id, fiber_number=5),
+    FiberReservation(allocation_id="cd", cable_id=cd.cable_id, fiber_number=6),
+    Connection(from_object_id=a.network_object_id, to_object_id=b.network_object_id, cable_id=ab.cable_id),
+    Connection(from_object_id=b.network_object_id, to_object_id=c.network_object_id, cable_id=None),
+    Connection(from_object_id=c.network_object_id, to_object_id=d.network_object_id, cable_id=cd.cable_id),
+    Connection(from_object_id=d.network_object_id, to_object_id=e.network_object_id, cable_id=de.cable_id),
+])
+region = Region(name="R", latitude=55.0, longitude=37.0)
+db.add(region)
+db.flush()
+db.execute(region_objects.insert(), [
+    {"region_id": region.region_id, "network_object_id": obj.network_object_id} for obj in (b, c)
+])
+db.execute(region_cables.insert(), [
+    {"region_id": region.region_id, "cable_id": cable.cable_id} for cable in (ab, cd, de)
+])
+db.add_all(
+    [EntityHash(entity_type="object", entity_id=obj.network_object_id, content_hash="x") for obj in objects]
+    + [EntityHash(entity_type="cable", entity_id=cable.cable_id, content_hash="x") for cable in cables]
+    + [EntityHash(entity_type="splice", entity_id=s.fiber_splices_id, content_hash="x") for s in splices]
+)
+db.commit()
+# удаленные строки не перечитать после коммита, дальше только id
+object_id = {obj.name: obj.network_object_id for obj in objects}
+cable_id = {cable.name: cable.cable_id for cable in cables}
+splice_ids = [s.fiber_splices_id for s in splices]
+
+
+def referencing(object_ids, cable_ids):
+    """Строки любой таблицы, ссылающиеся на удаленные объекты или кабели"""
+    object_ids, cable_ids = list(object_ids), list(cable_ids)
+    checks = {
+        "cables": select(Cable.cable_id).where(
+            Cable.cable_id.in_(cable_ids)
+            | Cable.from_object_id.in_(object_ids) | Cable.to_object_id.in_(object_ids)
+        ),
+        "fiber_splices": select(FiberSplice.fiber_splices_id).where(
+            FiberSplice.cable_id.in_(cable_ids) | FiberSplice.splice_to_cable_id.in_(cable_ids)
+        ),
+        "fiber_reservations": select(FiberReservation.reservation_id).where(FiberReservation.cable_id.in_(cable_ids)),
+        "connections": select(Connection.connection_id).where(
+            Connection.cable_id.in_(cable_ids)
+            | Connection.from_object_id.in_(object_ids) | Connection.to_object_id.in_(object_ids)
+        ),
+        "region_objects": select(region_objects.c.network_object_id).where(
+            region_objects.c.network_object_id.in_(object_ids)
+        ),
+        "region_cables": select(region_cables.c.cable_id).where(region_cables.c.cable_id.in_(cable_ids)),
+        "network_objects": select(NetworkObject.network_object_id).where(NetworkObject.network_object_id.in_(object_ids)),
+        "entity_hashes": select(EntityHash.entity_id).where(
+            (EntityHash.entity_type.in_(("object", "object_geo")) & EntityHash.entity_id.in_(object_ids))
+            | (EntityHash.entity_type.in_(("cable", "cable_geo")) & EntityHash.entity_id.in_(cable_ids))
+        ),
+    }
+    return {name: rows for name, query in checks.items() if (rows := db.scalars(query).all())}
+
+
+print("Testing object cascade...")
+deleted = delete_objects_cascade(db, [object_id["B"]])
+spliced = events.pending_changes(db, events.SPLICES_CHANGED)
+db.commit()
+print(f"  deleted: {deleted}")
+assert deleted == {
+    "fiber_splices": 2, "fiber_reservations": 1, "connections": 2, "region_cables": 1,
+    "region_objects": 1, "cables": 2, "network_objects": 1,
+}
+assert not referencing([object_id["B"]], [cable_id["AB"], cable_id["BC"]])
+# сварка B-C с C-D снята, поэтому кабель C-D тоже помечен
+assert spliced == {cable_id["AB"], cable_id["BC"], cable_id["CD"]}, spliced
+stale_hashes = db.scalars(select(EntityHash.entity_id).where(
+    EntityHash.entity_type == "splice", EntityHash.entity_id.in_(splice_ids[:2])
+)).all()
+assert not stale_hashes, "splice hashes of deleted splices must go too"
+assert db.query(FiberSplice).count() == 1 and db.query(FiberReservation).count() == 1
+assert db.query(Cable).count() == 2 and db.query(Connection).count() == 2
+
+print("Testing cable cascade...")
+deleted = delete_cables_cascade(db, [cable_id["DE"]])
+db.commit()
+print(f"  deleted: {deleted}")
+assert deleted == {"fiber_splices": 1, "fiber_reservations": 0, "connections": 1, "region_cables": 1, "cables": 1}
+assert not referencing([], [cable_id["DE"]])
+# объекты кабеля остаются на месте
+assert db.query(NetworkObject).count() == 4
+assert db.scalars(select(region_cables.c.cable_id)).all() == [cable_id["CD"]]
+db.close()
+
+print("\n✅ Cascade delete tests passed!")
@@ -0,0 +1,98 @@
+"""Test Suurballe edge-disjoint path pairs against exhaustive search on small random networks"""
+
+import os
+import random
+from itertools import combinations
+
+from app.services.diverse_paths import shortest_tree, suurballe
+from app.services.topology import TopologyGraph
+
+SEED = int(os.getenv("DIVERSE_TEST_SEED", "49"))
+TRIALS = 1500
+
+
+def build(n, cables):
+    graph = TopologyGraph()
+    graph.load([(o, 55.0, 37.0) for o in range(n)], cables, {})
+    sub = graph.subgraph()
+    return sub["indptr"], sub["arc_node"], sub["arc_edge"], list(graph.edge_w)
+
+
+def simple_paths(indptr, arc_node, arc_edge, source, target):
+    """Все простые пути source -> target как множества ребер"""
+    found = []
+    stack = [(source, [source], [])]
+    while stack:
+        node, nodes, edges = stack.pop()
+        if node == target:
+            found.append(frozenset(edges))
+            continue
+        for i in range(indptr[node], indptr[node + 1]):
+            if arc_node[i] not in nodes:
+                stack.append((arc_node[i], nodes + [arc_node[i]], edges + [arc_edge[i]]))
+    return found
+
+
+def exhaustive(csr, source, target):
+    """Эталон: (число путей 0/1/2, наименьший суммарный вес пары непересекающихся путей)"""
+    weights = csr[3]
+    paths = simple_paths(*csr[:3], source, target)
+    pairs = [sum(weights[e] for e in a | b) for a, b in combinations(paths, 2) if not a & b]
+    if pairs:
+        return 2, min(pairs)
+    return min(len(paths), 1), None
+
+
+def check_paths(csr, paths, source, target, label):
+    indptr, arc_node, arc_edge, _ = csr
+    seen = set()
+    for nodes, edges in paths:
+        assert nodes[0] == source and nodes[-1] == target and len(nodes) == len(edges) + 1, label
+        for k, e in enumerate(edges):
+            arcs = {(arc_node[i], arc_edge[i]) for i in range(indptr[nodes[k]], indptr[nodes[k] + 1])}
+            assert (nodes[k + 1], e) in arcs, f"{label}: edge {e} does not join {nodes[k]} and {nodes[k + 1]}"
+        assert not seen & set(edges), f"{label}: paths share a cable"
+        seen.update(edges)
+
+
+print("Testing hand-built networks...")
+# кольцо 0-1-2-3 с хордой 0-2: короткий путь по хорде, второй - по кольцу
+csr = build(4, [(1, 0, 1, 1.0, 1, 8), (2, 1, 2, 1.0, 1, 8), (3, 2, 3, 1.0, 1, 8), (4, 3, 0, 1.0, 1, 8), (5, 0, 2, 1.5, 1, 8)])
+paths = suurballe(*csr, 0, 2)
+print(f"  ring with a chord: {[nodes for nodes, _ in paths]}")
+assert paths[0][0] == [0, 2] and paths[1][0] in ([0, 1, 2], [0, 3, 2])
+# ловушка: жадный второй путь после кратчайшего 0-1-2-3 невозможен, нужна перекладка
+csr = build(4, [(1, 0, 1, 1.0, 1, 8), (2, 1, 2, 1.0, 1, 8), (3, 2, 3, 1.0, 1, 8), (4, 0, 2, 3.0, 1, 8), (5, 1, 3, 3.0, 1, 8)])
+paths = suurballe(*csr, 0, 3)
+print(f"  trap topology: {[nodes for nodes, _ in paths]}")
+assert sorted(nodes for nodes, _ in paths) == [[0, 1, 3], [0, 2, 3]]
+# мост: второго пути нет
+csr = build(3, [(1, 0, 1, 1.0, 1, 8), (2, 1, 2, 1.0, 1, 8), (3, 1, 2, 2.0, 1, 8)])
+assert len(suurballe(*csr, 0, 2)) == 1 and len(suurballe(*csr, 2, 0)) == 1
+assert len(suurballe(*csr, 1, 2)) == 2, "parallel cables are disjoint paths"
+
+print("Testing random networks against exhaustive search...")
+rng = random.Random(SEED)
+diverse = 0
+for trial in range(TRIALS):
+    n = rng.randint(2, 7)
+    # параллельные кабели, петли и кабели нулевой длины тоже бывают
+    cables = [
+        (c, rng.randrange(n), rng.randrange(n), rng.choice([0.0, 0.5, 1.0, 1.5, 2.0, 3.0]), 1, 8)
+        for c in range(rng.randint(0, 11))
+    ]
+    csr = build(n, cables)
+    source, target = rng.sample(range(n), 2)
+    count, best = exhaustive(csr, source, target)
+    tree = shortest_tree(*csr, target)
+    for label, paths in (("direct", suurballe(*csr, source, target)), ("tree", suurballe(*csr, source, target, tree))):
+        label = f"trial {trial} {label}"
+        assert len(paths) == count, f"{label}: {len(paths)} paths, exhaustive search finds {count}"
+        check_paths(csr, paths, source, target, label)
+        if count == 2:
+            total = sum(csr[3][e] for _, edges in paths for e in edges)
+            assert abs(total - best) < 1e-9, f"{label}: total {total}, exhaustive best {best}"
+    diverse += count == 2
+print(f"  {TRIALS} random pairs match, {diverse} of them diverse")
+
+print("\n✅ Diverse path tests passed!")
@@ -0,0 +1,26 @@
+"""Test the import validation stage on schema rows"""
+
+from app.services.import_validation import validate_stages
+
+print("Testing splice rows...")
+splices = [
+    {"cable_id": 1, "splice_to_cable_id": 2, "fiber_number": 0, "splice_to_fiber": 0},
+    {"cable_id": 1, "splice_to_cable_id": 2, "fiber_number": 5, "splice_to_fiber": 11},
+    {"cable_id": 1, "splice_to_cable_id": 2, "fiber_number": -1, "splice_to_fiber": 0},
+    {"cable_id": 1, "splice_to_cable_id": 2, "fiber_number": 1, "splice_to_fiber": "2"},
+    {"cable_id": 1, "splice_to_cable_id": 2, "fiber_number": True, "splice_to_fiber": 0},
+    {"cable_id": 1, "fiber_number": 0, "splice_to_fiber": 0},
+]
+report = validate_stages([("fiber_splices", splices, None)], workers=1)
+for index, row in enumerate(splices):
+    print(f"  {row} -> {report.error_for('fiber_splices', index) or 'ok'}")
+
+assert report.error_for("fiber_splices", 0) is None, "fiber 0 is a valid fiber number"
+assert report.error_for("fiber_splices", 1) is None
+assert report.error_for("fiber_splices", 2) == "fiber_number: invalid fiber number"
+assert report.error_for("fiber_splices", 3) == "splice_to_fiber: invalid fiber number"
+assert report.error_for("fiber_splices", 4) == "fiber_number: invalid fiber number"
+assert report.error_for("fiber_splices", 5) == "splice_to_cable_id: required"
+assert len(report.clean("fiber_splices", splices)) == 2
+
+print("\n✅ Import validation tests passed!")
@@ -0,0 +1,97 @@
+"""Test outage regions of the DFS snapshot against a plain BFS over the damaged network"""
+
+import os
+import random
+from collections import deque
+
+from app.services.outage_impact import _Snapshot
+from app.services.topology import TopologyGraph
+
+SEED = int(os.getenv("OUTAGE_TEST_SEED", "43"))
+TRIALS = 2000
+
+
+def build(object_ids, cables, source_ids):
+    graph = TopologyGraph()
+    graph.load([(o, 55.0, 37.0) for o in object_ids], [(c, u, v, 1.0, 1, 8) for c, u, v in cables], {})
+    return graph, _Snapshot(graph, [], set(source_ids), set())
+
+
+def failed(graph, cable_ids=(), object_ids=()):
+    return {graph.cable_edge[c] for c in cable_ids}, {graph.node_index[o] for o in object_ids}
+
+
+def expected(graph, snapshot, failed_edges, failed_nodes):
+    """Эталон: достижимые до отказа узлы, до которых не дойти от живых источников"""
+    def reach(blocked_edges, blocked_nodes):
+        seen = {s for s in snapshot.sources if s not in blocked_nodes}
+        queue = deque(seen)
+        while queue:
+            node = queue.popleft()
+            for nbr, e in graph.arcs(node):
+                if nbr not in seen and nbr not in blocked_nodes and e not in blocked_edges:
+                    seen.add(nbr)
+                    queue.append(nbr)
+        return seen
+
+    before = reach(set(), set())
+    return (before - reach(failed_edges, failed_nodes)) | (failed_nodes & before)
+
+
+def ids(graph, nodes):
+    return {graph.node_ids[n] for n in nodes}
+
+
+print("Testing failed sources...")
+# 1 и 5 - источники на концах цепочки 1-2-3-4-5, у 1 еще отвод 6, 7 вне сети
+graph, snapshot = build(range(1, 8), [(12, 1, 2), (23, 2, 3), (34, 3, 4), (45, 4, 5), (16, 1, 6)], {1, 5})
+cut = snapshot.disconnected(*failed(graph, object_ids=[1]))
+print(f"  source 1 down: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {1, 6}, "the chain stays fed from source 5"
+cut = snapshot.disconnected(*failed(graph, object_ids=[1, 5]))
+print(f"  both sources down: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {1, 2, 3, 4, 5, 6}
+# источник, в который DFS вошел из другого источника, сам жив и кормит соседей
+cut = snapshot.disconnected(*failed(graph, cable_ids=[12, 45]))
+print(f"  both source cables cut: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {2, 3, 4}
+cut = snapshot.disconnected(*failed(graph, object_ids=[7]))
+assert not cut, "an object that was unreachable before the outage is not reported"
+
+print("Testing nested regions...")
+# цепочка 1-2-3-4-5 и обратный кабель 5-1: дерево DFS - сама цепочка
+graph, snapshot = build(range(1, 6), [(12, 1, 2), (23, 2, 3), (34, 3, 4), (45, 4, 5), (51, 5, 1)], {1})
+tree = {graph.node_ids[v]: graph.edge_cable[snapshot.parent_edge[v]] for v in range(5) if snapshot.parent_edge[v] != -1}
+assert tree == {2: 12, 3: 23, 4: 34, 5: 45}, tree
+# внешняя область 2..5 отрезана, вложенная 4..5 жива через 5-1
+cut = snapshot.disconnected(*failed(graph, cable_ids=[12, 34]))
+print(f"  outer cut, inner fed: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {2, 3}
+# внешняя область жива через соседа, вложенная 4 отрезана с двух сторон
+graph, snapshot = build(range(1, 6), [(12, 1, 2), (23, 2, 3), (34, 3, 4), (45, 4, 5), (31, 3, 1)], {1})
+cut = snapshot.disconnected(*failed(graph, cable_ids=[12, 34]))
+print(f"  outer fed, inner cut: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {4, 5}
+# отказ узла внутри области: область под ним и сам узел
+cut = snapshot.disconnected(*failed(graph, cable_ids=[12], object_ids=[4]))
+print(f"  failed node inside a region: {sorted(ids(graph, cut))}")
+assert ids(graph, cut) == {4, 5}
+
+print("Testing random outages against BFS...")
+rng = random.Random(SEED)
+for trial in range(TRIALS):
+    n = rng.randint(2, 30)
+    cables = [(c, rng.randrange(n), rng.randrange(n)) for c in range(rng.randint(0, 2 * n))]
+    cables = [(c, u, v) for c, u, v in cables if u != v]
+    sources = set(rng.sample(range(n), rng.randint(1, min(3, n))))
+    graph, snapshot = build(range(n), cables, sources)
+    failed_cables = rng.sample([c for c, _, _ in cables], min(len(cables), rng.randint(0, 4)))
+    # отказавшими бывают и источники
+    failed_objects = rng.sample(range(n), rng.randint(0, min(3, n)))
+    failed_edges, failed_nodes = failed(graph, failed_cables, failed_objects)
+    cut = snapshot.disconnected(failed_edges, failed_nodes)
+    want = expected(graph, snapshot, failed_edges, failed_nodes)
+    assert cut == want, f"trial {trial}: extra {ids(graph, cut - want)}, missing {ids(graph, want - cut)}"
+print(f"  {TRIALS} random outages match")
+
+print("\n✅ Outage impact tests passed!")
@@ -0,0 +1,146 @@
+"""Test in-place PON forest maintenance against a full recomputation after random edits"""
+
+import os
+import random
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models import NetworkObject, Cable, CableType, ObjectType
+from app.services.pon_tree import PonTrees, SPLITTER_TYPE
+from app.services.outage_impact import SUBSCRIBER_TYPE
+from app.services.topology import TopologyGraph
+
+SEED = int(os.getenv("PON_TEST_SEED", "48"))
+OBJECTS = 40
+EDITS = 400
+FIELDS = ("depth", "subscribers", "distance", "height", "splits")
+
+# отдельная временная база, рабочая test.db не трогается
+db_file = os.path.join(tempfile.mkdtemp(), "pon.db")
+engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+Base.metadata.create_all(engine)
+db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+
+rng = random.Random(SEED)
+type_ids = {}
+for type_id, name in enumerate(("node", SPLITTER_TYPE, SUBSCRIBER_TYPE, "coupling"), start=1):
+    db.add(ObjectType(object_type_id=type_id, name=name, display_name=name))
+    type_ids[name] = type_id
+db.add(CableType(cable_type_id=1, name="ОКГ-8", fiber_count=8, color="#000000"))
+# два источника, остальные типы вперемешку
+objects = [
+    NetworkObject(name=f"N{i}", object_type_id=type_ids["node"] if i < 2 else rng.choice([2, 3, 3, 4]),
+                  latitude=55.0 + rng.random() * 0.1, longitude=37.0 + rng.random() * 0.1)
+    for i in range(OBJECTS)
+]
+db.add_all(objects)
+db.flush()
+object_ids = [obj.network_object_id for obj in objects]
+cables = []
+for i in range(1, OBJECTS):
+    # случайное дерево плюс несколько лишних кабелей
+    cables.append(Cable(name=f"T{i}", cable_type_id=1, fiber_count=8, distance_km=rng.randint(1, 9) / 2,
+                        from_object_id=object_ids[rng.randrange(i)], to_object_id=object_ids[i]))
+db.add_all(cables)
+db.commit()
+cable_ids = [cable.cable_id for cable in cables]
+
+graph = TopologyGraph()
+trees = PonTrees(graph)
+trees.sync(db)
+
+
+def aggregates(pon):
+    """Суммы поддеревьев по родителям самого леса, без его инкрементальной арифметики"""
+    n = len(pon.parent)
+    subscribers = [1 if pon.type_name[v] == SUBSCRIBER_TYPE else 0 for v in range(n)]
+    splits = [1 if pon.type_name[v] == SPLITTER_TYPE else 0 for v in range(n)]
+    distance, height = [0.0] * n, [0] * n
+    for v in sorted((v for v in range(n) if pon.depth[v] > 0), key=lambda v: -pon.depth[v]):
+        p = pon.parent[v]
+        subscribers[p] += subscribers[v]
+        distance[p] += distance[v] + pon.weight[v]
+        height[p] = max(height[p], height[v] + 1)
+        splits[p] = max(splits[p], splits[v] + (1 if pon.type_name[p] == SPLITTER_TYPE else 0))
+    return {"subscribers": subscribers, "distance": distance, "height": height, "splits": splits}
+
+
+def check_forest(pon, step):
+    """Каждый родитель на глубину выше и связан с потомком активным кабелем дерева"""
+    for v, p in enumerate(pon.parent):
+        if p == -1:
+            continue
+        e = graph.cable_edge.get(pon.parent_cable[v])
+        assert e is not None and graph.edge_active[e], f"step {step}: node {v} hangs on a removed cable"
+        assert {graph.edge_u[e], graph.edge_v[e]} == {p, v}, f"step {step}: node {v} parent cable mismatch"
+        assert pon.depth[v] == pon.depth[p] + 1 and pon.weight[v] == graph.edge_w[e], f"step {step}: node {v}"
+
+
+def close(a, b):
+    return all(abs(x - y) < 1e-9 for x, y in zip(a, b)) and len(a) == len(b)
+
+
+def edit(step):
+    """Одна случайная правка; возвращает (id кабелей, id объектов), как их отметили бы события"""
+    kind = rng.choice(("add", "add", "delete", "length", "type"))
+    if kind == "add" or not cable_ids:
+        u, v = rng.sample(object_ids, 2)
+        cable = Cable(name=f"E{step}", cable_type_id=1, fiber_count=8, distance_km=rng.randint(1, 9) / 2,
+                      from_object_id=u, to_object_id=v)
+        db.add(cable)
+        db.commit()
+        cable_ids.append(cable.cable_id)
+        return {cable.cable_id}, set()
+    if kind == "delete":
+        cable_id = cable_ids.pop(rng.randrange(len(cable_ids)))
+        db.query(Cable).filter(Cable.cable_id == cable_id).delete()
+        db.commit()
+        return {cable_id}, set()
+    if kind == "length":
+        cable_id = rng.choice(cable_ids)
+        db.query(Cable).filter(Cable.cable_id == cable_id).update({"distance_km": rng.randint(1, 9) / 2})
+        db.commit()
+        return {cable_id}, set()
+    # источники не трогаем: смена их состава всегда ведет к пересчету
+    object_id = rng.choice(object_ids[2:])
+    db.query(NetworkObject).filter(NetworkObject.network_object_id == object_id).update(
+        {"object_type_id": rng.choice([2, 3, 4])}
+    )
+    db.commit()
+    return set(), {object_id}
+
+
+print("Testing PON forest updates...")
+same_tree = 0
+for step in range(EDITS):
+    changed_cables, changed_objects = edit(step)
+    for target in (graph, trees):
+        if changed_cables:
+            target.on_cables_changed(changed_cables)
+        if changed_objects:
+            target.on_objects_changed(changed_objects)
+    trees.sync(db)
+    check_forest(trees, step)
+
+    # эталон: новый лес с нуля по тому же графу
+    fresh = PonTrees(graph)
+    fresh.sync(db)
+    assert trees.depth == fresh.depth, f"step {step}: depth differs from a full recomputation"
+    own = aggregates(trees)
+    for field in FIELDS[1:]:
+        assert close(getattr(trees, field), own[field]), f"step {step}: {field} differs from its own tree"
+    if trees.parent == fresh.parent:
+        # при совпадении леса совпадают и все агрегаты
+        same_tree += 1
+        for field in FIELDS:
+            assert close(getattr(trees, field), getattr(fresh, field)), f"step {step}: {field} differs from _rebuild"
+
+print(f"  {EDITS} edits: {trees.stats['updates']} in-place updates, {trees.stats['rebuilds']} rebuilds")
+print(f"  forest identical to a full recomputation after {same_tree} edits, equal-depth parents elsewhere")
+assert trees.stats["updates"] > EDITS // 2, "most edits should be applied in place"
+db.close()
+
+print("\n✅ PON tree tests passed!")
@@ -0,0 +1,67 @@
+"""Test that buffered moves survive a failed flush"""
+
+from app.database.database import Base, SessionLocal, engine
+from app.models.network_object import NetworkObject
+from app.models.object_type import ObjectType
+from app.services.position_buffer import PositionBuffer
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+object_type = db.query(ObjectType).first()
+if object_type is None:
+    object_type = ObjectType(name="node", display_name="Узел")
+    db.add(object_type)
+    db.flush()
+obj = NetworkObject(name="position-buffer-test", object_type_id=object_type.object_type_id, latitude=55.0, longitude=37.0)
+db.add(obj)
+db.commit()
+object_id = obj.network_object_id
+
+buffer = PositionBuffer(flush_interval_ms=60000)
+newer = []
+
+
+def failing_session():
+    session = SessionLocal()
+
+    def commit():
+        # перемещение, пришедшее во время неудачной записи
+        for move in newer:
+            buffer.submit([move])
+        raise RuntimeError("database is locked")
+
+    session.commit = commit
+    return session
+
+
+print("Testing failed flush...")
+buffer._session_factory = failing_session
+buffer.submit([(object_id, 55.1, 37.1)])
+result = buffer.flush()
+print(f"  {result}")
+assert result["error"] == "database is locked" and result["requeued"] == 1
+assert buffer._pending == {object_id: (55.1, 37.1)}, "failed move must stay queued"
+
+newer.append((object_id, 55.2, 37.2))
+result = buffer.flush()
+print(f"  newer move during failed write: {result}")
+assert result["requeued"] == 0
+assert buffer._pending == {object_id: (55.2, 37.2)}, "newer move must not be overwritten"
+assert buffer.stats["failed_flushes"] == 2
+
+print("Testing retry...")
+buffer._session_factory = SessionLocal
+result = buffer.flush()
+print(f"  {result}")
+assert result["written"] == 1 and "error" not in result
+assert not buffer._pending
+
+db.expire_all()
+stored = db.get(NetworkObject, object_id)
+assert (stored.latitude, stored.longitude) == (55.2, 37.2)
+db.delete(stored)
+db.commit()
+db.close()
+
+print("\n✅ Position buffer tests passed!")
@@ -0,0 +1,47 @@
+"""Test shortest paths over the compiled topology graph, including objects without coordinates"""
+
+from app.services.topology import TopologyGraph
+
+
+def build(objects, cables):
+    graph = TopologyGraph()
+    graph.load(objects, cables, {})
+    return graph
+
+
+print("Testing shortest paths...")
+
+# 1-2-3 по прямой, 4 без координат: короткий обход 1-4-3 по distance_km
+objects = [(1, 55.0, 37.0), (2, 55.01, 37.0), (3, 55.02, 37.0), (4, None, None)]
+cables = [
+    (10, 1, 2, 1.2, 1, 8),
+    (11, 2, 3, 1.2, 1, 8),
+    (12, 1, 4, 0.5, 1, 8),
+    (13, 4, 3, 0.5, 1, 8),
+]
+graph = build(objects, cables)
+path = graph.shortest_path(1, 3)
+print(f"  1 -> 3 via coordinate-less object: {path['object_ids']} {path['distance_km']} km")
+assert path["object_ids"] == [1, 4, 3] and path["distance_km"] == 1.0
+
+path = graph.shortest_path(1, 4)
+print(f"  1 -> 4 (target without coordinates): {path['object_ids']} {path['distance_km']} km")
+assert path["object_ids"] == [1, 4]
+
+path = graph.shortest_path(4, 2, weight="hops")
+print(f"  4 -> 2 by hops: {path['object_ids']}")
+assert path["hop_count"] == 2
+
+# кабель без длины между объектами без координат весит ноль, а не NaN
+graph = build([(1, None, None), (2, None, None), (3, 55.0, 37.0)], [(20, 1, 2, None, 1, 8), (21, 2, 3, 0.3, 1, 8)])
+path = graph.shortest_path(1, 3)
+print(f"  1 -> 3 without lengths or coordinates: {path['object_ids']} {path['distance_km']} km")
+assert path["object_ids"] == [1, 2, 3] and path["distance_km"] == 0.3
+
+# изолированный объект без координат не отключает A* для остальных
+graph = build(objects[:3] + [(5, None, None)], cables[:2])
+assert graph.geo_heuristic
+assert graph.shortest_path(5, 1) is None
+print("  isolated coordinate-less object: A* kept, no path to it")
+
+print("\n✅ Topology path tests complete!")
@@ -745,17 +745,16 @@ function MapEditor({ objects, onObjectsChange, sidebarVisible, setSidebarVisible
       title: `Присоединить кабель "${cable.name}" к объекту?`,
       onConfirm: async () => {
         try {
-          const updatedCable = {
-            ...cable,
+          const changes = {
             to_object_id: cable.to_object_id === targetObjectId ? cable.from_object_id : targetObjectId
           };
           
           const response = await authService.authenticatedFetch(
-            `http://localhost:8000/api/cables/${cableId}/`,
+            `http://localhost:8000/api/cables/${cableId}`,
             {
-              method: 'PUT',
+              method: 'PATCH',
               headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify(updatedCable)
+              body: JSON.stringify(changes)
             }
           );
           
@@ -857,12 +856,7 @@ function MapEditor({ objects, onObjectsChange, sidebarVisible, setSidebarVisible
       message,
       onConfirm: async () => {
         try {
-          for (const cable of relatedCables) {
-            await authService.authenticatedFetch(`http://localhost:8000/api/cables/${cable.id}`, {
-              method: 'DELETE'
-            });
-          }
-          await authService.authenticatedFetch(`http://localhost:8000/api/network-objects/${objectId}`, {
+          await authService.authenticatedFetch(`http://localhost:8000/api/network-objects/${objectId}?cascade=true`, {
             method: 'DELETE'
           });
           setToast({ message: 'Объект удален', type: 'success' });
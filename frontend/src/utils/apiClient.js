@@ -57,6 +57,13 @@ class APIClient {
     });
   }
 
+  async patch(endpoint, data) {
+    return this.request(endpoint, {
+      method: 'PATCH',
+      body: JSON.stringify(data),
+    });
+  }
+
   async delete(endpoint) {
     return this.request(endpoint, { method: 'DELETE' });
   }
@@ -77,6 +84,17 @@ class APIClient {
     return response.json();
   }
 
+  async patchNetworkObject(id, changes) {
+    const response = await this.patch(`${API_ENDPOINTS.NETWORK_OBJECTS}/${id}`, changes);
+    return response.json();
+  }
+
+  // Moves are buffered server-side; pass flush=true when a drag ends
+  async moveNetworkObjects(moves, flush = false) {
+    const response = await this.post(`${API_ENDPOINTS.NETWORK_OBJECTS}/positions`, { moves, flush });
+    return response.json();
+  }
+
   async deleteNetworkObject(id) {
     return this.delete(`${API_ENDPOINTS.NETWORK_OBJECTS}/${id}`);
   }
@@ -97,6 +115,11 @@ class APIClient {
     return response.json();
   }
 
+  async patchCable(id, changes) {
+    const response = await this.patch(`${API_ENDPOINTS.CABLES}/${id}`, changes);
+    return response.json();
+  }
+
   async deleteCable(id) {
     return this.delete(`${API_ENDPOINTS.CABLES}/${id}`);
   }
@@ -117,6 +140,17 @@ class APIClient {
     return response.json();
   }
 
+  async patchFiberSplice(id, changes) {
+    const response = await this.patch(`${API_ENDPOINTS.FIBER_SPLICES}/${id}`, changes);
+    return response.json();
+  }
+
+  // Replaces the whole splice set of a cable in one request
+  async replaceCableSplices(cableId, splices) {
+    const response = await this.put(`${API_ENDPOINTS.FIBER_SPLICES}/cable/${cableId}`, { splices });
+    return response.json();
+  }
+
   async deleteFiberSplice(id) {
     return this.delete(`${API_ENDPOINTS.FIBER_SPLICES}/${id}`);
   }